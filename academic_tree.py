@@ -0,0 +1,59 @@
+# academic_tree.py
+from dataclasses import dataclass
+from itertools import groupby
+import pandas as pd
+from db_utils import execute_query
+
+# The whole filière -> semestre -> course hierarchy of one academic year in a
+# single round-trip. Filières without semesters that year (and semesters
+# without courses) come back with NULL children so they still appear.
+ACADEMIC_TREE_QUERY = """
+    SELECT
+        f.FILIERE_ID, f.NAME AS FILIERE_NAME,
+        s.SEMESTRE_ID, s.CODE AS SEMESTRE_CODE,
+        c.COURSE_ID, c.NAME AS COURSE_NAME
+    FROM FILIERE f
+    LEFT JOIN SEMESTRE s ON s.FILIERE_ID = f.FILIERE_ID AND s.YEAR_ID = :1
+    LEFT JOIN COURSE c ON c.SEMESTRE_ID = s.SEMESTRE_ID
+    ORDER BY f.NAME, f.FILIERE_ID, s.CODE, s.SEMESTRE_ID, c.NAME
+"""
+
+@dataclass(frozen=True, slots=True)
+class CourseNode:
+    course_id: int
+    name: str
+
+@dataclass(frozen=True, slots=True)
+class SemestreNode:
+    semestre_id: int
+    code: str
+    courses: tuple[CourseNode, ...]
+
+@dataclass(frozen=True, slots=True)
+class FiliereNode:
+    filiere_id: int
+    name: str
+    semestres: tuple[SemestreNode, ...]
+
+def build_academic_tree(rows_df):
+    """Assembles the flat, ordered rows of ACADEMIC_TREE_QUERY into FiliereNodes."""
+    if rows_df.empty:
+        return []
+    rows = rows_df[['FILIERE_ID', 'FILIERE_NAME', 'SEMESTRE_ID', 'SEMESTRE_CODE', 'COURSE_ID', 'COURSE_NAME']]
+    tree = []
+    # The rows are sorted by filière then semester, so each group is contiguous.
+    for (filiere_id, filiere_name), filiere_rows in groupby(rows.itertuples(index=False), key=lambda r: (r[0], r[1])):
+        semestres = []
+        for (semestre_id, code), semestre_rows in groupby(filiere_rows, key=lambda r: (r[2], r[3])):
+            if pd.isna(semestre_id):
+                continue # No semester this year
+            courses = tuple(
+                CourseNode(int(r[4]), r[5]) for r in semestre_rows if pd.notna(r[4])
+            )
+            semestres.append(SemestreNode(int(semestre_id), code, courses))
+        tree.append(FiliereNode(int(filiere_id), filiere_name, tuple(semestres)))
+    return tree
+
+def load_academic_tree(year_id):
+    """Loads the filière -> semestre -> course tree of an academic year with one query."""
+    return build_academic_tree(execute_query(ACADEMIC_TREE_QUERY, [int(year_id)]))
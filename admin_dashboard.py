@@ -5,10 +5,82 @@ import datetime
 from db_utils import (
     execute_query, execute_dml, create_course_with_details, 
     create_new_professor, delete_course_with_details, call_procedure,
-    create_seances_for_all_sections
+    create_seances_for_all_sections, get_pool_metrics, fetch_page, prefetch_queries,
+    reconcile_course_seats, rebuild_absence_state, refresh_dashboard_stats
 )
+from config import DASHBOARD_STATS_SETTINGS
+from query_cache import QUERY_CACHE
+from perf_monitor import PERF_MONITOR
+from passwords import hash_password, FAILED_LOGINS
+from session_profile import get_session_profile
+from academic_tree import load_academic_tree
+from student_search import search_students
+from df_utils import contains_text, format_rows
+from enrollment_decisions import display_bulk_decision
+from scheduler import CONFLICT, FAILED, WEEKDAYS, WeeklySlot, schedule_recurring_seances
+from timetable import load_lessons, load_blocked_periods, solve_timetable, timetable_frame, commit_timetable
+
+# Big listings are read one keyset page at a time (db_utils.fetch_page), so
+# a rerun costs the same however large the table grows.
+LISTING_PAGE_SIZE = 50
+
+ALL_SECTIONS = "All sections" # Recurring séance attended by every section, recorded once
+
+# --- Queries ---
+# Read by several tabs on every rerun. display_admin_dashboard loads them
+# concurrently with prefetch_queries before the tabs render.
+DASHBOARD_STATS_QUERY = "SELECT * FROM V_DASHBOARD_STATS"
+DASHBOARD_STATS_HISTORY_QUERY = """
+    SELECT TAKEN_AT, TOTAL_STUDENTS, TOTAL_PROFS, TOTAL_COURSES, BLOCKED_STUDENTS, REFRESH_MS
+    FROM DASHBOARD_STATS_SNAPSHOT
+    WHERE TAKEN_AT >= SYSTIMESTAMP - NUMTODSINTERVAL(:1, 'DAY')
+    ORDER BY TAKEN_AT
+"""
+FILIERES_QUERY = "SELECT FILIERE_ID, NAME FROM FILIERE ORDER BY NAME"
+DEPARTEMENTS_QUERY = "SELECT DEPARTEMENT_ID, NAME FROM DEPARTEMENT ORDER BY NAME"
+ACADEMIC_YEARS_QUERY = "SELECT YEAR_ID, LABEL FROM ACADEMIC_YEAR ORDER BY LABEL DESC"
+FILIERE_DETAILS_QUERY = "SELECT FILIERE_ID, FILIERE, DEPARTEMENT, TOTAL_SEMESTRES FROM V_DETAIL_FILIERE"
+DEPARTEMENT_DETAILS_QUERY = "SELECT DEPARTEMENT_ID, DEPARTEMENT as \"Department Name\", TOTAL_FILIERES as \"Total Filières\", TOTAL_PROFS as \"Total Professors\" FROM V_DETAIL_DEPARTEMENT ORDER BY \"Department Name\""
+ALL_SEMESTERS_QUERY = """
+    SELECT 
+        s.SEMESTRE_ID, 
+        s.CODE, 
+        f.NAME as FILIERE_NAME, 
+        ay.LABEL as ACADEMIC_YEAR
+    FROM SEMESTRE s
+    JOIN FILIERE f ON s.FILIERE_ID = f.FILIERE_ID
+    JOIN ACADEMIC_YEAR ay ON s.YEAR_ID = ay.YEAR_ID
+    ORDER BY ay.LABEL DESC, f.NAME, s.CODE
+"""
 
 # --- Helper Functions ---
+def current_page_cursor(key, reset_on=None):
+    """
+    Cursor of the page shown in the `key` listing (None for page 1). The listing
+    goes back to page 1 whenever `reset_on` (its search or filters) changes.
+    """
+    state = st.session_state.setdefault(f"{key}_pages", {'reset_on': reset_on, 'cursors': [None]})
+    if state['reset_on'] != reset_on:
+        state['reset_on'], state['cursors'] = reset_on, [None]
+    return state['cursors'][-1]
+
+def show_page_navigation(key, page_df, next_cursor, total=None):
+    """Previous / Next buttons under the `key` listing."""
+    cursors = st.session_state[f"{key}_pages"]['cursors']
+    first_row = (len(cursors) - 1) * LISTING_PAGE_SIZE + 1
+    shown = f"Rows {first_row}-{first_row + len(page_df) - 1}" if not page_df.empty else "No rows"
+    if total is not None:
+        shown += f" of {total}"
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    if col_prev.button("⬅️ Previous", key=f"{key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    col_page.caption(f"Page {len(cursors)} · {shown}")
+    if col_next.button("Next ➡️", key=f"{key}_next", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
 def generate_login_code(full_name):
     """Generates a unique login like YBOUCHAK777"""
     parts = full_name.upper().split()
@@ -29,7 +101,7 @@ def display_student_management():
             full_name = st.text_input("Full Name")
             password = st.text_input("Password", type="password", value="123")
             
-            filieres_df = execute_query("SELECT FILIERE_ID, NAME FROM FILIERE ORDER BY NAME")
+            filieres_df = execute_query(FILIERES_QUERY)
             selected_filiere = st.selectbox("Filiere", filieres_df['NAME'] if not filieres_df.empty else [])
             
             if not filieres_df.empty:
@@ -59,8 +131,9 @@ def display_student_management():
                 else:
                     login_code = generate_login_code(full_name)
                     s_id = semestres_df[semestres_df['DISP'] == selected_sem]['SEMESTRE_ID'].values[0]
-                    success, msg = execute_dml("INSERT INTO USER_ACCOUNT (LOGIN_CODE, PASSWORD_HASH, ROLE) VALUES (:1, :2, :3)", [login_code, password, 'STUDENT'])
+                    success, msg = execute_dml("INSERT INTO USER_ACCOUNT (LOGIN_CODE, PASSWORD_HASH, ROLE) VALUES (:1, :2, :3)", [login_code, hash_password(password), 'STUDENT'])
                     if success:
+                        FAILED_LOGINS.forget(login_code)
                         execute_dml("INSERT INTO STUDENT (CODE_APOGE, FULL_NAME, FILIERE_ID, CURRENT_SEMESTRE_ID) VALUES (:1, :2, :3, :4)", 
                                     [login_code, full_name, int(f_id), int(s_id)])
                         st.success(f"Student Created! Login Code: {login_code}")
@@ -71,24 +144,12 @@ def display_student_management():
     st.divider()
 
     # --- Student List & Search ---
-    search = st.text_input("🔍 Search Student by Name or Filiere", key="search_student")
-    students = execute_query("""
-        SELECT
-            s.student_id,
-            s.code_apoge,
-            s.full_name,
-            f.name AS filiere,
-            sem.code || ' (' || ay.label || ')' AS semestre,
-            ua.status AS account_status
-        FROM student s
-        JOIN filiere f ON f.filiere_id = s.filiere_id
-        JOIN semestre sem ON sem.semestre_id = s.current_semestre_id
-        JOIN academic_year ay ON ay.year_id = sem.year_id
-        JOIN user_account ua ON ua.login_code = s.code_apoge
-    """)
-    if search and not students.empty:
-        students = students[students.apply(lambda row: row.astype(str).str.contains(search, case=False).any(), axis=1)]
+    search = st.text_input("🔍 Search Student by Name, Code or Filiere", key="search_student")
+    students, next_cursor, total = search_students(
+        search, after=current_page_cursor("students", search), page_size=LISTING_PAGE_SIZE, count=True
+    )
     st.dataframe(students, use_container_width=True, hide_index=True)
+    show_page_navigation("students", students, next_cursor, total)
 
     # --- NEW SECTION: View Detailed Student Enrollment ---
     if not students.empty:
@@ -150,7 +211,7 @@ def display_course_management():
     # 1. Form to add a new course
     with st.expander("➕ Add New Course", expanded=False):
         # (The form to add a course remains unchanged)
-        filieres_df_form = execute_query("SELECT FILIERE_ID, NAME FROM FILIERE ORDER BY NAME")
+        filieres_df_form = execute_query(FILIERES_QUERY)
         if not filieres_df_form.empty:
             selected_filiere_form = st.selectbox("Select Filiere", filieres_df_form['NAME'], key="add_c_filiere")
             f_id_form = filieres_df_form[filieres_df_form['NAME'] == selected_filiere_form]['FILIERE_ID'].values[0].item()
@@ -238,8 +299,21 @@ def display_course_management():
 
     # 1. Main Course List
     st.subheader("📚 Global Course List")
-    courses_df = execute_query("SELECT * FROM V_DETAIL_COURSE ORDER BY COURSE_NAME")
+    # A course has one row per professor, so the professor completes the sort key.
+    courses_df, next_cursor, total = fetch_page(
+        "SELECT v.*, cs.SEATS_TAKEN, NVL(v.PROF_NAME, ' ') AS PROF_ORDER FROM V_DETAIL_COURSE v LEFT JOIN COURSE_SEAT cs ON cs.COURSE_ID = v.COURSE_ID",
+        ("COURSE_NAME", "COURSE_ID", "PROF_ORDER"),
+        after=current_page_cursor("courses"), page_size=LISTING_PAGE_SIZE, count=True
+    )
+    courses_df = courses_df.drop(columns=['PROF_ORDER'], errors='ignore')
     st.dataframe(courses_df, use_container_width=True, hide_index=True)
+    show_page_navigation("courses", courses_df, next_cursor, total)
+
+    # SEATS_TAKEN comes from the seat ledger; rebuild it after manual data fixes.
+    if st.button("🔁 Rebuild seat counters", key="reconcile_seats"):
+        success, msg = reconcile_course_seats()
+        if success: st.success(msg)
+        else: st.error(msg)
     
     st.divider()
 
@@ -294,13 +368,15 @@ def display_course_management():
             
             st.dataframe(display_inscriptions[['FULL_NAME', 'STATUS']], use_container_width=True, hide_index=True, column_config={"FULL_NAME": "Student Name", "STATUS": "Status"})
 
+            display_bulk_decision(cid, inscriptions_df, key=f"admin_bulk_{cid}")
+
             # Cancel Action
             st.write("---")
             st.write("⚙️ **Manage Inscription Status**")
             
-            cancellable_inscriptions = inscriptions_df[inscriptions_df['STATUS'].isin(['PENDING', 'ACCEPTED'])]
+            cancellable_inscriptions = inscriptions_df[inscriptions_df['STATUS'].isin(['PENDING', 'ACCEPTED', 'WAITLISTED'])]
             if not cancellable_inscriptions.empty:
-                cancellable_inscriptions['display'] = cancellable_inscriptions.apply(lambda row: f"{row['FULL_NAME']} ({row['STATUS']}) - ID: {row['REQUEST_ID']}", axis=1)
+                cancellable_inscriptions['display'] = format_rows(cancellable_inscriptions, "{FULL_NAME} ({STATUS}) - ID: {REQUEST_ID}")
                 
                 selected_to_cancel = st.selectbox("Select an enrollment to cancel:", cancellable_inscriptions['display'])
                 
@@ -324,7 +400,7 @@ def display_professor_management():
     with st.expander("➕ Add New Professor"):
         with st.form("add_prof_form"):
             name = st.text_input("Full Name")
-            dept_df = execute_query("SELECT DEPARTEMENT_ID, NAME FROM DEPARTEMENT ORDER BY NAME")
+            dept_df = execute_query(DEPARTEMENTS_QUERY)
             dept_name = st.selectbox("Department", dept_df['NAME'] if not dept_df.empty else [])
             password = st.text_input("Password", type="password", value="123")
             if st.form_submit_button("Create Professor"):
@@ -340,10 +416,17 @@ def display_professor_management():
 
     # --- Professor List & Search ---
     search_prof = st.text_input("🔍 Search Professor", key="search_prof")
-    profs_list_df = execute_query("SELECT p.PROF_ID, p.CODE_APOGE, p.FULL_NAME, d.NAME as DEPARTEMENT FROM PROF p JOIN DEPARTEMENT d ON p.DEPARTEMENT_ID = d.DEPARTEMENT_ID ORDER BY p.FULL_NAME")
-    if search_prof and not profs_list_df.empty:
-        profs_list_df = profs_list_df[profs_list_df.apply(lambda row: row.astype(str).str.contains(search_prof, case=False).any(), axis=1)]
+    profs_query = "SELECT p.PROF_ID, p.CODE_APOGE, p.FULL_NAME, d.NAME as DEPARTEMENT FROM PROF p JOIN DEPARTEMENT d ON p.DEPARTEMENT_ID = d.DEPARTEMENT_ID"
+    profs_params = None
+    if search_prof:
+        profs_query += " WHERE UPPER(p.FULL_NAME || ' ' || p.CODE_APOGE || ' ' || d.NAME) LIKE '%' || UPPER(:1) || '%'"
+        profs_params = [search_prof]
+    profs_list_df, next_cursor, total = fetch_page(
+        profs_query, ("FULL_NAME", "PROF_ID"), profs_params,
+        after=current_page_cursor("profs", search_prof), page_size=LISTING_PAGE_SIZE, count=True
+    )
     st.dataframe(profs_list_df, use_container_width=True, hide_index=True)
+    show_page_navigation("profs", profs_list_df, next_cursor, total)
 
     st.markdown("---")
 
@@ -417,7 +500,7 @@ def display_schedule_management():
 
     # --- UI for selection ---
     st.markdown("##### Select Academic Path")
-    filieres_df = execute_query("SELECT FILIERE_ID, NAME FROM FILIERE ORDER BY NAME")
+    filieres_df = execute_query(FILIERES_QUERY)
     
     if filieres_df.empty:
         st.warning("No filières found. Please create a filière in the 'Filières' tab before scheduling.")
@@ -529,35 +612,203 @@ def display_schedule_management():
         else:
             st.warning("Select a filière, semestre, and course above to add a new séance.")
 
+    with st.expander("🔁 Schedule Recurring Séances (whole semester)"):
+        if st.session_state.selected_course_id:
+            display_recurring_seance_form(int(st.session_state.selected_course_id), int(st.session_state.selected_filiere_id), int(st.session_state.selected_semestre_id))
+        else:
+            st.warning("Select a filière, semestre, and course above to schedule recurring séances.")
+
+    with st.expander("🧩 Generate Timetable (all courses of one or more semestres)"):
+        if st.session_state.selected_semestre_id:
+            display_timetable_generator(int(st.session_state.selected_semestre_id))
+        else:
+            st.warning("Select a filière and semestre above to generate their timetable.")
+
     st.divider()
 
     # --- View Existing Schedules based on filters ---
     st.subheader("🗓️ View Existing Schedules")
     if st.session_state.selected_filiere_id and st.session_state.selected_semestre_id:
+        # Paged on the raw columns (idx_seance_page); the TO_CHAR columns are display only.
         sessions_query = """
             SELECT
-                se.seance_id, c.name AS "Course", sec.name AS "Section",
+                se.seance_id, se.seance_date AS sort_date,
+                NVL(se.start_time, CAST(se.seance_date AS TIMESTAMP)) AS sort_start,
+                c.name AS "Course", sec.name AS "Section",
                 se.type AS "Type", TO_CHAR(se.seance_date, 'YYYY-MM-DD') AS "Date",
                 TO_CHAR(se.start_time, 'HH24:MI') AS "Start", TO_CHAR(se.end_time, 'HH24:MI') AS "End", se.room AS "Room"
             FROM seance se
             JOIN course c ON se.course_id = c.course_id
             JOIN section sec ON se.section_id = sec.section_id
             WHERE sec.filiere_id = :1 AND sec.semestre_id = :2
-            ORDER BY se.seance_date, se.start_time
         """
-        sessions_df = execute_query(sessions_query, [int(st.session_state.selected_filiere_id), int(st.session_state.selected_semestre_id)])
+        sessions_params = [int(st.session_state.selected_filiere_id), int(st.session_state.selected_semestre_id)]
         
         # Further filter by course if selected
         if st.session_state.selected_course_id and selected_course_name:
-            sessions_df = sessions_df[sessions_df['Course'] == selected_course_name]
+            sessions_query += " AND se.course_id = :3"
+            sessions_params.append(int(st.session_state.selected_course_id))
 
+        sessions_df, next_cursor, total = fetch_page(
+            sessions_query, ("SORT_DATE", "SORT_START", "SEANCE_ID"), sessions_params,
+            after=current_page_cursor("sessions", tuple(sessions_params)), page_size=LISTING_PAGE_SIZE, count=True
+        )
         if not sessions_df.empty:
-            st.dataframe(sessions_df.drop(columns=['SEANCE_ID']), use_container_width=True, hide_index=True)
+            st.dataframe(sessions_df.drop(columns=['SEANCE_ID', 'SORT_DATE', 'SORT_START']), use_container_width=True, hide_index=True)
+            show_page_navigation("sessions", sessions_df, next_cursor, total)
         else:
             st.info("No scheduled sessions found for the current selection.")
     else:
         st.info("Select a filière and semestre to view schedules.")
 
+def parse_excluded_dates(text):
+    """Dates typed as YYYY-MM-DD, separated by commas or new lines. Returns (dates, invalid entries)."""
+    dates, invalid = [], []
+    for entry in text.replace(",", "\n").splitlines():
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            dates.append(datetime.date.fromisoformat(entry))
+        except ValueError:
+            invalid.append(entry)
+    return dates, invalid
+
+def display_recurring_seance_form(course_id, filiere_id, semestre_id):
+    """Weekly pattern + date range form creating a semester of séances in one run (scheduler.py)."""
+    sections_df = execute_query("SELECT SECTION_ID, NAME FROM SECTION WHERE FILIERE_ID = :1 AND SEMESTRE_ID = :2 ORDER BY NAME", [filiere_id, semestre_id])
+    if sections_df.empty:
+        st.warning("This filière/semestre has no sections yet. Add a single séance above first: it creates the default sections.")
+        return
+    section_names = dict(zip(sections_df['NAME'], sections_df['SECTION_ID']))
+
+    # The report of the last run survives the rerun that refreshes the schedule.
+    last_run = st.session_state.pop("recurring_seances_report", None)
+    if last_run is not None:
+        success, msg, report = last_run
+        (st.success if success else st.warning)(msg)
+        if not report.empty:
+            section_labels = {section_id: name for name, section_id in section_names.items()}
+            st.dataframe(report.drop(columns=["COURSE_ID"]).assign(SECTION_ID=report["SECTION_ID"].map(section_labels)), use_container_width=True, hide_index=True,
+                         column_config={"SEANCE_DATE": "Date", "START": "Start", "END": "End", "SECTION_ID": "Section",
+                                        "TYPE": "Type", "ROOM": "Room", "STATUS": "Status", "REASON": "Reason"})
+
+    st.caption("Each row is one weekly séance. A séance for all sections is recorded once; give each section's séance its own time or room.")
+    pattern_df = st.data_editor(
+        pd.DataFrame({"DAY": ["Monday"], "START": [datetime.time(8, 30)], "END": [datetime.time(10, 30)],
+                      "TYPE": ["COURS"], "SECTION": [ALL_SECTIONS], "ROOM": [""]}),
+        num_rows="dynamic", use_container_width=True, hide_index=True, key="recurring_pattern",
+        column_config={
+            "DAY": st.column_config.SelectboxColumn("Day", options=WEEKDAYS, required=True),
+            "START": st.column_config.TimeColumn("Start", required=True, format="HH:mm"),
+            "END": st.column_config.TimeColumn("End", required=True, format="HH:mm"),
+            "TYPE": st.column_config.SelectboxColumn("Type", options=["COURS", "TD", "TP"], required=True),
+            "SECTION": st.column_config.SelectboxColumn("Section", options=[ALL_SECTIONS] + list(section_names), required=True),
+            "ROOM": st.column_config.TextColumn("Room (blank: default room)"),
+        }
+    )
+    col1, col2 = st.columns(2)
+    first_day = col1.date_input("From", value=datetime.date.today(), key="recurring_first_day")
+    last_day = col2.date_input("Until", value=datetime.date.today() + datetime.timedelta(weeks=14), key="recurring_last_day")
+    room = col1.text_input("Default room", key="recurring_room")
+    excluded_text = st.text_area("Excluded dates (holidays, exams), YYYY-MM-DD, one per line", key="recurring_excluded", height=80)
+
+    col_check, col_create = st.columns(2)
+    check = col_check.button("🔍 Check conflicts", key="recurring_check")
+    create = col_create.button("📅 Create séances", key="recurring_create", type="primary")
+    if not (check or create):
+        return
+
+    excluded_dates, invalid = parse_excluded_dates(excluded_text)
+    pattern_df = pattern_df.dropna(subset=['DAY', 'START', 'END', 'TYPE', 'SECTION'])
+    if invalid:
+        st.error(f"Invalid excluded date(s): {', '.join(invalid)}")
+    elif pattern_df.empty:
+        st.error("Add at least one weekly séance.")
+    elif last_day < first_day:
+        st.error("The end of the date range is before its start.")
+    else:
+        slots = [
+            WeeklySlot(WEEKDAYS.index(day), start, end, seance_type, slot_room if isinstance(slot_room, str) else None,
+                       None if section == ALL_SECTIONS else section_names[section])
+            for day, start, end, seance_type, section, slot_room
+            in pattern_df[['DAY', 'START', 'END', 'TYPE', 'SECTION', 'ROOM']].itertuples(index=False)
+        ]
+        result = schedule_recurring_seances(
+            course_id, list(section_names.values()), slots,
+            first_day, last_day, room, excluded_dates, dry_run=check
+        )
+        if result[2].empty:
+            st.error(result[1])
+        else:
+            st.session_state["recurring_seances_report"] = result
+            st.rerun()
+
+def display_timetable_generator(semestre_id):
+    """
+    Solves the weekly timetable of one or more semestres together (timetable.py)
+    around the séances already booked, previews it and commits it in bulk.
+    """
+    last_run = st.session_state.pop("timetable_report", None)
+    if last_run is not None:
+        success, msg, report = last_run
+        (st.success if success else st.warning)(msg)
+        problems = report[report['STATUS'].isin([CONFLICT, FAILED])] if not report.empty else report
+        if not problems.empty:
+            st.dataframe(problems, use_container_width=True, hide_index=True)
+
+    # Semestres sharing professors or rooms are solved together, so they do not take the same periods.
+    semesters_df = execute_query(ALL_SEMESTERS_QUERY)
+    if semesters_df.empty:
+        return
+    labels = format_rows(semesters_df, "{CODE} - {FILIERE_NAME} ({ACADEMIC_YEAR})")
+    semestre_ids = dict(zip(labels, semesters_df['SEMESTRE_ID'].astype(int)))
+    default = [label for label, sid in semestre_ids.items() if sid == semestre_id]
+    chosen = st.multiselect("Semestres to solve together", list(semestre_ids), default=default, key="timetable_semestres")
+    rooms_text = st.text_input("Rooms (comma separated)", key="timetable_rooms", placeholder="A1, A2, B12")
+    rooms = [room.strip() for room in rooms_text.split(",") if room.strip()]
+    col1, col2 = st.columns(2)
+    first_day = col1.date_input("From", value=datetime.date.today(), key="timetable_first_day")
+    last_day = col2.date_input("Until", value=datetime.date.today() + datetime.timedelta(weeks=14), key="timetable_last_day")
+    excluded_text = st.text_area("Excluded dates (holidays, exams), YYYY-MM-DD, one per line", key="timetable_excluded", height=80)
+    excluded_dates, invalid = parse_excluded_dates(excluded_text)
+
+    # The preview is only valid for the inputs it was solved with (the bookings it avoids depend on the dates).
+    inputs = (tuple(semestre_ids[label] for label in chosen), tuple(rooms), first_day, last_day, tuple(excluded_dates))
+    if st.button("🧩 Generate preview", key="timetable_generate", disabled=not (rooms and chosen)):
+        if invalid:
+            st.error(f"Invalid excluded date(s): {', '.join(invalid)}")
+        elif last_day < first_day:
+            st.error("The end of the date range is before its start.")
+        else:
+            lessons, warnings = load_lessons(list(inputs[0]))
+            blocked = load_blocked_periods(lessons, rooms, first_day, last_day, excluded_dates)
+            st.session_state["timetable_preview"] = (inputs, solve_timetable(lessons, rooms, blocked=blocked), warnings, len(blocked))
+
+    preview = st.session_state.get("timetable_preview")
+    if not preview or preview[0] != inputs:
+        return
+    _, result, warnings, blocked_count = preview
+    for warning in warnings:
+        st.warning(warning)
+    st.caption(f"{len(result.placements)} lesson(s) placed in {result.seconds:.2f}s, "
+               f"around {blocked_count} professor/room period(s) already booked in this date range.")
+    if result.unplaced:
+        st.error(f"{len(result.unplaced)} lesson(s) could not be placed. Add rooms or periods: "
+                 + ", ".join(f"{lesson.course_name} {lesson.seance_type} ({lesson.section_name})" for lesson in result.unplaced))
+    if not result.placements:
+        return
+    st.dataframe(timetable_frame(result), use_container_width=True, hide_index=True)
+
+    if st.button("📅 Create the séances of this timetable", key="timetable_commit", type="primary"):
+        outcome = commit_timetable(result, first_day, last_day, excluded_dates)
+        if outcome[2].empty:
+            st.error(outcome[1])
+        else:
+            st.session_state["timetable_report"] = outcome
+            st.session_state.pop("timetable_preview", None)
+            st.rerun()
+
 def display_filiere_management():
     st.subheader("🎓 Filière Management")
 
@@ -567,7 +818,7 @@ def display_filiere_management():
             filiere_name = st.text_input("Filière Name")
             
             # Fetch departments for the selectbox
-            depts_df = execute_query("SELECT DEPARTEMENT_ID, NAME FROM DEPARTEMENT ORDER BY NAME")
+            depts_df = execute_query(DEPARTEMENTS_QUERY)
             if not depts_df.empty:
                 dept_name = st.selectbox("Parent Department", depts_df['NAME'])
             else:
@@ -593,11 +844,10 @@ def display_filiere_management():
     st.subheader("📋 All Filières")
     search_filiere = st.text_input("🔍 Search by Filière Name or Department", key="search_filiere")
     
-    filieres_df = execute_query("SELECT FILIERE_ID, FILIERE, DEPARTEMENT, TOTAL_SEMESTRES FROM V_DETAIL_FILIERE")
+    filieres_df = execute_query(FILIERE_DETAILS_QUERY)
 
     if search_filiere and not filieres_df.empty:
-        # Using a more robust search method to check all string columns
-        filieres_df = filieres_df[filieres_df.apply(lambda row: row.astype(str).str.contains(search_filiere, case=False).any(), axis=1)]
+        filieres_df = filieres_df[contains_text(filieres_df, search_filiere)]
 
     st.dataframe(filieres_df, use_container_width=True, hide_index=True)
 
@@ -618,9 +868,15 @@ def display_filiere_management():
 
                 with col1:
                     st.write("👥 **Enrolled Students**")
-                    students_df = execute_query("SELECT FULL_NAME, CODE_APOGE FROM STUDENT WHERE FILIERE_ID = :1 ORDER BY FULL_NAME", [selected_filiere_id])
+                    students_df, next_cursor, total = fetch_page(
+                        "SELECT STUDENT_ID, FULL_NAME, CODE_APOGE FROM STUDENT WHERE FILIERE_ID = :1",
+                        ("FULL_NAME", "STUDENT_ID"), [selected_filiere_id],
+                        after=current_page_cursor("filiere_students", selected_filiere_id),
+                        page_size=LISTING_PAGE_SIZE, count=True
+                    )
                     if not students_df.empty:
-                        st.dataframe(students_df, hide_index=True, use_container_width=True)
+                        st.dataframe(students_df.drop(columns=['STUDENT_ID']), hide_index=True, use_container_width=True)
+                        show_page_navigation("filiere_students", students_df, next_cursor, total)
                     else:
                         st.info("No students enrolled in this filière.")
 
@@ -675,10 +931,10 @@ def display_department_management():
     # --- View All Departments ---
     st.subheader("📋 All Departments")
     search_dept = st.text_input("🔍 Search Department by Name", key="search_department")
-    depts_df = execute_query("SELECT DEPARTEMENT_ID, DEPARTEMENT as \"Department Name\", TOTAL_FILIERES as \"Total Filières\", TOTAL_PROFS as \"Total Professors\" FROM V_DETAIL_DEPARTEMENT ORDER BY \"Department Name\"")
+    depts_df = execute_query(DEPARTEMENT_DETAILS_QUERY)
     
     if search_dept and not depts_df.empty:
-        depts_df = depts_df[depts_df.apply(lambda row: row.astype(str).str.contains(search_dept, case=False).any(), axis=1)]
+        depts_df = depts_df[contains_text(depts_df, search_dept)]
 
     st.dataframe(depts_df, use_container_width=True, hide_index=True)
 
@@ -735,8 +991,8 @@ def display_semestre_management():
     # 1. Add New Semestre
     with st.expander("➕ Add New Semester"):
         with st.form("add_semester_form"):
-            filieres_df = execute_query("SELECT FILIERE_ID, NAME FROM FILIERE ORDER BY NAME")
-            years_df = execute_query("SELECT YEAR_ID, LABEL FROM ACADEMIC_YEAR ORDER BY LABEL DESC")
+            filieres_df = execute_query(FILIERES_QUERY)
+            years_df = execute_query(ACADEMIC_YEARS_QUERY)
 
             selected_filiere_name = st.selectbox("Filiere", filieres_df['NAME'] if not filieres_df.empty else [], key="sem_filiere")
             semester_code = st.text_input("Semester Code (e.g., S1, S2)")
@@ -764,18 +1020,7 @@ def display_semestre_management():
     # 2. View & Filter Semesters
     st.subheader("📋 All Semesters")
     
-    all_semesters_query = """
-        SELECT 
-            s.SEMESTRE_ID, 
-            s.CODE, 
-            f.NAME as FILIERE_NAME, 
-            ay.LABEL as ACADEMIC_YEAR
-        FROM SEMESTRE s
-        JOIN FILIERE f ON s.FILIERE_ID = f.FILIERE_ID
-        JOIN ACADEMIC_YEAR ay ON s.YEAR_ID = ay.YEAR_ID
-        ORDER BY ay.LABEL DESC, f.NAME, s.CODE
-    """
-    all_semesters_df = execute_query(all_semesters_query)
+    all_semesters_df = execute_query(ALL_SEMESTERS_QUERY)
 
     filiere_list_filter = ["All Filières"] + sorted(all_semesters_df['FILIERE_NAME'].unique())
     selected_filiere_filter = st.selectbox("Filter by Filière", filiere_list_filter)
@@ -792,9 +1037,7 @@ def display_semestre_management():
     # 3. Detailed Semester View
     st.subheader("🔎 Explore Semester Content")
     if not display_semesters_df.empty:
-        display_semesters_df['display'] = display_semesters_df.apply(
-            lambda row: f"{row['CODE']} - {row['FILIERE_NAME']} ({row['ACADEMIC_YEAR']})", axis=1
-        )
+        display_semesters_df['display'] = format_rows(display_semesters_df, "{CODE} - {FILIERE_NAME} ({ACADEMIC_YEAR})")
         selected_semester_display = st.selectbox(
             "Select a semester to see its courses:",
             ["-- Choose a Semester --"] + display_semesters_df['display'].tolist()
@@ -826,8 +1069,14 @@ def display_blocked_management(admin_id):
     st.subheader("🚫 Blocked Students Management")
     st.info("Filter by academic structure to view and manage students blocked due to the 3-absences rule.")
 
+    # The 3-absences rule reads the absence tracking; rebuild it after manual attendance fixes.
+    if st.button("🔁 Rebuild absence tracking", key="rebuild_absence_state"):
+        success, msg = rebuild_absence_state()
+        if success: st.success(msg)
+        else: st.error(msg)
+
     # 1. Hierarchical Filtering
-    filieres_df = execute_query("SELECT FILIERE_ID, NAME FROM FILIERE ORDER BY NAME")
+    filieres_df = execute_query(FILIERES_QUERY)
     if filieres_df.empty:
         st.warning("No filières found. Please create academic structures first.")
         return
@@ -914,9 +1163,7 @@ def display_blocked_management(admin_id):
     st.subheader("🔓 Unblock a Student")
     with st.form("unblock_student_form"):
         # Use original blocked_df for student ID retrieval
-        blocked_df['display'] = blocked_df.apply(
-            lambda row: f"{row['FULL_NAME']} (ID: {row['STUDENT_ID']})", axis=1
-        )
+        blocked_df['display'] = format_rows(blocked_df, "{FULL_NAME} (ID: {STUDENT_ID})")
         selected_display = st.selectbox(
             "Select student to unblock",
             options=blocked_df['display'].tolist()
@@ -973,37 +1220,23 @@ def display_academic_structure_management():
     # 2. Academic Structure Explorer
     st.subheader("🔎 Academic Structure Deep Dive")
     
-    years_df = execute_query("SELECT YEAR_ID, LABEL FROM ACADEMIC_YEAR ORDER BY LABEL DESC")
+    years_df = execute_query(ACADEMIC_YEARS_QUERY)
     if not years_df.empty:
         selected_year_label = st.selectbox("Select an Academic Year to Explore", years_df['LABEL'])
         selected_year_id = int(years_df[years_df['LABEL'] == selected_year_label].iloc[0]['YEAR_ID'])
 
-        filieres_df = execute_query("SELECT FILIERE_ID, NAME FROM FILIERE ORDER BY NAME")
-        
-        for _, filiere in filieres_df.iterrows():
-            with st.expander(f"🎓 Filière: {filiere['NAME']}"):
-                filiere_id = int(filiere['FILIERE_ID'])
-                
-                semesters_df = execute_query(
-                    "SELECT SEMESTRE_ID, CODE FROM SEMESTRE WHERE FILIERE_ID = :1 AND YEAR_ID = :2 ORDER BY CODE",
-                    [filiere_id, selected_year_id]
-                )
-                
-                if not semesters_df.empty:
-                    for _, semester in semesters_df.iterrows():
-                        st.markdown(f"**Semester: {semester['CODE']}**")
-                        semester_id = int(semester['SEMESTRE_ID'])
+        # The whole tree of the year in one query, whatever the size of the catalog.
+        for filiere in load_academic_tree(selected_year_id):
+            with st.expander(f"🎓 Filière: {filiere.name}"):
+                if filiere.semestres:
+                    for semester in filiere.semestres:
+                        st.markdown(f"**Semester: {semester.code}**")
                         
-                        courses_df = execute_query(
-                            "SELECT NAME FROM COURSE WHERE SEMESTRE_ID = :1 ORDER BY NAME",
-                            [semester_id]
-                        )
-                        
-                        if not courses_df.empty:
-                            for course_name in courses_df['NAME'].tolist():
-                                st.markdown(f"- {course_name}")
+                        if semester.courses:
+                            for course in semester.courses:
+                                st.markdown(f"- {course.name}")
                         else:
-                            st.info(f"No courses assigned to semester {semester['CODE']}.")
+                            st.info(f"No courses assigned to semester {semester.code}.")
                 else:
                     st.warning("No semesters defined for this filière in the selected academic year.")
 
@@ -1011,29 +1244,63 @@ def display_academic_structure_management():
         st.info("No academic years found. Please add one first.")
 
 
+def display_performance_monitor():
+    st.header("⏱️ Database Performance")
+    st.caption(
+        "Calls made through db_utils by every session of this server process since it started "
+        "(or since the last reset). Cache hits are not counted. On the database side, our sessions "
+        "carry MODULE/ACTION/CLIENT_IDENTIFIER tags (see V$SESSION)."
+    )
+
+    summary = PERF_MONITOR.summary()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Database Calls", summary["CALLS"])
+    c2.metric("Distinct Statements", summary["STATEMENTS"])
+    c3.metric(f"Slow Calls (≥ {summary['SLOW_QUERY_MS']} ms)", summary["SLOW_CALLS"])
+    c4.metric("Errors", summary["ERRORS"])
+
+    st.subheader("Top Statements by Total Time")
+    st.dataframe(PERF_MONITOR.top_statements(order_by="TOTAL_MS"), use_container_width=True, hide_index=True)
+
+    st.subheader("Top Statements by p95 Latency")
+    st.dataframe(PERF_MONITOR.top_statements(order_by="P95_MS"), use_container_width=True, hide_index=True)
+
+    st.subheader("Latency Distribution")
+    st.bar_chart(PERF_MONITOR.histogram(), x="LATENCY", y="CALLS", sort=False)
+
+    if st.button("Reset statistics", key="reset_perf_stats"):
+        PERF_MONITOR.reset()
+        st.rerun()
+
+
 def display_admin_dashboard():
     st.title("🎓 University Management System")
 
-    # Fetch Admin ID once for the session
-    if 'admin_id' not in st.session_state:
-        admin_username = st.session_state.user_info['LOGIN_CODE']
-        admin_id_df = execute_query("SELECT ADMIN_ID FROM ADMIN WHERE USERNAME = :1", [admin_username])
-        if not admin_id_df.empty:
-            st.session_state.admin_id = int(admin_id_df.iloc[0]['ADMIN_ID'])
-        else:
-            st.error("Could not verify administrator identity. Aborting.")
-            st.stop()
-    
-    admin_id = st.session_state.admin_id
+    admin_id = get_session_profile().admin_id
+    if admin_id is None:
+        st.error("Could not verify administrator identity. Aborting.")
+        st.stop()
+
+    # Every tab body runs on each rerun, so load the shared queries in one parallel batch.
+    # The big listings are streamed by their own tabs and stay out of this batch.
+    prefetch_queries([
+        (DASHBOARD_STATS_QUERY, None),
+        (FILIERES_QUERY, None),
+        (DEPARTEMENTS_QUERY, None),
+        (ACADEMIC_YEARS_QUERY, None),
+        (FILIERE_DETAILS_QUERY, None),
+        (DEPARTEMENT_DETAILS_QUERY, None),
+        (ALL_SEMESTERS_QUERY, None),
+    ])
 
     tabs = st.tabs([
         "Statistics", "Students", "Courses", "Professors", 
         "Departments", "Filières", "Semesters", "Schedules", 
-        "Academic Structure", "Blocked"
+        "Academic Structure", "Blocked", "Performance"
     ])
     
     with tabs[0]:
-        stats_df = execute_query("SELECT * FROM V_DASHBOARD_STATS")
+        stats_df = execute_query(DASHBOARD_STATS_QUERY)
         if not stats_df.empty:
             stats = stats_df.iloc[0]
             c1, c2, c3, c4 = st.columns(4)
@@ -1041,6 +1308,36 @@ def display_admin_dashboard():
             c2.metric("Profs", stats['TOTAL_PROFS'])
             c3.metric("Courses", stats['TOTAL_COURSES'])
             c4.metric("Blocked", stats['BLOCKED_STUDENTS'])
+            st.caption(f"As of {stats['REFRESHED_AT']:%Y-%m-%d %H:%M} (refreshed every 5 minutes, counting took {stats['REFRESH_MS']} ms).")
+        else:
+            st.info("No statistics snapshot yet.")
+
+        if st.button("🔄 Refresh statistics now", key="refresh_dashboard_stats"):
+            success, msg = refresh_dashboard_stats()
+            if success:
+                st.rerun()
+            else:
+                st.error(msg)
+
+        with st.expander(f"📈 Trends (last {DASHBOARD_STATS_SETTINGS['trend_days']} days)"):
+            history_df = execute_query(DASHBOARD_STATS_HISTORY_QUERY, [DASHBOARD_STATS_SETTINGS["trend_days"]])
+            if history_df.empty:
+                st.info("No snapshot in this period.")
+            else:
+                history_df = history_df.set_index('TAKEN_AT')
+                st.line_chart(history_df[['TOTAL_STUDENTS', 'TOTAL_PROFS', 'TOTAL_COURSES']])
+                st.line_chart(history_df[['BLOCKED_STUDENTS']])
+                st.caption("Refresh time (ms):")
+                st.line_chart(history_df[['REFRESH_MS']])
+
+        with st.expander("🔌 Database Connection Pools & Query Cache"):
+            st.caption(
+                "Pools are shared by every session of this server process. BUSY close to MAX means the role's pool "
+                "is undersized; REJECTED and TIMEOUTS count callers that got a \"system busy\" answer."
+            )
+            st.dataframe(get_pool_metrics(), use_container_width=True, hide_index=True)
+            st.caption("Query result cache (shared by every session):")
+            st.dataframe(pd.DataFrame([QUERY_CACHE.stats()]), use_container_width=True, hide_index=True)
         
     with tabs[1]: display_student_management()
     with tabs[2]: display_course_management()
@@ -1050,4 +1347,5 @@ def display_admin_dashboard():
     with tabs[6]: display_semestre_management()
     with tabs[7]: display_schedule_management()
     with tabs[8]: display_academic_structure_management()
-    with tabs[9]: display_blocked_management(admin_id)
\ No newline at end of file
+    with tabs[9]: display_blocked_management(admin_id)
+    with tabs[10]: display_performance_monitor()
\ No newline at end of file
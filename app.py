@@ -15,16 +15,18 @@ def display_login_form():
                 st.warning("Please enter both username and password.")
                 return
 
-            user_info = login_user(username, password)
+            profile = login_user(username, password)
             
-            if user_info is not None:
-                if isinstance(user_info, str) and user_info == "INACTIVE":
+            if profile is not None:
+                if isinstance(profile, str) and profile == "INACTIVE":
                     st.error("Your account is inactive. Please contact an administrator.")
                 else:
                     st.success("Login successful!")
-                    # Store user info in session state to persist login
+                    # Store the profile in session state to persist login. The
+                    # dashboards read their identity from it instead of querying it.
                     st.session_state.logged_in = True
-                    st.session_state.user_info = user_info
+                    st.session_state.profile = profile
+                    st.session_state.user_info = profile.user_info
                     # Rerun the app to redirect to the dashboard
                     st.rerun()
             else:
@@ -35,8 +37,8 @@ def main():
     st.set_page_config(layout="wide", page_title="Advanced Course Registration System")
     st.title("🎓 Advanced Course Registration System")
 
-    # The new connection pool logic in db_utils is now automatic and
-    # does not require initialization here.
+    # The per-role connection pools in db_utils are created on first use
+    # and shared by every session, so no initialization is needed here.
 
     # Check if user is logged in
     if not st.session_state.get("logged_in"):
@@ -61,10 +63,10 @@ def main():
             st.error("Unknown role. Access denied.")
 
         if st.sidebar.button("Logout"):
-            # Clear session state to log out, but preserve the connection pools
+            # Clear session state to log out. Connection pools are shared by the
+            # whole server process and do not live in the session.
             for key in list(st.session_state.keys()):
-                if key not in ['db_pools']: # Updated from 'db_pool'
-                    del st.session_state[key]
+                del st.session_state[key]
             st.rerun()
 
 if __name__ == "__main__":
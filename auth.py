@@ -1,38 +1,54 @@
 # auth.py
+import logging
 import pandas as pd
-from db_utils import execute_query
-import streamlit as st
+from db_utils import execute_query, execute_dml
+from passwords import verify_password, hash_password, FAILED_LOGINS
+from session_profile import SessionProfile
+
+logger = logging.getLogger(__name__)
 
 def login_user(username, password):
     """
-    Validates user credentials against the USER_ACCOUNT table.
-    This function uses the 'AUTH' role, which can only read USER_ACCOUNT.
+    Validates user credentials against the USER_ACCOUNT table and returns the
+    user's SessionProfile, read in the same query through V_LOGIN_PROFILE.
+    This function uses the 'AUTH' role, which can only read USER_ACCOUNT and
+    V_LOGIN_PROFILE (and upgrade the PASSWORD_HASH of legacy plaintext rows).
     """
-    # Temporarily set the role to AUTH for this specific operation
-    # This ensures we use the app_auth user's connection pool
-    original_role = st.session_state.get('user_info', {}).get('ROLE')
-    if 'user_info' not in st.session_state:
-        st.session_state.user_info = {}
-    st.session_state.user_info['ROLE'] = 'AUTH'
+    login_code = username.upper()
+    if FAILED_LOGINS.contains(login_code, password):
+        return None
+
+    # The public synonym for V_LOGIN_PROFILE will resolve to YAHYA_ADMIN.V_LOGIN_PROFILE
+    query = "SELECT * FROM V_LOGIN_PROFILE WHERE LOGIN_CODE = :1"
+    # Never cache credential lookups.
+    result_df = execute_query(query, [login_code], cache=False, role="AUTH")
+    if result_df.columns.empty:
+        return None # The query failed and the error is already displayed
+
+    if result_df.empty:
+        verify_password(password, None) # Same bcrypt work as a wrong password
+        FAILED_LOGINS.add(login_code, password)
+        return None
+
+    user_data = result_df.iloc[0]
+    stored_hash = user_data['PASSWORD_HASH']
+    ok, needs_rehash = verify_password(password, stored_hash)
+    if not ok:
+        FAILED_LOGINS.add(login_code, password)
+        return None
 
-    try:
-        # The public synonym for USER_ACCOUNT will resolve to YAHYA_ADMIN.USER_ACCOUNT
-        query = "SELECT USER_ID, LOGIN_CODE, ROLE, STATUS FROM USER_ACCOUNT WHERE LOGIN_CODE = :1 AND PASSWORD_HASH = :2"
-        params = [username.upper(), password]
-        result_df = execute_query(query, params)
-    finally:
-        # IMPORTANT: Restore the original role or remove it after the query
-        if original_role:
-            st.session_state.user_info['ROLE'] = original_role
-        else:
-            if 'user_info' in st.session_state and 'ROLE' in st.session_state.user_info:
-                del st.session_state.user_info['ROLE']
+    if needs_rehash:
+        # Only replaces the value we just checked, in case the password changed meanwhile.
+        success, msg = execute_dml(
+            "UPDATE USER_ACCOUNT SET PASSWORD_HASH = :1 WHERE USER_ID = :2 AND PASSWORD_HASH = :3",
+            [hash_password(password), int(user_data['USER_ID']), stored_hash],
+            role="AUTH"
+        )
+        if not success:
+            # The login itself succeeded: the hash is upgraded again at the next one.
+            logger.warning("Could not upgrade the password hash of %s. %s", login_code, msg)
 
-    if not result_df.empty:
-        user_data = result_df.iloc[0]
-        if user_data['STATUS'] == 'ACTIVE':
-            return user_data
-        else:
-            return "INACTIVE"
-    
-    return None
+    if user_data['STATUS'] == 'ACTIVE':
+        return SessionProfile.from_row(user_data)
+    else:
+        return "INACTIVE"
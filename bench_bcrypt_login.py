@@ -0,0 +1,71 @@
+# bench_bcrypt_login.py
+"""
+Measures how many bcrypt password checks per second the login path sustains
+for several cost factors, when a burst of students log in at once.
+
+Three ways of running the checks are compared, all fed by the same number
+of concurrent login threads:
+    inline   - bcrypt runs on the calling thread
+    threads  - bcrypt runs in a thread pool of --workers threads
+    passwords - passwords.verify_password, i.e. the bounded thread pool
+                configured in PASSWORD_SETTINGS (hash_workers)
+
+No database is needed: the hashes are computed up front.
+
+Usage:
+    python bench_bcrypt_login.py
+    python bench_bcrypt_login.py --costs 10 12 --logins 200 --concurrency 50
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+import passwords
+from config import PASSWORD_SETTINGS
+
+DEFAULT_COSTS = [8, 10, 12, 13]
+PASSWORD = "registration-day"
+
+def check_inline(stored_hash):
+    return bcrypt.checkpw(PASSWORD.encode("utf-8"), stored_hash.encode("ascii"))
+
+def run(label, check, hashes, concurrency):
+    """Runs every check from `concurrency` login threads. Returns logins per second."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as logins:
+        results = list(logins.map(check, hashes))
+    elapsed = time.perf_counter() - start
+    assert all(results), f"{label}: a valid password was rejected"
+    return len(hashes) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bcrypt logins per second vs cost factor.")
+    parser.add_argument("--costs", type=int, nargs="+", default=DEFAULT_COSTS, help="bcrypt cost factors.")
+    parser.add_argument("--logins", type=int, default=100, help="Logins per cost factor.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Simultaneous login threads.")
+    parser.add_argument("--workers", type=int, default=PASSWORD_SETTINGS["hash_workers"],
+                        help="Threads of the 'threads' variant (passwords uses hash_workers).")
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins per cost, {args.concurrency} concurrent, "
+          f"{PASSWORD_SETTINGS['hash_workers']} hash worker threads\n")
+    print(f"{'cost':>4} | {'ms/hash':>8} | {'inline':>10} | {'threads':>10} | {'passwords':>10}   (logins/s)")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as hash_threads:
+        for cost in args.costs:
+            stored_hash = passwords._hash_in_worker(PASSWORD, cost)
+            hashes = [stored_hash] * args.logins
+
+            single_start = time.perf_counter()
+            check_inline(stored_hash)
+            ms_per_hash = (time.perf_counter() - single_start) * 1000
+
+            inline = run("inline", check_inline, hashes, args.concurrency)
+            threads = run("threads", lambda h: hash_threads.submit(check_inline, h).result(), hashes, args.concurrency)
+            pooled = run("passwords", lambda h: passwords.verify_password(PASSWORD, h)[0], hashes, args.concurrency)
+            print(f"{cost:>4} | {ms_per_hash:8.1f} | {inline:10.1f} | {threads:10.1f} | {pooled:10.1f}")
+
+if __name__ == "__main__":
+    main()
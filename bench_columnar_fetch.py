@@ -0,0 +1,119 @@
+# bench_columnar_fetch.py
+"""
+Compares the default tuple -> DataFrame read path of db_utils with the
+columnar paths (vectorized numpy fallback and python-oracledb Arrow fetch).
+
+Usage:
+    python bench_columnar_fetch.py             # against the database in config.py
+    python bench_columnar_fetch.py --offline   # conversion only, on synthetic rows
+    python bench_columnar_fetch.py --sizes 10000 100000
+"""
+import argparse
+import datetime
+import time
+
+import oracledb
+import pandas as pd
+
+from config import SCHEMA_OWNER_USER, SCHEMA_OWNER_PASSWORD, ORACLE_DSN
+from db_utils import (
+    _frame_from_cursor, _frame_from_rows_columnar, _read_frame, arrow_fetch_available
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# An attendance-like result: ids, a name, a grade and a timestamp.
+BENCH_QUERY = """
+    SELECT
+        LEVEL AS STUDENT_ID,
+        MOD(LEVEL, 500) AS SEANCE_ID,
+        'Student ' || LEVEL AS FULL_NAME,
+        MOD(LEVEL, 20) + 0.25 AS GRADE,
+        SYSDATE - MOD(LEVEL, 365) AS MARKED_AT
+    FROM DUAL
+    CONNECT BY LEVEL <= :1
+"""
+
+SYNTHETIC_DESCRIPTION = [
+    ("STUDENT_ID", oracledb.DB_TYPE_NUMBER),
+    ("SEANCE_ID", oracledb.DB_TYPE_NUMBER),
+    ("FULL_NAME", oracledb.DB_TYPE_VARCHAR),
+    ("GRADE", oracledb.DB_TYPE_NUMBER),
+    ("MARKED_AT", oracledb.DB_TYPE_DATE),
+]
+
+def timed(func):
+    start = time.perf_counter()
+    df = func()
+    return time.perf_counter() - start, df
+
+def describe_dtypes(df):
+    return ", ".join(f"{col}:{dtype}" for col, dtype in df.dtypes.items())
+
+def synthetic_rows(n):
+    base = datetime.datetime(2024, 9, 1)
+    return [
+        (i, i % 500, f"Student {i}", (i % 20) + 0.25, base - datetime.timedelta(days=i % 365))
+        for i in range(1, n + 1)
+    ]
+
+def run_offline(sizes):
+    print("Offline mode: measuring DataFrame construction from already fetched rows.\n")
+    columns = [name for name, _ in SYNTHETIC_DESCRIPTION]
+    for n in sizes:
+        rows = synthetic_rows(n)
+        t_tuples, df_tuples = timed(lambda: pd.DataFrame(rows, columns=columns))
+        t_columnar, df_columnar = timed(lambda: _frame_from_rows_columnar(SYNTHETIC_DESCRIPTION, rows))
+        print(f"{n:>9,} rows | tuples: {t_tuples:7.3f}s | columnar fallback: {t_columnar:7.3f}s "
+              f"| speedup x{t_tuples / t_columnar:4.1f}")
+        print(f"            tuples dtypes:   {describe_dtypes(df_tuples)}")
+        print(f"            columnar dtypes: {describe_dtypes(df_columnar)}")
+
+def run_database(sizes):
+    print(f"Connecting to {ORACLE_DSN} as {SCHEMA_OWNER_USER}...")
+    connection = oracledb.connect(user=SCHEMA_OWNER_USER, password=SCHEMA_OWNER_PASSWORD, dsn=ORACLE_DSN)
+    print(f"Arrow fetch available: {arrow_fetch_available()}\n")
+
+    def tuples_path(n):
+        with connection.cursor() as cursor:
+            cursor.arraysize = 5000
+            cursor.execute(BENCH_QUERY, [n])
+            return _frame_from_cursor(cursor, columnar=False)
+
+    def fallback_path(n):
+        with connection.cursor() as cursor:
+            cursor.execute(BENCH_QUERY, [n])
+            return _frame_from_cursor(cursor, columnar=True)
+
+    try:
+        for n in sizes:
+            results = {
+                "tuples": timed(lambda: tuples_path(n)),
+                "columnar fallback": timed(lambda: fallback_path(n)),
+            }
+            if arrow_fetch_available():
+                results["arrow"] = timed(lambda: _read_frame(connection, BENCH_QUERY, [n], columnar=True))
+
+            baseline = results["tuples"][0]
+            summary = " | ".join(
+                f"{name}: {elapsed:7.3f}s (x{baseline / elapsed:4.1f})" for name, (elapsed, _) in results.items()
+            )
+            print(f"{n:>9,} rows | {summary}")
+            for name, (_, df) in results.items():
+                print(f"            {name} dtypes: {describe_dtypes(df)}")
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tuple vs columnar DataFrame reads.")
+    parser.add_argument("--offline", action="store_true", help="Skip the database and time conversion only.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Result sizes in rows.")
+    args = parser.parse_args()
+
+    if args.offline:
+        run_offline(args.sizes)
+    else:
+        run_database(args.sizes)
+
+if __name__ == "__main__":
+    main()
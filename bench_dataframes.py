@@ -0,0 +1,112 @@
+# bench_dataframes.py
+"""
+Compares the per-row pandas code the dashboards used to run with the
+df_utils helpers that replaced it, on synthetic rosters:
+    academic status - one blocked-students filter per student vs flag_rows
+    labels          - apply(axis=1) with an f-string vs format_rows
+    search          - row-wise astype(str).str.contains vs contains_text
+    bind rows       - iterrows vs bind_rows
+
+No database is needed. Every pair is checked to give the same result.
+
+Usage:
+    python bench_dataframes.py
+    python bench_dataframes.py --students 5000 20000 --repeat 5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from df_utils import flag_rows, format_rows, contains_text, bind_rows
+
+DEFAULT_STUDENTS = [5000]
+COURSES = ["Algorithmique", "Bases de données", "Réseaux", "Analyse", "Systèmes"]
+
+def make_roster(students, seed=0):
+    """A roster of `students` rows and the blocked (student, course) pairs of ~5% of them."""
+    rng = np.random.default_rng(seed)
+    roster = pd.DataFrame({
+        'STUDENT_ID': np.arange(1, students + 1),
+        'FULL_NAME': [f"Student {i:05d}" for i in range(1, students + 1)],
+        'INSCRIPTION_STATUS': rng.choice(['PENDING', 'ACCEPTED'], size=students),
+        'REQUEST_ID': np.arange(100001, 100001 + students),
+    })
+    blocked_ids = rng.choice(roster['STUDENT_ID'], size=max(1, students // 20), replace=False)
+    blocked = pd.DataFrame({
+        'STUDENT_ID': blocked_ids,
+        'COURSE_NAME': rng.choice(COURSES, size=len(blocked_ids)),
+    })
+    return roster, blocked
+
+# --- Row-wise versions (as the dashboards had them) ---
+
+def status_rowwise(roster, blocked, course):
+    def get_academic_status(row):
+        is_blocked = blocked[(blocked['STUDENT_ID'] == row['STUDENT_ID']) & (blocked['COURSE_NAME'] == course)]
+        return "BLOCKED" if not is_blocked.empty else "OK"
+    return roster.apply(get_academic_status, axis=1)
+
+def labels_rowwise(roster):
+    return roster.apply(lambda row: f"{row['FULL_NAME']} ({row['INSCRIPTION_STATUS']}) - ID: {row['REQUEST_ID']}", axis=1)
+
+def search_rowwise(roster, text):
+    return roster.apply(lambda row: row.astype(str).str.contains(text, case=False).any(), axis=1)
+
+def bind_rowwise(roster):
+    return [[row['INSCRIPTION_STATUS'], int(row['STUDENT_ID'])] for _, row in roster.iterrows()]
+
+# --- Vectorized versions ---
+
+def status_vectorized(roster, blocked, course):
+    return flag_rows(roster.assign(COURSE_NAME=course), blocked, ['STUDENT_ID', 'COURSE_NAME'], "BLOCKED", "OK")
+
+def labels_vectorized(roster):
+    return format_rows(roster, "{FULL_NAME} ({INSCRIPTION_STATUS}) - ID: {REQUEST_ID}")
+
+def search_vectorized(roster, text):
+    return contains_text(roster, text)
+
+def bind_vectorized(roster):
+    return bind_rows(roster, ['INSCRIPTION_STATUS', 'STUDENT_ID'])
+
+def best_time(func, repeat):
+    """Best wall time of `repeat` runs (ms) and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def same(a, b):
+    if isinstance(a, list):
+        return a == b
+    return list(a) == list(b)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-wise vs vectorized dashboard DataFrame code.")
+    parser.add_argument("--students", type=int, nargs="+", default=DEFAULT_STUDENTS, help="Roster sizes.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measure (the best one is kept).")
+    args = parser.parse_args()
+
+    print(f"{'students':>8} | {'case':<15} | {'row-wise ms':>11} | {'vectorized ms':>13} | {'speedup':>8}")
+    for students in args.students:
+        roster, blocked = make_roster(students)
+        course = COURSES[0]
+        cases = [
+            ("academic status", lambda: status_rowwise(roster, blocked, course), lambda: status_vectorized(roster, blocked, course)),
+            ("labels", lambda: labels_rowwise(roster), lambda: labels_vectorized(roster)),
+            ("search", lambda: search_rowwise(roster, "student 004"), lambda: search_vectorized(roster, "student 004")),
+            ("bind rows", lambda: bind_rowwise(roster), lambda: bind_vectorized(roster)),
+        ]
+        for label, rowwise, vectorized in cases:
+            rowwise_ms, expected = best_time(rowwise, args.repeat)
+            vectorized_ms, result = best_time(vectorized, args.repeat)
+            assert same(expected, result), f"{label}: the vectorized result differs"
+            print(f"{students:>8} | {label:<15} | {rowwise_ms:11.1f} | {vectorized_ms:13.2f} | {rowwise_ms / vectorized_ms:7.0f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# bench_drcp.py
+"""
+Compares dedicated server sessions with DRCP (Database Resident Connection
+Pooling) for the STUDENT role at several numbers of simulated users.
+
+Each simulated user is a thread that opens its own connection (connect
+latency), then runs short requests through a shared pool (acquire latency),
+thinking between requests. A monitor samples the server side meanwhile:
+sessions of the STUDENT database user in V$SESSION and, for DRCP, the busy
+pooled servers in V$CPOOL_STATS. Reading those views needs
+SELECT_CATALOG_ROLE for the schema owner; they are reported as n/a otherwise.
+
+DRCP must be started once as SYSDBA: EXECUTE DBMS_CONNECTION_POOL.START_POOL();
+
+Usage:
+    python bench_drcp.py                          # 50, 200 and 500 users, both modes
+    python bench_drcp.py --users 50 --modes drcp
+    python bench_drcp.py --requests 20 --think-ms 100
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import oracledb
+
+from config import SCHEMA_OWNER_USER, SCHEMA_OWNER_PASSWORD, ORACLE_DSN
+from db_utils import get_credentials_for_role, init_client_mode, _drcp_connect_params
+
+DEFAULT_USERS = [50, 200, 500]
+ROLE = "STUDENT"
+
+def connect_params(mode):
+    return _drcp_connect_params(ROLE) if mode == "drcp" else {}
+
+class ServerMonitor(threading.Thread):
+    """Samples the server-side session counts until stopped and keeps the peaks."""
+
+    def __init__(self, db_user, interval=0.2):
+        super().__init__(daemon=True)
+        self.db_user = db_user.upper()
+        self.interval = interval
+        self.peak_sessions = None
+        self.peak_busy_servers = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        connection = oracledb.connect(user=SCHEMA_OWNER_USER, password=SCHEMA_OWNER_PASSWORD, dsn=ORACLE_DSN)
+        try:
+            with connection.cursor() as cursor:
+                while not self._stop_event.is_set():
+                    self.peak_sessions = self._sample(
+                        cursor, "SELECT COUNT(*) FROM V$SESSION WHERE USERNAME = :1", [self.db_user],
+                        self.peak_sessions
+                    )
+                    self.peak_busy_servers = self._sample(
+                        cursor, "SELECT NVL(SUM(NUM_BUSY_SERVERS), 0) FROM V$CPOOL_STATS", [],
+                        self.peak_busy_servers
+                    )
+                    self._stop_event.wait(self.interval)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _sample(cursor, query, params, peak):
+        if peak == "n/a":
+            return peak
+        try:
+            cursor.execute(query, params)
+            value = cursor.fetchone()[0]
+        except oracledb.DatabaseError:
+            return "n/a" # No access to the V$ views
+        return value if peak is None else max(peak, value)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def percentiles(samples_ms):
+    if not samples_ms:
+        return "-"
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return f"p50 {p50:6.1f} | p95 {p95:6.1f} | p99 {p99:6.1f}"
+
+def run_case(mode, users, requests, think_ms):
+    user, password = get_credentials_for_role(ROLE)
+    params = connect_params(mode)
+    pool = oracledb.create_pool(
+        user=user, password=password, dsn=ORACLE_DSN,
+        min=1, max=users, increment=max(1, users // 10),
+        getmode=oracledb.POOL_GETMODE_WAIT, **params
+    )
+    monitor = ServerMonitor(user)
+    monitor.start()
+
+    connect_ms, acquire_ms, errors = [], [], []
+    lock = threading.Lock()
+    barrier = threading.Barrier(users)
+
+    def simulated_user():
+        barrier.wait() # Every user arrives at once, like registration opening
+        try:
+            start = time.perf_counter()
+            standalone = oracledb.connect(user=user, password=password, dsn=ORACLE_DSN, **params)
+            elapsed = (time.perf_counter() - start) * 1000
+            standalone.close()
+            with lock:
+                connect_ms.append(elapsed)
+
+            for _ in range(requests):
+                start = time.perf_counter()
+                with pool.acquire() as connection:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1 FROM DUAL")
+                        cursor.fetchone()
+                with lock:
+                    acquire_ms.append(elapsed)
+                time.sleep(think_ms / 1000)
+        except oracledb.Error as e:
+            with lock:
+                errors.append(str(e))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=simulated_user) for _ in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    monitor.stop()
+    opened = pool.opened
+    pool.close(force=True)
+
+    print(f"{mode:>9} | {users:>4} users | {len(acquire_ms) / wall:7.1f} req/s | pool opened {opened:>4} "
+          f"| server sessions {monitor.peak_sessions} | DRCP busy servers {monitor.peak_busy_servers}")
+    print(f"{'':>9}   connect ms: {percentiles(connect_ms)}")
+    print(f"{'':>9}   acquire ms: {percentiles(acquire_ms)}")
+    if errors:
+        print(f"{'':>9}   {len(errors)} users failed, first error: {errors[0]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dedicated sessions vs DRCP.")
+    parser.add_argument("--users", type=int, nargs="+", default=DEFAULT_USERS, help="Simulated concurrent users.")
+    parser.add_argument("--modes", nargs="+", choices=["dedicated", "drcp"], default=["dedicated", "drcp"])
+    parser.add_argument("--requests", type=int, default=10, help="Requests per user.")
+    parser.add_argument("--think-ms", type=int, default=50, help="Pause between two requests of a user.")
+    args = parser.parse_args()
+
+    init_client_mode()
+    print(f"Benchmarking role {ROLE} against {ORACLE_DSN} "
+          f"({'thin' if oracledb.is_thin_mode() else 'thick'} mode)\n")
+    for users in args.users:
+        for mode in args.modes:
+            run_case(mode, users, args.requests, args.think_ms)
+        print()
+
+if __name__ == "__main__":
+    main()
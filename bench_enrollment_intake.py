@@ -0,0 +1,160 @@
+# bench_enrollment_intake.py
+"""
+Load test of registration opening: many students click "Request Enrollment"
+at once, some of them twice.
+
+Two ways of handling the clicks are compared:
+    sync   - every click inserts its own row (one round-trip and commit
+             per click, as the student page used to do)
+    intake - every click is queued in an EnrollmentIntake and its worker
+             inserts the requests in batches (enrollment_intake.py)
+
+For each mode the test reports the click latency seen by the students and
+the sustained throughput: requests processed per second, from the first
+click until the last request is in the database. Every request is checked
+to end up in exactly one row.
+
+The (student, course) pairs are taken among the current-semester courses
+that students have not requested yet; prerequisite refusals are counted as
+failures. The rows inserted by a mode are deleted afterwards.
+
+Usage:
+    python bench_enrollment_intake.py
+    python bench_enrollment_intake.py --requests 10000 --clients 400 --batch-size 500
+    python bench_enrollment_intake.py --modes intake --duplicates 0.5
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import oracledb
+
+from config import SCHEMA_OWNER_USER, SCHEMA_OWNER_PASSWORD, ORACLE_DSN, ENROLLMENT_INTAKE_SETTINGS
+from db_utils import execute_many, init_client_mode
+from enrollment_intake import EnrollmentIntake, INSERT_REQUEST_DML, QUEUED
+
+CANDIDATE_PAIRS_QUERY = """
+    SELECT s.student_id, c.course_id
+    FROM student s
+    JOIN course c ON c.semestre_id = s.current_semestre_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM inscription_request ir
+        WHERE ir.student_id = s.student_id AND ir.course_id = c.course_id
+    )
+    ORDER BY s.student_id, c.course_id
+    FETCH FIRST :1 ROWS ONLY
+"""
+
+def owner_connection():
+    return oracledb.connect(user=SCHEMA_OWNER_USER, password=SCHEMA_OWNER_PASSWORD, dsn=ORACLE_DSN)
+
+def candidate_pairs(count):
+    with owner_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(CANDIDATE_PAIRS_QUERY, [count])
+        return [tuple(row) for row in cursor.fetchall()]
+
+def count_rows(pairs):
+    """Rows of INSCRIPTION_REQUEST for the pairs, and the most rows found for one pair."""
+    student_ids = [student_id for student_id, _ in pairs]
+    with owner_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT student_id, course_id FROM inscription_request WHERE student_id BETWEEN :1 AND :2",
+            [min(student_ids), max(student_ids)]
+        )
+        wanted = set(pairs)
+        counts = Counter(pair for pair in map(tuple, cursor.fetchall()) if pair in wanted)
+    return sum(counts.values()), max(counts.values(), default=0)
+
+def delete_rows(pairs):
+    with owner_connection() as connection, connection.cursor() as cursor:
+        cursor.executemany("DELETE FROM inscription_request WHERE student_id = :1 AND course_id = :2", pairs)
+        connection.commit()
+
+def make_clicks(pairs, duplicates, seed=0):
+    """Every pair once, plus `duplicates` x len(pairs) repeated clicks, shuffled."""
+    rng = random.Random(seed)
+    clicks = list(pairs) + rng.choices(pairs, k=int(len(pairs) * duplicates))
+    rng.shuffle(clicks)
+    return clicks
+
+def run_clients(clicks, clients, click):
+    """Runs `click(pair)` for every click from `clients` threads. Returns the latencies (ms)."""
+    latencies, lock = [], threading.Lock()
+    chunks = [clicks[i::clients] for i in range(clients)]
+    barrier = threading.Barrier(clients)
+
+    def client(chunk):
+        barrier.wait() # Registration opens for everybody at once
+        for pair in chunk:
+            start = time.perf_counter()
+            click(pair)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+def run_sync(clicks, clients):
+    outcomes = {"ok": 0, "failed": 0}
+    lock = threading.Lock()
+
+    def click(pair):
+        success, _, _ = execute_many(INSERT_REQUEST_DML, [list(pair)], role="STUDENT", client_id="bench-intake")
+        with lock:
+            outcomes["ok" if success else "failed"] += 1
+
+    start = time.perf_counter()
+    latencies = run_clients(clicks, clients, click)
+    return latencies, time.perf_counter() - start, f"{outcomes['ok']} inserted, {outcomes['failed']} refused (duplicates included)"
+
+def run_intake(clicks, clients, batch_size, max_wait_ms):
+    intake = EnrollmentIntake(batch_size=batch_size, max_wait_ms=max_wait_ms, max_queue=len(clicks) + 1)
+    start = time.perf_counter()
+    latencies = run_clients(clicks, clients, lambda pair: intake.submit(*pair))
+    intake.join() # Sustained throughput: until the last request is in the database
+    wall = time.perf_counter() - start
+    assert all(intake.status(*pair).state != QUEUED for pair in set(clicks)), "requests left in the queue"
+    return latencies, wall, (f"{intake.inserted} inserted, {intake.failed} refused, "
+                             f"{intake.duplicates} late duplicates, {intake.batches} batches")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of enrollment requests: sync inserts vs the intake queue.")
+    parser.add_argument("--requests", type=int, default=5000, help="Distinct (student, course) requests.")
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent clicking students.")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Extra clicks on already clicked requests, as a fraction.")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "intake"], default=["sync", "intake"])
+    parser.add_argument("--batch-size", type=int, default=ENROLLMENT_INTAKE_SETTINGS["batch_size"])
+    parser.add_argument("--max-wait-ms", type=int, default=ENROLLMENT_INTAKE_SETTINGS["max_wait_ms"])
+    args = parser.parse_args()
+
+    init_client_mode()
+    pairs = candidate_pairs(args.requests)
+    if not pairs:
+        print("No (student, course) pair without a request was found. Seed students and courses first.")
+        return
+    clicks = make_clicks(pairs, args.duplicates)
+    print(f"{len(pairs)} requests, {len(clicks)} clicks from {args.clients} clients\n")
+
+    for mode in args.modes:
+        try:
+            if mode == "sync":
+                latencies, wall, outcome = run_sync(clicks, args.clients)
+            else:
+                latencies, wall, outcome = run_intake(clicks, args.clients, args.batch_size, args.max_wait_ms)
+            rows, max_per_pair = count_rows(pairs)
+        finally:
+            delete_rows(pairs)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{mode:>6} | {len(pairs) / wall:8.1f} requests/s | click ms p50 {p50:7.2f} p95 {p95:7.2f} p99 {p99:7.2f}")
+        print(f"{'':>6}   {outcome}; {rows} rows in the database, at most {max_per_pair} per request")
+
+if __name__ == "__main__":
+    main()
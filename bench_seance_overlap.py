@@ -0,0 +1,251 @@
+# bench_seance_overlap.py
+"""
+Benchmark of the seance conflict check at insert time, against a growing
+history of seances.
+
+Two versions of the check are compared, each as the PL/SQL block the
+trigger runs before letting a seance in:
+    count     - the former trg_check_seance_overlap: COUNT(*) over the
+                seances (joined to prof_course) of the professor, then of
+                the room, on that day
+    occupancy - the current one: range lookups of the professor's and the
+                room's day in the SEANCE_OCCUPANCY index-organized table
+
+The history lives in scratch tables (BENCH_SEANCE, BENCH_PROF_COURSE,
+BENCH_OCCUPANCY) of the schema owner, shaped like the real ones: 40 rooms,
+5 two-hour slots a day, one professor per course, no conflict. For every
+size the test times `--inserts` random seances (some of them conflicting),
+one round-trip each, and reports the latency percentiles and the number
+of conflicts found. The inserts are rolled back and the scratch tables are
+dropped at the end unless --keep is given.
+
+Usage:
+    python bench_seance_overlap.py
+    python bench_seance_overlap.py --sizes 10000 100000 --inserts 1000
+    python bench_seance_overlap.py --modes occupancy --keep
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import oracledb
+
+from config import SCHEMA_OWNER_USER, SCHEMA_OWNER_PASSWORD, ORACLE_DSN
+from db_utils import init_client_mode
+
+ROOMS = 40
+SLOTS = (8, 10, 12, 14, 16) # Start hours of the two-hour slots
+FIRST_DAY = date(2020, 1, 1)
+SCRATCH_TABLES = ("BENCH_OCCUPANCY", "BENCH_SEANCE", "BENCH_PROF_COURSE")
+
+CREATE_STATEMENTS = (
+    """CREATE TABLE bench_prof_course (
+        prof_id NUMBER NOT NULL,
+        course_id NUMBER NOT NULL,
+        CONSTRAINT pk_bench_prof_course PRIMARY KEY (prof_id, course_id)
+    )""",
+    # Indexed like SEANCE before the occupancy table: primary key only.
+    """CREATE TABLE bench_seance (
+        seance_id NUMBER PRIMARY KEY,
+        course_id NUMBER NOT NULL,
+        seance_date DATE NOT NULL,
+        start_time TIMESTAMP NOT NULL,
+        end_time TIMESTAMP NOT NULL,
+        room VARCHAR2(50)
+    )""",
+    """CREATE TABLE bench_occupancy (
+        resource_type VARCHAR2(4) NOT NULL,
+        resource_key VARCHAR2(50) NOT NULL,
+        seance_date DATE NOT NULL,
+        start_time TIMESTAMP NOT NULL,
+        seance_id NUMBER NOT NULL,
+        end_time TIMESTAMP NOT NULL,
+        CONSTRAINT pk_bench_occupancy PRIMARY KEY (resource_type, resource_key, seance_date, start_time, seance_id)
+    ) ORGANIZATION INDEX""",
+)
+
+# Seance n takes room n mod 40, slot (n / 40) mod 5 of day n / 200, and a
+# course whose professor is free in that slot.
+FILL_SEANCES = f"""
+    INSERT /*+ APPEND */ INTO bench_seance (seance_id, course_id, seance_date, start_time, end_time, room)
+    SELECT n,
+           MOD(n + TRUNC(n / {ROOMS * len(SLOTS)}), {ROOMS}),
+           DATE '{FIRST_DAY:%Y-%m-%d}' + TRUNC(n / {ROOMS * len(SLOTS)}),
+           CAST(DATE '{FIRST_DAY:%Y-%m-%d}' + TRUNC(n / {ROOMS * len(SLOTS)}) AS TIMESTAMP)
+               + NUMTODSINTERVAL({SLOTS[0]} + 2 * MOD(TRUNC(n / {ROOMS}), {len(SLOTS)}), 'HOUR'),
+           CAST(DATE '{FIRST_DAY:%Y-%m-%d}' + TRUNC(n / {ROOMS * len(SLOTS)}) AS TIMESTAMP)
+               + NUMTODSINTERVAL({SLOTS[0] + 2} + 2 * MOD(TRUNC(n / {ROOMS}), {len(SLOTS)}), 'HOUR'),
+           'R' || MOD(n, {ROOMS})
+    FROM (
+        SELECT (a.n - 1) * 1000 + b.n - 1 AS n
+        FROM (SELECT LEVEL AS n FROM dual CONNECT BY LEVEL <= :1) a
+        CROSS JOIN (SELECT LEVEL AS n FROM dual CONNECT BY LEVEL <= 1000) b
+    )
+    WHERE n < :2
+"""
+
+FILL_OCCUPANCY = """
+    INSERT /*+ APPEND */ INTO bench_occupancy (resource_type, resource_key, seance_date, start_time, seance_id, end_time)
+    SELECT 'ROOM', room, seance_date, start_time, seance_id, end_time FROM bench_seance
+    UNION ALL
+    SELECT 'PROF', TO_CHAR(pc.prof_id), s.seance_date, s.start_time, s.seance_id, s.end_time
+    FROM bench_seance s JOIN bench_prof_course pc ON pc.course_id = s.course_id
+"""
+
+COUNT_CHECK = """
+DECLARE
+    v_prof_id NUMBER;
+    v_found NUMBER;
+BEGIN
+    :conflict := 0;
+    SELECT MIN(prof_id) INTO v_prof_id FROM bench_prof_course WHERE course_id = :course_id;
+    SELECT COUNT(*) INTO v_found
+    FROM bench_seance s
+    JOIN bench_prof_course pc ON s.course_id = pc.course_id
+    WHERE pc.prof_id = v_prof_id
+      AND s.seance_date = :seance_date
+      AND (:start_time < s.end_time AND :end_time > s.start_time);
+    IF v_found = 0 THEN
+        SELECT COUNT(*) INTO v_found
+        FROM bench_seance s
+        WHERE s.room = :room
+          AND s.seance_date = :seance_date
+          AND (:start_time < s.end_time AND :end_time > s.start_time);
+    END IF;
+    IF v_found > 0 THEN
+        :conflict := 1;
+        RETURN;
+    END IF;
+    INSERT INTO bench_seance (seance_id, course_id, seance_date, start_time, end_time, room)
+    VALUES (:seance_id, :course_id, :seance_date, :start_time, :end_time, :room);
+END;
+"""
+
+OCCUPANCY_CHECK = """
+DECLARE
+    v_found NUMBER;
+BEGIN
+    :conflict := 0;
+    SELECT COUNT(*) INTO v_found
+    FROM bench_prof_course pc
+    JOIN bench_occupancy o
+        ON o.resource_type = 'PROF'
+       AND o.resource_key = TO_CHAR(pc.prof_id)
+       AND o.seance_date = :seance_date
+       AND o.start_time < :end_time
+       AND o.end_time > :start_time
+    WHERE pc.course_id = :course_id
+      AND ROWNUM = 1;
+    IF v_found = 0 THEN
+        SELECT COUNT(*) INTO v_found
+        FROM bench_occupancy o
+        WHERE o.resource_type = 'ROOM'
+          AND o.resource_key = :room
+          AND o.seance_date = :seance_date
+          AND o.start_time < :end_time
+          AND o.end_time > :start_time
+          AND ROWNUM = 1;
+    END IF;
+    IF v_found > 0 THEN
+        :conflict := 1;
+        RETURN;
+    END IF;
+    INSERT INTO bench_seance (seance_id, course_id, seance_date, start_time, end_time, room)
+    VALUES (:seance_id, :course_id, :seance_date, :start_time, :end_time, :room);
+    INSERT INTO bench_occupancy (resource_type, resource_key, seance_date, start_time, seance_id, end_time)
+    SELECT 'PROF', TO_CHAR(prof_id), :seance_date, :start_time, :seance_id, :end_time
+    FROM bench_prof_course WHERE course_id = :course_id
+    UNION ALL
+    SELECT 'ROOM', :room, :seance_date, :start_time, :seance_id, :end_time FROM dual;
+END;
+"""
+
+CHECKS = {"count": COUNT_CHECK, "occupancy": OCCUPANCY_CHECK}
+
+def owner_connection():
+    return oracledb.connect(user=SCHEMA_OWNER_USER, password=SCHEMA_OWNER_PASSWORD, dsn=ORACLE_DSN)
+
+def drop_scratch_tables(cursor):
+    for table in SCRATCH_TABLES:
+        try:
+            cursor.execute(f"DROP TABLE {table} PURGE")
+        except oracledb.DatabaseError:
+            pass # Not created yet
+
+def build_history(connection, size):
+    """(Re)creates the scratch tables with `size` conflict-free seances."""
+    with connection.cursor() as cursor:
+        drop_scratch_tables(cursor)
+        for statement in CREATE_STATEMENTS:
+            cursor.execute(statement)
+        cursor.executemany("INSERT INTO bench_prof_course (prof_id, course_id) VALUES (:1, :2)",
+                           [(course_id + 1, course_id) for course_id in range(ROOMS)])
+        cursor.execute(FILL_SEANCES, [size // 1000 + 1, size])
+        connection.commit() # APPEND: the table must be committed before it is read again
+        cursor.execute(FILL_OCCUPANCY)
+        connection.commit()
+        for table in ("BENCH_SEANCE", "BENCH_OCCUPANCY", "BENCH_PROF_COURSE"):
+            cursor.callproc("DBMS_STATS.GATHER_TABLE_STATS", [SCHEMA_OWNER_USER.upper(), table])
+
+def random_seances(size, count, seed=0):
+    """New seances spread over the history days, on the hour, one or two hours long."""
+    rng = random.Random(seed)
+    days = max(1, size // (ROOMS * len(SLOTS)))
+    seances = []
+    for i in range(count):
+        day = FIRST_DAY + timedelta(days=rng.randrange(days + 30)) # Some after the history: free days
+        start = datetime.combine(day, datetime.min.time()) + timedelta(hours=rng.randrange(8, 18))
+        seances.append({
+            "seance_id": size + i,
+            "course_id": rng.randrange(ROOMS),
+            "seance_date": datetime.combine(day, datetime.min.time()),
+            "start_time": start,
+            "end_time": start + timedelta(hours=rng.choice((1, 2))),
+            "room": f"R{rng.randrange(ROOMS + 10)}", # A few rooms without history
+        })
+    return seances
+
+def run_mode(connection, mode, seances):
+    """Times the check + insert of every seance. Returns (latencies in ms, conflicts)."""
+    latencies, conflicts = [], 0
+    with connection.cursor() as cursor:
+        conflict = cursor.var(int)
+        for seance in seances:
+            start = time.perf_counter()
+            cursor.execute(CHECKS[mode], conflict=conflict, **seance)
+            latencies.append((time.perf_counter() - start) * 1000)
+            conflicts += conflict.getvalue()
+    connection.rollback() # Leave the history as it was for the next mode
+    return latencies, conflicts
+
+def main():
+    parser = argparse.ArgumentParser(description="Seance conflict check: COUNT(*) scans vs the occupancy table.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000], help="Existing seances.")
+    parser.add_argument("--inserts", type=int, default=500, help="Timed seance inserts per size and mode.")
+    parser.add_argument("--modes", nargs="+", choices=list(CHECKS), default=list(CHECKS))
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch tables of the last size.")
+    args = parser.parse_args()
+
+    init_client_mode()
+    with owner_connection() as connection:
+        try:
+            for size in args.sizes:
+                start = time.perf_counter()
+                build_history(connection, size)
+                print(f"\n{size} existing seances (built in {time.perf_counter() - start:.1f}s)")
+                seances = random_seances(size, args.inserts)
+                for mode in args.modes:
+                    run_mode(connection, mode, seances[:20]) # Warm-up: parse and cache the block
+                    latencies, conflicts = run_mode(connection, mode, seances)
+                    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                    print(f"{mode:>10} | insert ms p50 {p50:8.2f} p95 {p95:8.2f} p99 {p99:8.2f} | "
+                          f"{conflicts}/{len(seances)} conflicts")
+        finally:
+            if not args.keep:
+                with connection.cursor() as cursor:
+                    drop_scratch_tables(cursor)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_timetable.py
+"""
+Benchmark of the timetable generator (timetable.py) on synthetic faculties
+of growing size. No database is needed.
+
+A faculty of N filières has 2 semesters per filière, `--courses` courses
+per semester and 2 or 3 sections per semester. Professors teach
+`--courses-per-prof` courses each, across filières, so the professors tie
+the filières together the way a real faculty does. Rooms are sized so the
+week is about `--room-load` full. With the default settings (one COURS per
+course, one TD per section, 5 days x 4 periods) a section has 12 lessons
+a week for 20 periods.
+
+For every size the test reports the lessons, the solve time, the search
+iterations and the lessons left unplaced, and checks that no professor,
+section or room has two lessons in the same period.
+
+Usage:
+    python bench_timetable.py
+    python bench_timetable.py --filieres 1 10 50 100 --max-seconds 10
+    python bench_timetable.py --room-load 0.95 --seed 3
+"""
+import argparse
+import math
+import random
+from collections import Counter
+
+from timetable import build_lessons, default_periods, solve_timetable
+
+def synthetic_faculty(filieres, courses_per_semester, courses_per_prof, rng):
+    """(courses, sections, prof_keys) as taken by timetable.build_lessons."""
+    courses, sections = [], {}
+    course_id = section_id = 0
+    for semestre_id in range(filieres * 2):
+        for _ in range(courses_per_semester):
+            course_id += 1
+            courses.append((course_id, f"Course {course_id}", semestre_id))
+        sections[semestre_id] = []
+        for g in range(rng.choice((2, 3))):
+            section_id += 1
+            sections[semestre_id].append((section_id, f"S{semestre_id}-G{g + 1}"))
+
+    course_ids = [c for c, _, _ in courses]
+    rng.shuffle(course_ids)
+    prof_keys = {c: [str(i // courses_per_prof + 1)] for i, c in enumerate(course_ids)}
+    return courses, sections, prof_keys
+
+def check(result):
+    """Double bookings of a professor, section or room in the result (should be 0)."""
+    uses = Counter()
+    for placement in result.placements:
+        period = (placement.period.weekday, placement.period.start)
+        uses[(period, 'ROOM', placement.room)] += 1
+        for key in placement.lesson.prof_keys:
+            uses[(period, 'PROF', key)] += 1
+        for section_id in placement.lesson.section_ids:
+            uses[(period, 'SECTION', section_id)] += 1
+    return sum(count - 1 for count in uses.values() if count > 1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Timetable generator on synthetic faculties.")
+    parser.add_argument("--filieres", nargs="+", type=int, default=[1, 5, 20, 50], help="Faculty sizes, in filières.")
+    parser.add_argument("--courses", type=int, default=6, help="Courses per semester.")
+    parser.add_argument("--courses-per-prof", type=int, default=3)
+    parser.add_argument("--room-load", type=float, default=0.85, help="Lessons / (rooms x periods).")
+    parser.add_argument("--max-seconds", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    periods = default_periods()
+    print(f"{len(periods)} periods a week\n")
+    for filieres in args.filieres:
+        rng = random.Random(args.seed)
+        courses, sections, prof_keys = synthetic_faculty(filieres, args.courses, args.courses_per_prof, rng)
+        lessons = build_lessons(courses, sections, prof_keys)
+        rooms = [f"R{i}" for i in range(math.ceil(len(lessons) / (len(periods) * args.room_load)))]
+        result = solve_timetable(lessons, rooms, periods, max_seconds=args.max_seconds, seed=args.seed)
+        print(f"{filieres:>4} filières | {len(lessons):6} lessons, {len(rooms):4} rooms | "
+              f"{result.seconds:6.2f}s, {result.iterations:7} iterations | "
+              f"{len(result.unplaced)} unplaced, {check(result)} double bookings")
+
+if __name__ == "__main__":
+    main()
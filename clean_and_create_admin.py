@@ -1,5 +1,6 @@
 import oracledb
 from config import SCHEMA_OWNER_USER, SCHEMA_OWNER_PASSWORD, ORACLE_DSN
+from passwords import hash_password
 import sys
 
 def clean_and_create_admin():
@@ -58,7 +59,7 @@ def clean_and_create_admin():
         # Insert into user_account first due to foreign key constraint
         cursor.execute(
             "INSERT INTO user_account (login_code, password_hash, role, status) VALUES (:1, :2, :3, :4)",
-            ['admin', 'admin', 'ADMIN', 'ACTIVE']
+            ['admin', hash_password('admin'), 'ADMIN', 'ACTIVE']
         )
         print("  - Created user in USER_ACCOUNT table.")
 
@@ -7,6 +7,205 @@
 # This DSN (Data Source Name) is the address of your Oracle database.
 ORACLE_DSN = "localhost:1521/ORCLCDB"
 
+# =================================================================
+# Client Mode
+# =================================================================
+# python-oracledb runs in thin mode (pure Python) unless thick_mode is
+# set, in which case the Oracle Client libraries are loaded once, before
+# the first pool is created.
+#
+#   lib_dir    - Instant Client directory (None: the system library path)
+#   config_dir - directory of tnsnames.ora / sqlnet.ora (None: default)
+# =================================================================
+
+ORACLE_CLIENT_SETTINGS = {
+    "thick_mode": False,
+    "lib_dir": None,
+    "config_dir": None
+}
+
+# =================================================================
+# Database Resident Connection Pooling (DRCP)
+# =================================================================
+# With DRCP, the sessions of every app server process are served by a
+# shared pool of database server processes instead of one dedicated
+# server each. Start the pool once as SYSDBA before enabling it:
+#
+#   EXECUTE DBMS_CONNECTION_POOL.START_POOL();
+#
+#   cclass - connection class; each role gets "<cclass>_<ROLE>", so only
+#            sessions of the same database user are reused
+#   purity - "self" reuses a pooled session of the class (fast);
+#            "new" always gets a fresh session
+# =================================================================
+
+DRCP_SETTINGS = {
+    "enabled": False,
+    "cclass": "PROJET_ORACLE",
+    "purity": "self"
+}
+
+# =================================================================
+# Connection Pool Sizing
+# =================================================================
+# There is ONE pool per role for the whole server process, shared by
+# every browser session. Size the pools against concurrent requests,
+# not against the number of logged-in users.
+#
+#   min       - sessions opened when the pool is created
+#   max       - hard limit of sessions for the role
+#   increment - sessions opened at a time when the pool grows
+#   timeout   - seconds an idle session above `min` is kept open
+#
+# Admission control, for when every session of the pool is busy:
+#
+#   getmode      - "timedwait" (wait up to wait_timeout), "wait"
+#                  (wait forever) or "nowait" (fail at once)
+#   wait_timeout - milliseconds to wait for a session in "timedwait"
+#   max_waiters  - callers allowed to queue on a saturated pool; the
+#                  next ones get a "system busy" answer immediately
+#
+# Each role below can override any of these keys in its "pool" entry.
+# =================================================================
+
+DEFAULT_POOL_SETTINGS = {
+    "min": 1,
+    "max": 5,
+    "increment": 1,
+    "timeout": 300,
+    "getmode": "timedwait",
+    "wait_timeout": 5000,
+    "max_waiters": 10
+}
+
+# =================================================================
+# Query Result Cache
+# =================================================================
+# execute_query results are cached per role + SQL + binds, shared by all
+# sessions of the server process. Writes made through db_utils drop the
+# entries of the tables they touch; `ttl` (seconds) bounds how stale a
+# result can get when another process writes to the database.
+# =================================================================
+
+QUERY_CACHE_SETTINGS = {
+    "enabled": True,
+    "ttl": 60,
+    "max_entries": 512
+}
+
+# =================================================================
+# Parallel Data Loading
+# =================================================================
+# Dashboards load the independent queries of a page concurrently on a
+# thread pool shared by the whole process. A single page never runs
+# more queries at once than its role's connection pool `max`.
+# =================================================================
+
+PARALLEL_QUERY_SETTINGS = {
+    "max_workers": 16
+}
+
+# =================================================================
+# Performance Monitoring
+# =================================================================
+# Every database call made through db_utils records its elapsed time,
+# pool acquire wait, rows and role under a normalized SQL fingerprint.
+#
+#   slow_query_ms         - calls at least this slow go to the log file
+#   samples_per_statement - latest timings kept per statement for p50/p95
+#   log_file              - slow query log (None to disable it)
+#   module                - MODULE tag of our sessions (V$SESSION.MODULE);
+#                           ACTION is the db_utils call and
+#                           CLIENT_IDENTIFIER the logged-in user
+# =================================================================
+
+PERF_MONITOR_SETTINGS = {
+    "enabled": True,
+    "slow_query_ms": 500,
+    "samples_per_statement": 1000,
+    "log_file": "slow_queries.log",
+    "module": "projet_oracle_V2"
+}
+
+# =================================================================
+# Password Hashing
+# =================================================================
+# Passwords are stored as bcrypt hashes. Legacy plaintext rows are
+# re-hashed the first time their user logs in.
+#
+#   bcrypt_rounds            - cost factor; each +1 doubles the CPU per
+#                              login (see bench_bcrypt_login.py)
+#   hash_workers             - threads that run bcrypt (0: inline)
+#   failed_login_ttl         - seconds a failed login code + password
+#                              pair is answered without checking again
+#   failed_login_max_entries - bound of that cache
+# =================================================================
+
+PASSWORD_SETTINGS = {
+    "bcrypt_rounds": 12,
+    "hash_workers": 4,
+    "failed_login_ttl": 30,
+    "failed_login_max_entries": 10000
+}
+
+# =================================================================
+# Enrollment Intake
+# =================================================================
+# "Request Enrollment" clicks are queued in the server process and a
+# background worker inserts them in batches (enrollment_intake.py).
+#
+#   batch_size   - most requests inserted by one executemany
+#   max_wait_ms  - how long the worker waits to fill a batch
+#   max_queue    - requests queued at most; beyond, clicks are refused
+#   status_ttl   - seconds a processed request's outcome is kept for
+#                  the student's page
+#   poll_seconds - refresh period of the student's pending requests
+# =================================================================
+
+ENROLLMENT_INTAKE_SETTINGS = {
+    "batch_size": 200,
+    "max_wait_ms": 50,
+    "max_queue": 20000,
+    "status_ttl": 600,
+    "poll_seconds": 2
+}
+
+# =================================================================
+# Timetable Generator
+# =================================================================
+# Weekly timetable solver of the Schedules tab (timetable.py).
+#
+#   days                - weekdays taught, 0 = Monday
+#   periods             - (start, end) of the teaching periods of a day
+#   lessons_per_course  - weekly seances of a course, attended by all
+#                         its sections together
+#   lessons_per_section - weekly seances of a course for each section
+#   max_seconds         - time budget of the local search
+# =================================================================
+
+TIMETABLE_SETTINGS = {
+    "days": [0, 1, 2, 3, 4],
+    "periods": [("08:30", "10:30"), ("10:45", "12:45"), ("14:00", "16:00"), ("16:15", "18:15")],
+    "lessons_per_course": {"COURS": 1},
+    "lessons_per_section": {"TD": 1},
+    "max_seconds": 5
+}
+
+# =================================================================
+# Dashboard Statistics
+# =================================================================
+# The Statistics tab reads the latest snapshot taken by
+# sp_refresh_dashboard_stats (db.sql schedules it every 5 minutes).
+#
+#   keep_days   - snapshots older than this are dropped at each refresh
+#   trend_days  - history plotted in the Statistics tab
+# =================================================================
+
+DASHBOARD_STATS_SETTINGS = {
+    "keep_days": 90,
+    "trend_days": 30
+}
+
 # =================================================================
 # Application User Credentials
 # =================================================================
@@ -21,28 +220,32 @@ APP_USERS = {
     # The AUTH user can ONLY read the user_account table to verify passwords.
     "AUTH": {
         "user": "app_auth", 
-        "pass": "auth_password"
+        "pass": "auth_password",
+        "pool": {"min": 1, "max": 4, "increment": 1, "timeout": 120, "wait_timeout": 3000, "max_waiters": 20}
     },
     
     # The STUDENT user has read-only access to its own data and can make
     # new inscription requests.
     "STUDENT": {
         "user": "app_student",
-        "pass": "student_password"
+        "pass": "student_password",
+        "pool": {"min": 2, "max": 20, "increment": 2, "timeout": 300, "wait_timeout": 3000, "max_waiters": 40}
     },
 
     # The PROF user can manage courses, attendance, and grades for the
     # courses they are assigned to.
     "PROF": {
         "user": "app_prof",
-        "pass": "prof_password"
+        "pass": "prof_password",
+        "pool": {"min": 1, "max": 10, "increment": 1, "timeout": 300}
     },
 
     # The ADMIN user has full control over the schema to perform
     # administrative tasks.
     "ADMIN": {
         "user": "app_admin",
-        "pass": "admin_password"
+        "pass": "admin_password",
+        "pool": {"min": 1, "max": 5, "increment": 1, "timeout": 300}
     }
 }
 
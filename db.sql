@@ -1292,4 +1292,1048 @@ EXCEPTION
     WHEN OTHERS THEN
         RAISE; -- Re-raise any other unexpected errors
 END sp_prof_submit_grade;
-/
\ No newline at end of file
+/
+-- =================================================================
+-- Login Profile
+-- =================================================================
+-- One row per account with its role-specific identity, so the login
+-- reads the account and the student/prof/admin profile in one query.
+CREATE OR REPLACE VIEW v_login_profile AS
+SELECT
+    ua.user_id,
+    ua.login_code,
+    ua.role,
+    ua.status,
+    ua.password_hash,
+    COALESCE(s.full_name, p.full_name, a.full_name) AS full_name,
+    s.student_id,
+    s.filiere_id,
+    f.name AS filiere_name,
+    s.current_semestre_id,
+    sem.code AS semestre_code,
+    p.prof_id,
+    p.departement_id,
+    a.admin_id
+FROM user_account ua
+LEFT JOIN student s ON ua.role = 'STUDENT' AND s.code_apoge = ua.login_code
+LEFT JOIN filiere f ON f.filiere_id = s.filiere_id
+LEFT JOIN semestre sem ON sem.semestre_id = s.current_semestre_id
+LEFT JOIN prof p ON ua.role = 'PROF' AND p.code_apoge = ua.login_code
+LEFT JOIN admin a ON ua.role = 'ADMIN' AND a.username = ua.login_code;
+-- =================================================================
+-- Student Search
+-- =================================================================
+-- student.search_key is a normalized "full name, apogee code, filière"
+-- (no accents, lowercase, single spaces) and student_search_gram indexes
+-- its trigrams, so the admin search filters and pages in SQL.
+-- student_search.normalize_search_text is the Python twin of fn_search_key.
+ALTER TABLE student ADD search_key VARCHAR2(200);
+
+CREATE TABLE student_search_gram (
+    gram VARCHAR2(3 CHAR) NOT NULL,
+    student_id NUMBER NOT NULL,
+    CONSTRAINT pk_student_search_gram PRIMARY KEY (gram, student_id),
+    CONSTRAINT fk_ssg_student
+        FOREIGN KEY (student_id)
+        REFERENCES student(student_id)
+        ON DELETE CASCADE
+) ORGANIZATION INDEX;
+
+-- Keyset pagination order of the student list.
+CREATE INDEX idx_student_search_key ON student(search_key, student_id);
+
+CREATE OR REPLACE FUNCTION fn_search_key (
+    p_text IN VARCHAR2
+) RETURN VARCHAR2
+DETERMINISTIC
+IS
+BEGIN
+    RETURN SUBSTR(TRIM(REGEXP_REPLACE(
+        LOWER(TRANSLATE(
+            p_text,
+            'ÀÁÂÃÄÅÇÈÉÊËÌÍÎÏÑÒÓÔÕÖÙÚÛÜÝàáâãäåçèéêëìíîïñòóôõöùúûüýÿ',
+            'AAAAAACEEEEIIIINOOOOOUUUUYaaaaaaceeeeiiiinooooouuuuyy'
+        )),
+        '[^a-z0-9]+', ' '
+    )), 1, 200);
+END fn_search_key;
+/
+
+CREATE OR REPLACE TRIGGER trg_student_search_key
+BEFORE INSERT OR UPDATE OF full_name, code_apoge, filiere_id ON student
+FOR EACH ROW
+DECLARE
+    v_filiere_name filiere.name%TYPE;
+BEGIN
+    SELECT MAX(name) INTO v_filiere_name
+    FROM filiere
+    WHERE filiere_id = :NEW.filiere_id;
+
+    :NEW.search_key := fn_search_key(:NEW.full_name || ' ' || :NEW.code_apoge || ' ' || v_filiere_name);
+END;
+/
+
+-- A renamed filière rewrites the keys of its students. Only search_key is
+-- updated, so trg_student_search_key (which reads filiere) does not fire.
+CREATE OR REPLACE TRIGGER trg_filiere_search_key
+AFTER UPDATE OF name ON filiere
+FOR EACH ROW
+BEGIN
+    UPDATE student
+    SET search_key = fn_search_key(full_name || ' ' || code_apoge || ' ' || :NEW.name)
+    WHERE filiere_id = :NEW.filiere_id;
+END;
+/
+
+-- Keys of the existing students (fires trg_student_search_key only: the
+-- trigram trigger is created below, and the trigrams are filled after it).
+UPDATE student SET full_name = full_name;
+
+-- Fires on the columns the key is built from: UPDATE OF is decided by the
+-- statement's SET list, so the key set by trg_student_search_key alone
+-- would not fire an UPDATE OF search_key trigger. search_key is listed for
+-- trg_filiere_search_key, which sets it directly.
+CREATE OR REPLACE TRIGGER trg_student_search_grams
+AFTER INSERT OR UPDATE OF full_name, code_apoge, filiere_id, search_key ON student
+FOR EACH ROW
+BEGIN
+    IF UPDATING THEN
+        IF NVL(:OLD.search_key, CHR(0)) = NVL(:NEW.search_key, CHR(0)) THEN
+            RETURN; -- Same key, same trigrams
+        END IF;
+        DELETE FROM student_search_gram WHERE student_id = :NEW.student_id;
+    END IF;
+
+    IF LENGTH(:NEW.search_key) >= 3 THEN
+        INSERT INTO student_search_gram (gram, student_id)
+        SELECT DISTINCT SUBSTR(:NEW.search_key, LEVEL, 3), :NEW.student_id
+        FROM dual
+        CONNECT BY LEVEL <= LENGTH(:NEW.search_key) - 2;
+    END IF;
+END;
+/
+
+-- Trigrams of the existing students (search_key is at most 200 characters).
+INSERT INTO student_search_gram (gram, student_id)
+SELECT DISTINCT SUBSTR(s.search_key, n.pos, 3), s.student_id
+FROM student s
+JOIN (SELECT LEVEL AS pos FROM dual CONNECT BY LEVEL <= 198) n
+    ON n.pos <= LENGTH(s.search_key) - 2;
+COMMIT;
+-- =================================================================
+-- Keyset Pagination Indexes
+-- =================================================================
+-- Sort keys of the admin listings read by db_utils.fetch_page.
+CREATE INDEX idx_course_name_page ON course(name, course_id);
+CREATE INDEX idx_prof_name_page ON prof(full_name, prof_id);
+CREATE INDEX idx_student_filiere_page ON student(filiere_id, full_name, student_id);
+-- Seances by date and start; start_time is nullable, so the key sorts it as NVL(start, midnight).
+CREATE INDEX idx_seance_page ON seance(seance_date, NVL(start_time, CAST(seance_date AS TIMESTAMP)), seance_id);
+-- =================================================================
+-- Enrollment Intake
+-- =================================================================
+-- One request per student and course: a duplicate click that reaches
+-- the database is refused instead of creating a second row
+-- (enrollment_intake.py reports it as "already sent").
+-- Duplicates left by earlier double clicks would make the constraint fail
+-- (ORA-02299): keep one row per student and course, the one with the
+-- strongest status, then the oldest.
+DELETE FROM inscription_request
+WHERE ROWID IN (
+    SELECT rid
+    FROM (
+        SELECT ROWID AS rid,
+               ROW_NUMBER() OVER (
+                   PARTITION BY student_id, course_id
+                   ORDER BY CASE status
+                                WHEN 'ACCEPTED' THEN 1
+                                WHEN 'WAITLISTED' THEN 2
+                                WHEN 'PENDING' THEN 3
+                                ELSE 4
+                            END,
+                            request_id
+               ) AS rn
+        FROM inscription_request
+    )
+    WHERE rn > 1
+);
+COMMIT;
+ALTER TABLE inscription_request ADD CONSTRAINT uq_inscription_student_course UNIQUE (student_id, course_id);
+-- =================================================================
+-- Course Seat Ledger
+-- =================================================================
+-- course_seat holds the number of ACCEPTED requests of each course.
+-- Accepting a request increments it with a conditional UPDATE, which
+-- locks the course's row until commit: two professors accepting for the
+-- same course at once are serialized there, and the second one sees the
+-- first one's seat. Accept and cancel touch one row instead of counting
+-- the course's requests. This replaces trg_check_course_capacity and its
+-- autonomous-transaction COUNT(*), which could not see uncommitted accepts.
+BEGIN EXECUTE IMMEDIATE 'DROP TRIGGER trg_check_course_capacity'; EXCEPTION WHEN OTHERS THEN IF SQLCODE != -4080 THEN RAISE; END IF; END;
+/
+BEGIN EXECUTE IMMEDIATE 'DROP FUNCTION fn_check_course_capacity'; EXCEPTION WHEN OTHERS THEN IF SQLCODE != -4043 THEN RAISE; END IF; END;
+/
+
+CREATE TABLE course_seat (
+    course_id NUMBER PRIMARY KEY,
+    seats_taken NUMBER DEFAULT 0 NOT NULL,
+    CONSTRAINT chk_seats_taken CHECK (seats_taken >= 0),
+    CONSTRAINT fk_seat_course
+        FOREIGN KEY (course_id)
+        REFERENCES course(course_id)
+        ON DELETE CASCADE
+);
+
+CREATE OR REPLACE TRIGGER trg_course_seat_init
+AFTER INSERT ON course
+FOR EACH ROW
+BEGIN
+    INSERT INTO course_seat (course_id, seats_taken) VALUES (:NEW.course_id, 0);
+END;
+/
+
+CREATE OR REPLACE TRIGGER trg_course_seat_ledger
+BEFORE INSERT OR UPDATE OF status OR DELETE ON inscription_request
+FOR EACH ROW
+DECLARE
+    v_capacity course.capacity%TYPE;
+BEGIN
+    IF NVL(:NEW.status, '-') = 'ACCEPTED' AND NVL(:OLD.status, '-') <> 'ACCEPTED' THEN
+        -- Takes a seat only while one is free (a NULL capacity means no limit).
+        UPDATE course_seat cs
+        SET cs.seats_taken = cs.seats_taken + 1
+        WHERE cs.course_id = :NEW.course_id
+          AND cs.seats_taken < NVL((SELECT c.capacity FROM course c WHERE c.course_id = :NEW.course_id), cs.seats_taken + 1);
+
+        IF SQL%ROWCOUNT = 0 THEN
+            SELECT capacity INTO v_capacity FROM course WHERE course_id = :NEW.course_id;
+            RAISE_APPLICATION_ERROR(-20060, 'Echec inscription : Le cours a atteint sa capacité maximale (' || v_capacity || ')');
+        END IF;
+    ELSIF NVL(:OLD.status, '-') = 'ACCEPTED' AND NVL(:NEW.status, '-') <> 'ACCEPTED' THEN
+        -- Cancelled, rejected or deleted: the seat is given back.
+        UPDATE course_seat
+        SET seats_taken = seats_taken - 1
+        WHERE course_id = :OLD.course_id;
+    END IF;
+END;
+/
+
+-- Rebuilds every counter from inscription_request. The table lock waits
+-- for the accepts in flight and holds new ones until the counters are
+-- committed, so the counts are exact. p_fixed returns the rows corrected.
+CREATE OR REPLACE PROCEDURE sp_reconcile_course_seats (
+    p_fixed OUT NUMBER
+)
+IS
+BEGIN
+    LOCK TABLE course_seat IN EXCLUSIVE MODE;
+
+    MERGE INTO course_seat cs
+    USING (
+        SELECT c.course_id, COUNT(ir.request_id) AS seats_taken
+        FROM course c
+        LEFT JOIN inscription_request ir
+            ON ir.course_id = c.course_id
+           AND ir.status = 'ACCEPTED'
+        GROUP BY c.course_id
+    ) src
+    ON (cs.course_id = src.course_id)
+    WHEN MATCHED THEN
+        UPDATE SET cs.seats_taken = src.seats_taken
+        WHERE cs.seats_taken <> src.seats_taken
+    WHEN NOT MATCHED THEN
+        INSERT (course_id, seats_taken) VALUES (src.course_id, src.seats_taken);
+
+    p_fixed := SQL%ROWCOUNT;
+    COMMIT;
+END sp_reconcile_course_seats;
+/
+
+-- Fills the ledger for the existing courses.
+DECLARE
+    v_fixed NUMBER;
+BEGIN
+    sp_reconcile_course_seats(v_fixed);
+END;
+/
+-- =================================================================
+-- Bulk Enrollment Decisions
+-- =================================================================
+-- WAITLISTED: refused for lack of seats but kept in line; the next bulk
+-- decision on the course considers it again, before the newer requests.
+ALTER TABLE inscription_request DROP CONSTRAINT chk_request_status;
+ALTER TABLE inscription_request ADD CONSTRAINT chk_request_status
+    CHECK (status IN ('PENDING','ACCEPTED','REJECTED','WAITLISTED'));
+
+-- Decides every PENDING / WAITLISTED request of a course in one transaction.
+-- Requests are ranked by their position in p_order (request ids chosen by
+-- the professor, may be empty), then waitlist first, then first come first
+-- served. The first ones are accepted up to the free seats, the others get
+-- p_overflow (REJECTED or WAITLISTED). Requests whose prerequisites are no
+-- longer valid are left untouched (SKIPPED). p_outcomes returns one row per
+-- request, in rank order.
+CREATE OR REPLACE PROCEDURE sp_bulk_decide_inscriptions (
+    p_course_id IN course.course_id%TYPE,
+    p_overflow  IN VARCHAR2,
+    p_order     IN SYS.ODCINUMBERLIST,
+    p_outcomes  OUT SYS_REFCURSOR
+)
+IS
+    v_capacity  course.capacity%TYPE;
+    v_taken     course_seat.seats_taken%TYPE;
+    v_free      NUMBER;
+    v_order     SYS.ODCINUMBERLIST := NVL(p_order, SYS.ODCINUMBERLIST());
+    v_ids       SYS.ODCINUMBERLIST;
+    v_decisions SYS.ODCIVARCHAR2LIST;
+BEGIN
+    IF p_overflow IS NULL OR p_overflow NOT IN ('REJECTED', 'WAITLISTED') THEN
+        RAISE_APPLICATION_ERROR(-20070, 'Decision invalide pour les demandes restantes : ' || p_overflow);
+    END IF;
+
+    -- Locks the course's seat row: no other accept can run until we commit.
+    SELECT c.capacity, cs.seats_taken
+    INTO v_capacity, v_taken
+    FROM course c
+    JOIN course_seat cs ON cs.course_id = c.course_id
+    WHERE c.course_id = p_course_id
+    FOR UPDATE OF cs.seats_taken;
+
+    v_free := CASE WHEN v_capacity IS NULL THEN 1E9 ELSE GREATEST(v_capacity - v_taken, 0) END;
+
+    SELECT request_id,
+           CASE
+               WHEN missing = 1 THEN 'SKIPPED'
+               WHEN seat_rank <= v_free THEN 'ACCEPTED'
+               ELSE p_overflow
+           END
+    BULK COLLECT INTO v_ids, v_decisions
+    FROM (
+        SELECT request_id, missing,
+               ROW_NUMBER() OVER (
+                   PARTITION BY missing
+                   ORDER BY NVL(position, 1E9),
+                            CASE status WHEN 'WAITLISTED' THEN 0 ELSE 1 END,
+                            request_date, request_id
+               ) AS seat_rank
+        FROM (
+            SELECT ir.request_id, ir.status, ir.request_date, ch.position,
+                   CASE WHEN EXISTS (
+                       SELECT 1
+                       FROM course_prerequisite cp
+                       WHERE cp.course_id = ir.course_id
+                         AND NOT EXISTS (
+                             SELECT 1 FROM course_result cr
+                             WHERE cr.student_id = ir.student_id
+                               AND cr.course_id = cp.prerequisite_course_id
+                               AND cr.status = 'VALID'
+                         )
+                   ) THEN 1 ELSE 0 END AS missing
+            FROM inscription_request ir
+            LEFT JOIN (
+                SELECT COLUMN_VALUE AS request_id, MIN(ROWNUM) AS position
+                FROM TABLE(v_order)
+                GROUP BY COLUMN_VALUE
+            ) ch ON ch.request_id = ir.request_id
+            WHERE ir.course_id = p_course_id
+              AND ir.status IN ('PENDING', 'WAITLISTED')
+        )
+    )
+    ORDER BY missing, seat_rank;
+
+    -- One statement for the whole course; the triggers still run per row.
+    FORALL i IN 1 .. v_ids.COUNT
+        UPDATE inscription_request
+        SET status = v_decisions(i)
+        WHERE request_id = v_ids(i)
+          AND v_decisions(i) <> 'SKIPPED'
+          AND status <> v_decisions(i);
+
+    OPEN p_outcomes FOR
+        SELECT o.request_id, st.full_name, d.outcome
+        FROM (SELECT ROWNUM AS position, COLUMN_VALUE AS request_id FROM TABLE(v_ids)) o
+        JOIN (SELECT ROWNUM AS position, COLUMN_VALUE AS outcome FROM TABLE(v_decisions)) d
+            ON d.position = o.position
+        JOIN inscription_request ir ON ir.request_id = o.request_id
+        JOIN student st ON st.student_id = ir.student_id
+        ORDER BY o.position;
+
+    COMMIT;
+EXCEPTION
+    WHEN NO_DATA_FOUND THEN
+        ROLLBACK;
+        RAISE_APPLICATION_ERROR(-20071, 'Cours introuvable : ' || p_course_id);
+    WHEN OTHERS THEN
+        ROLLBACK;
+        RAISE;
+END sp_bulk_decide_inscriptions;
+/
+-- =================================================================
+-- Seance Occupancy
+-- =================================================================
+-- One slot per seance and resource it occupies: its room, and each
+-- professor of its course. The slots are kept in an index-organized
+-- table ordered by (resource, day, start), so a conflict check is a
+-- range scan of one room's or professor's day, whatever the number of
+-- seances in history. trg_check_seance_overlap used to count over the
+-- whole seance table (joined to prof_course) twice per insert.
+CREATE TABLE seance_occupancy (
+    resource_type VARCHAR2(4) NOT NULL,
+    resource_key VARCHAR2(50) NOT NULL,
+    seance_date DATE NOT NULL,
+    start_time TIMESTAMP NOT NULL,
+    seance_id NUMBER NOT NULL,
+    end_time TIMESTAMP NOT NULL,
+    CONSTRAINT pk_seance_occupancy PRIMARY KEY (resource_type, resource_key, seance_date, start_time, seance_id),
+    CONSTRAINT chk_occupancy_resource CHECK (resource_type IN ('ROOM','PROF')),
+    CONSTRAINT fk_occupancy_seance
+        FOREIGN KEY (seance_id)
+        REFERENCES seance(seance_id)
+        ON DELETE CASCADE
+) ORGANIZATION INDEX;
+
+CREATE INDEX idx_occupancy_seance ON seance_occupancy(seance_id);
+CREATE INDEX idx_seance_course ON seance(course_id);
+
+-- Replaces the COUNT(*) version: checks the new seance's slots against the
+-- occupancy of its room and professors that day, then records them.
+CREATE OR REPLACE TRIGGER trg_check_seance_overlap
+AFTER INSERT OR UPDATE OF course_id, seance_date, start_time, end_time, room ON seance
+FOR EACH ROW
+DECLARE
+    v_conflict NUMBER;
+BEGIN
+    IF UPDATING THEN
+        DELETE FROM seance_occupancy WHERE seance_id = :NEW.seance_id;
+    END IF;
+
+    IF :NEW.start_time IS NULL OR :NEW.end_time IS NULL THEN
+        RETURN; -- Not scheduled yet: occupies nothing
+    END IF;
+
+    SELECT COUNT(*)
+    INTO v_conflict
+    FROM prof_course pc
+    JOIN seance_occupancy o
+        ON o.resource_type = 'PROF'
+       AND o.resource_key = TO_CHAR(pc.prof_id)
+       AND o.seance_date = :NEW.seance_date
+       AND o.start_time < :NEW.end_time
+       AND o.end_time > :NEW.start_time
+    WHERE pc.course_id = :NEW.course_id
+      AND ROWNUM = 1;
+
+    IF v_conflict > 0 THEN
+        RAISE_APPLICATION_ERROR(-20010, 'Professor has a time conflict with another session.');
+    END IF;
+
+    IF :NEW.room IS NOT NULL THEN
+        SELECT COUNT(*)
+        INTO v_conflict
+        FROM seance_occupancy o
+        WHERE o.resource_type = 'ROOM'
+          AND o.resource_key = :NEW.room
+          AND o.seance_date = :NEW.seance_date
+          AND o.start_time < :NEW.end_time
+          AND o.end_time > :NEW.start_time
+          AND ROWNUM = 1;
+
+        IF v_conflict > 0 THEN
+            RAISE_APPLICATION_ERROR(-20011, 'Room is already booked for an overlapping time slot on this day.');
+        END IF;
+
+        INSERT INTO seance_occupancy (resource_type, resource_key, seance_date, start_time, seance_id, end_time)
+        VALUES ('ROOM', :NEW.room, :NEW.seance_date, :NEW.start_time, :NEW.seance_id, :NEW.end_time);
+    END IF;
+
+    INSERT INTO seance_occupancy (resource_type, resource_key, seance_date, start_time, seance_id, end_time)
+    SELECT 'PROF', TO_CHAR(pc.prof_id), :NEW.seance_date, :NEW.start_time, :NEW.seance_id, :NEW.end_time
+    FROM prof_course pc
+    WHERE pc.course_id = :NEW.course_id;
+END;
+/
+
+-- A professor assigned to (or removed from) a course takes (or frees) the
+-- slots of the course's seances. Each slot is checked against the
+-- professor's day first (including the slots taken just before it), as
+-- trg_check_seance_overlap does for a new seance.
+CREATE OR REPLACE TRIGGER trg_prof_course_occupancy
+AFTER INSERT OR DELETE ON prof_course
+FOR EACH ROW
+DECLARE
+    v_conflict NUMBER;
+BEGIN
+    IF INSERTING THEN
+        FOR s IN (
+            SELECT seance_id, seance_date, start_time, end_time
+            FROM seance
+            WHERE course_id = :NEW.course_id
+              AND start_time IS NOT NULL
+              AND end_time IS NOT NULL
+        ) LOOP
+            SELECT COUNT(*)
+            INTO v_conflict
+            FROM seance_occupancy o
+            WHERE o.resource_type = 'PROF'
+              AND o.resource_key = TO_CHAR(:NEW.prof_id)
+              AND o.seance_date = s.seance_date
+              AND o.start_time < s.end_time
+              AND o.end_time > s.start_time
+              AND ROWNUM = 1;
+
+            IF v_conflict > 0 THEN
+                RAISE_APPLICATION_ERROR(-20010, 'Professor has a time conflict with another session.');
+            END IF;
+
+            INSERT INTO seance_occupancy (resource_type, resource_key, seance_date, start_time, seance_id, end_time)
+            VALUES ('PROF', TO_CHAR(:NEW.prof_id), s.seance_date, s.start_time, s.seance_id, s.end_time);
+        END LOOP;
+    ELSE
+        DELETE FROM seance_occupancy
+        WHERE resource_type = 'PROF'
+          AND resource_key = TO_CHAR(:OLD.prof_id)
+          AND seance_id IN (SELECT seance_id FROM seance WHERE course_id = :OLD.course_id);
+    END IF;
+END;
+/
+
+-- Slots of the existing seances.
+INSERT INTO seance_occupancy (resource_type, resource_key, seance_date, start_time, seance_id, end_time)
+SELECT 'ROOM', s.room, s.seance_date, s.start_time, s.seance_id, s.end_time
+FROM seance s
+WHERE s.room IS NOT NULL AND s.start_time IS NOT NULL AND s.end_time IS NOT NULL;
+INSERT INTO seance_occupancy (resource_type, resource_key, seance_date, start_time, seance_id, end_time)
+SELECT 'PROF', TO_CHAR(pc.prof_id), s.seance_date, s.start_time, s.seance_id, s.end_time
+FROM seance s
+JOIN prof_course pc ON pc.course_id = s.course_id
+WHERE s.start_time IS NOT NULL AND s.end_time IS NOT NULL;
+COMMIT;
+-- =================================================================
+-- Absence State
+-- =================================================================
+-- absence_state keeps, per (student, course), the current run of
+-- consecutive ABSENT marks (in seance order), the latest marked seance,
+-- the last unblock and whether the student is blocked. Marking the next
+-- seance updates it in O(1); only a correction of an older mark (rare)
+-- recomputes the pair from its history, once per statement. It replaces
+-- trg_3_consecutive_absences and trg_block_after_3_absences, which both
+-- rescanned the student's attendance for every ABSENT row. The two also
+-- worked against each other: the -20210 of the second rolled back the
+-- FAILED set by the first, so the third absence could never be recorded.
+-- Now the third consecutive absence is recorded and blocks the student
+-- (course_result FAILED); a further absence is refused until the unblock.
+BEGIN EXECUTE IMMEDIATE 'DROP TRIGGER trg_3_consecutive_absences'; EXCEPTION WHEN OTHERS THEN IF SQLCODE != -4080 THEN RAISE; END IF; END;
+/
+BEGIN EXECUTE IMMEDIATE 'DROP TRIGGER trg_block_after_3_absences'; EXCEPTION WHEN OTHERS THEN IF SQLCODE != -4080 THEN RAISE; END IF; END;
+/
+
+CREATE TABLE absence_state (
+    student_id NUMBER NOT NULL,
+    course_id NUMBER NOT NULL,
+    streak NUMBER DEFAULT 0 NOT NULL,
+    last_seance_id NUMBER,
+    last_mark_time TIMESTAMP,
+    last_unblock DATE,
+    blocked CHAR(1) DEFAULT 'N' NOT NULL,
+    CONSTRAINT pk_absence_state PRIMARY KEY (student_id, course_id),
+    CONSTRAINT chk_absence_blocked CHECK (blocked IN ('Y','N')),
+    CONSTRAINT fk_absence_state_student
+        FOREIGN KEY (student_id)
+        REFERENCES student(student_id),
+    CONSTRAINT fk_absence_state_course
+        FOREIGN KEY (course_id)
+        REFERENCES course(course_id)
+        ON DELETE CASCADE
+) ORGANIZATION INDEX;
+
+-- The state as computed from the history: marks (any status but PLANNED)
+-- made after the last unblock, ordered by seance start, latest first; the
+-- streak is the number of ABSENT marks before the latest other one. The
+-- last unblock is read from absence_state, not unblock_request, so the
+-- recompute can run from the unblock trigger itself.
+CREATE OR REPLACE VIEW v_absence_streak AS
+SELECT
+    student_id,
+    course_id,
+    NVL(MIN(CASE WHEN status <> 'ABSENT' THEN rn END), COUNT(*) + 1) - 1 AS streak,
+    MAX(CASE WHEN rn = 1 THEN seance_id END) AS last_seance_id,
+    MAX(CASE WHEN rn = 1 THEN mark_time END) AS last_mark_time
+FROM (
+    SELECT
+        a.student_id, s.course_id, a.status, s.seance_id,
+        NVL(s.start_time, CAST(s.seance_date AS TIMESTAMP)) AS mark_time,
+        ROW_NUMBER() OVER (
+            PARTITION BY a.student_id, s.course_id
+            ORDER BY NVL(s.start_time, CAST(s.seance_date AS TIMESTAMP)) DESC, s.seance_id DESC
+        ) AS rn
+    FROM attendance a
+    JOIN seance s ON s.seance_id = a.seance_id
+    LEFT JOIN absence_state st
+        ON st.student_id = a.student_id
+       AND st.course_id = s.course_id
+    WHERE a.status <> 'PLANNED'
+      AND (st.last_unblock IS NULL OR a.marked_at > st.last_unblock)
+)
+GROUP BY student_id, course_id;
+
+-- Recomputes the streak of one (student, course) since its last unblock.
+-- The blocked flag is left alone: only an unblock clears it.
+CREATE OR REPLACE PROCEDURE sp_refresh_absence_state (
+    p_student_id IN NUMBER,
+    p_course_id  IN NUMBER
+)
+IS
+BEGIN
+    MERGE INTO absence_state st
+    USING (
+        SELECT p_student_id AS student_id, p_course_id AS course_id,
+               NVL(v.streak, 0) AS streak, v.last_seance_id, v.last_mark_time
+        FROM dual
+        LEFT JOIN v_absence_streak v
+            ON v.student_id = p_student_id
+           AND v.course_id = p_course_id
+    ) src
+    ON (st.student_id = src.student_id AND st.course_id = src.course_id)
+    WHEN MATCHED THEN
+        UPDATE SET st.streak = src.streak,
+                   st.last_seance_id = src.last_seance_id,
+                   st.last_mark_time = src.last_mark_time
+    WHEN NOT MATCHED THEN
+        INSERT (student_id, course_id, streak, last_seance_id, last_mark_time)
+        VALUES (src.student_id, src.course_id, src.streak, src.last_seance_id, src.last_mark_time);
+END sp_refresh_absence_state;
+/
+
+CREATE OR REPLACE TRIGGER trg_absence_state
+FOR INSERT OR UPDATE OF status ON attendance
+COMPOUND TRIGGER
+
+    -- 'student_id:course_id' of the states to recompute after the statement.
+    TYPE StalePairs_tab IS TABLE OF PLS_INTEGER INDEX BY VARCHAR2(50);
+    g_stale StalePairs_tab;
+
+    PROCEDURE block_if_needed(p_student_id NUMBER, p_course_id NUMBER) IS
+        v_streak  absence_state.streak%TYPE;
+        v_blocked absence_state.blocked%TYPE;
+    BEGIN
+        SELECT streak, blocked INTO v_streak, v_blocked
+        FROM absence_state
+        WHERE student_id = p_student_id AND course_id = p_course_id;
+
+        IF v_streak >= 3 AND v_blocked = 'N' THEN
+            UPDATE absence_state
+            SET blocked = 'Y'
+            WHERE student_id = p_student_id AND course_id = p_course_id;
+
+            UPDATE course_result
+            SET status = 'FAILED'
+            WHERE student_id = p_student_id
+              AND course_id = p_course_id;
+        END IF;
+    END block_if_needed;
+
+    AFTER EACH ROW IS
+        v_course_id seance.course_id%TYPE;
+        v_mark_time TIMESTAMP;
+        v_state     absence_state%ROWTYPE;
+    BEGIN
+        -- New PLANNED rows (accepted requests) and unchanged statuses cost nothing.
+        IF :NEW.status <> NVL(:OLD.status, 'PLANNED') THEN
+            SELECT course_id, NVL(start_time, CAST(seance_date AS TIMESTAMP))
+            INTO v_course_id, v_mark_time
+            FROM seance
+            WHERE seance_id = :NEW.seance_id;
+
+            BEGIN
+                INSERT INTO absence_state (student_id, course_id) VALUES (:NEW.student_id, v_course_id);
+            EXCEPTION
+                WHEN DUP_VAL_ON_INDEX THEN NULL;
+            END;
+
+            SELECT * INTO v_state
+            FROM absence_state
+            WHERE student_id = :NEW.student_id AND course_id = v_course_id
+            FOR UPDATE;
+
+            IF :NEW.status = 'ABSENT' AND v_state.blocked = 'Y' THEN
+                RAISE_APPLICATION_ERROR(
+                    -20210,
+                    'Étudiant bloqué : 3 absences consécutives (non justifiées)'
+                );
+            END IF;
+
+            IF NVL(:OLD.status, 'PLANNED') = 'PLANNED'
+               AND (v_state.last_mark_time IS NULL
+                    OR v_mark_time > v_state.last_mark_time
+                    OR (v_mark_time = v_state.last_mark_time AND :NEW.seance_id > v_state.last_seance_id)) THEN
+                -- First mark of a seance later than all the others: O(1) update.
+                UPDATE absence_state
+                SET streak = CASE WHEN :NEW.status = 'ABSENT' THEN streak + 1 ELSE 0 END,
+                    last_seance_id = :NEW.seance_id,
+                    last_mark_time = v_mark_time
+                WHERE student_id = :NEW.student_id AND course_id = v_course_id;
+
+                block_if_needed(:NEW.student_id, v_course_id);
+            ELSE
+                -- Correction of an earlier mark: recomputed from the history after the statement.
+                g_stale(:NEW.student_id || ':' || v_course_id) := 1;
+            END IF;
+        END IF;
+    END AFTER EACH ROW;
+
+    AFTER STATEMENT IS
+        v_pair       VARCHAR2(50) := g_stale.FIRST;
+        v_student_id NUMBER;
+        v_course_id  NUMBER;
+    BEGIN
+        WHILE v_pair IS NOT NULL LOOP
+            v_student_id := TO_NUMBER(SUBSTR(v_pair, 1, INSTR(v_pair, ':') - 1));
+            v_course_id := TO_NUMBER(SUBSTR(v_pair, INSTR(v_pair, ':') + 1));
+            sp_refresh_absence_state(v_student_id, v_course_id);
+            block_if_needed(v_student_id, v_course_id);
+            v_pair := g_stale.NEXT(v_pair);
+        END LOOP;
+    END AFTER STATEMENT;
+
+END;
+/
+
+-- Same justification of the last 3 absences as before, and the unblock now
+-- also resets the state.
+CREATE OR REPLACE TRIGGER trg_justify_absences_after_unblock
+AFTER INSERT ON unblock_request
+FOR EACH ROW
+BEGIN
+    UPDATE attendance a
+    SET a.status = 'ABSENT AVEC JUSTIFICATION'
+    WHERE a.student_id = :NEW.student_id
+      AND a.status = 'ABSENT'
+      AND a.seance_id IN (
+          SELECT seance_id
+          FROM (
+              SELECT se.seance_id
+              FROM attendance at
+              JOIN seance se ON se.seance_id = at.seance_id
+              WHERE at.student_id = :NEW.student_id
+                AND at.status = 'ABSENT'
+                AND se.course_id = :NEW.course_id
+              ORDER BY se.seance_date DESC, se.start_time DESC
+          )
+          WHERE ROWNUM <= 3
+      );
+
+    MERGE INTO absence_state st
+    USING (SELECT :NEW.student_id AS student_id, :NEW.course_id AS course_id, :NEW.unblock_date AS unblock_date FROM dual) src
+    ON (st.student_id = src.student_id AND st.course_id = src.course_id)
+    WHEN MATCHED THEN
+        UPDATE SET st.streak = 0, st.blocked = 'N', st.last_unblock = src.unblock_date
+    WHEN NOT MATCHED THEN
+        INSERT (student_id, course_id, last_unblock) VALUES (src.student_id, src.course_id, src.unblock_date);
+END;
+/
+
+-- Rebuilds every state from attendance (after manual data fixes). The
+-- last unblocks go in first so the streaks only count the marks made
+-- after them; a student is blocked when that streak is 3 or more, as in
+-- trg_absence_state, and the course is FAILED the same way.
+-- The table lock holds the marks in flight until the states are committed.
+-- p_rows returns the number of states.
+CREATE OR REPLACE PROCEDURE sp_rebuild_absence_state (
+    p_rows OUT NUMBER
+)
+IS
+BEGIN
+    LOCK TABLE absence_state IN EXCLUSIVE MODE;
+
+    DELETE FROM absence_state;
+
+    INSERT INTO absence_state (student_id, course_id, last_unblock)
+    SELECT student_id, course_id, MAX(unblock_date)
+    FROM unblock_request
+    GROUP BY student_id, course_id;
+
+    MERGE INTO absence_state st
+    USING (SELECT * FROM v_absence_streak) v
+    ON (st.student_id = v.student_id AND st.course_id = v.course_id)
+    WHEN MATCHED THEN
+        UPDATE SET st.streak = v.streak,
+                   st.last_seance_id = v.last_seance_id,
+                   st.last_mark_time = v.last_mark_time,
+                   st.blocked = CASE WHEN v.streak >= 3 THEN 'Y' ELSE 'N' END
+    WHEN NOT MATCHED THEN
+        INSERT (student_id, course_id, streak, last_seance_id, last_mark_time, blocked)
+        VALUES (v.student_id, v.course_id, v.streak, v.last_seance_id, v.last_mark_time,
+                CASE WHEN v.streak >= 3 THEN 'Y' ELSE 'N' END);
+
+    UPDATE course_result cr
+    SET cr.status = 'FAILED'
+    WHERE cr.status <> 'FAILED'
+      AND EXISTS (
+          SELECT 1 FROM absence_state st
+          WHERE st.student_id = cr.student_id
+            AND st.course_id = cr.course_id
+            AND st.blocked = 'Y'
+      );
+
+    SELECT COUNT(*) INTO p_rows FROM absence_state;
+    COMMIT;
+END sp_rebuild_absence_state;
+/
+
+-- Fills the states for the existing attendance.
+DECLARE
+    v_rows NUMBER;
+BEGIN
+    sp_rebuild_absence_state(v_rows);
+END;
+/
+-- =================================================================
+-- Lazy Attendance
+-- =================================================================
+-- Attendance rows are no longer created for every seance of a course
+-- when a request is accepted (trg_accept_inscription_init_attendance
+-- wrote students x seances PLANNED rows at once, most of them untouched
+-- until the day of the seance). A row is created when the student is
+-- first marked (MERGE from the roster); until then the student's status
+-- for the seance is PLANNED. v_seance_roster gives that status for every
+-- enrolled student, and the attendance views read it.
+BEGIN EXECUTE IMMEDIATE 'DROP TRIGGER trg_accept_inscription_init_attendance'; EXCEPTION WHEN OTHERS THEN IF SQLCODE != -4080 THEN RAISE; END IF; END;
+/
+
+-- Every (seance, student) expected or marked: the ACCEPTED students of the
+-- course, PLANNED when not marked yet, plus the marks of students whose
+-- request is no longer accepted.
+CREATE OR REPLACE VIEW v_seance_roster AS
+SELECT
+    se.seance_id,
+    se.course_id,
+    ir.student_id,
+    NVL(a.status, 'PLANNED') AS status
+FROM seance se
+JOIN inscription_request ir
+    ON ir.course_id = se.course_id
+   AND ir.status = 'ACCEPTED'
+LEFT JOIN attendance a
+    ON a.seance_id = se.seance_id
+   AND a.student_id = ir.student_id
+UNION ALL
+SELECT
+    se.seance_id,
+    se.course_id,
+    a.student_id,
+    a.status
+FROM attendance a
+JOIN seance se ON se.seance_id = a.seance_id
+WHERE NOT EXISTS (
+    SELECT 1 FROM inscription_request ir
+    WHERE ir.student_id = a.student_id
+      AND ir.course_id = se.course_id
+      AND ir.status = 'ACCEPTED'
+);
+
+CREATE OR REPLACE FUNCTION fn_students_in_seance (
+    p_seance_id IN NUMBER
+) RETURN SYS_REFCURSOR
+IS
+    rc SYS_REFCURSOR;
+BEGIN
+    OPEN rc FOR
+        SELECT
+            st.student_id,
+            st.full_name,
+            r.status
+        FROM v_seance_roster r
+        JOIN student st ON st.student_id = r.student_id
+        WHERE r.seance_id = p_seance_id;
+    RETURN rc;
+END;
+/
+
+-- Seances of the courses of the student's semester, with the student's
+-- status: PLANNED until marked in the courses they are accepted in, NULL
+-- in the others.
+CREATE OR REPLACE FUNCTION fn_student_seances (
+    p_student_id IN NUMBER
+) RETURN SYS_REFCURSOR
+IS
+    rc SYS_REFCURSOR;
+BEGIN
+    OPEN rc FOR
+        SELECT
+            c.name AS course_name,
+            se.seance_id,
+            se.seance_date,
+            se.start_time,
+            se.end_time,
+            se.type,
+            r.status
+        FROM student st
+        JOIN course c
+            ON c.semestre_id = st.current_semestre_id
+        JOIN seance se
+            ON se.course_id = c.course_id
+        LEFT JOIN v_seance_roster r
+            ON r.seance_id = se.seance_id
+           AND r.student_id = st.student_id
+        WHERE st.student_id = p_student_id;
+    RETURN rc;
+END;
+/
+
+CREATE OR REPLACE VIEW v_course_attendance_rate AS
+SELECT
+    c.name AS course,
+    ROUND(
+        SUM(CASE WHEN r.status = 'PRESENT' THEN 1 ELSE 0 END)
+        / COUNT(r.student_id) * 100, 2
+    ) AS attendance_rate
+FROM v_seance_roster r
+JOIN course c ON c.course_id = r.course_id
+GROUP BY c.name;
+
+CREATE OR REPLACE VIEW v_student_attendance AS
+SELECT
+    r.student_id,
+    c.name        AS course_name,
+    se.seance_date,
+    se.type,
+    r.status
+FROM v_seance_roster r
+JOIN seance se
+    ON se.seance_id = r.seance_id
+JOIN course c
+    ON c.course_id = r.course_id;
+
+CREATE OR REPLACE VIEW v_student_absence_stats AS
+SELECT
+    r.student_id,
+    c.name AS course_name,
+    COUNT(*) AS total_seances,
+    SUM(CASE WHEN r.status = 'ABSENT' THEN 1 ELSE 0 END) AS absences
+FROM v_seance_roster r
+JOIN course c
+    ON c.course_id = r.course_id
+GROUP BY r.student_id, c.name;
+
+CREATE OR REPLACE VIEW v_prof_attendance_by_seance AS
+SELECT
+    p.prof_id,
+    r.seance_id,
+    c.name        AS course_name,
+    st.student_id,
+    st.full_name,
+    r.status
+FROM prof p
+JOIN prof_course pc     ON pc.prof_id = p.prof_id
+JOIN course c           ON c.course_id = pc.course_id
+JOIN v_seance_roster r  ON r.course_id = c.course_id
+JOIN student st         ON st.student_id = r.student_id;
+
+CREATE OR REPLACE VIEW v_prof_absence_stats AS
+SELECT
+    p.prof_id,
+    c.name AS course_name,
+    COUNT(*) AS total_records,
+    SUM(CASE WHEN r.status = 'ABSENT' THEN 1 ELSE 0 END) AS total_absences
+FROM prof p
+JOIN prof_course pc     ON pc.prof_id = p.prof_id
+JOIN course c           ON c.course_id = pc.course_id
+JOIN v_seance_roster r  ON r.course_id = c.course_id
+GROUP BY p.prof_id, c.name;
+
+-- The PLANNED rows written by the old trigger: the roster shows the same
+-- status without them.
+DELETE FROM attendance WHERE status = 'PLANNED';
+COMMIT;
+-- =================================================================
+-- Dashboard Statistics Snapshots
+-- =================================================================
+-- The admin Statistics tab used to count students, profs, courses and
+-- FAILED results (without an index on status) on every rerun. The counts
+-- are now taken by sp_refresh_dashboard_stats, every 5 minutes from the
+-- scheduler job below or on demand, and stored as one timestamped row per
+-- refresh. v_dashboard_stats reads the latest row; the older rows give
+-- the trend. refresh_ms records how long each refresh took.
+CREATE INDEX idx_course_result_status ON course_result(status);
+
+CREATE TABLE dashboard_stats_snapshot (
+    snapshot_id NUMBER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    taken_at TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL,
+    total_students NUMBER NOT NULL,
+    total_profs NUMBER NOT NULL,
+    total_courses NUMBER NOT NULL,
+    blocked_students NUMBER NOT NULL,
+    refresh_ms NUMBER(10,1)
+);
+
+CREATE INDEX idx_dashboard_stats_taken ON dashboard_stats_snapshot(taken_at);
+
+-- Takes a snapshot and drops the ones older than p_keep_days.
+-- p_refresh_ms returns the time spent counting.
+CREATE OR REPLACE PROCEDURE sp_refresh_dashboard_stats (
+    p_keep_days  IN NUMBER DEFAULT 90,
+    p_refresh_ms OUT NUMBER
+)
+IS
+    v_started  TIMESTAMP := SYSTIMESTAMP;
+    v_elapsed  INTERVAL DAY TO SECOND;
+    v_students NUMBER;
+    v_profs    NUMBER;
+    v_courses  NUMBER;
+    v_blocked  NUMBER;
+BEGIN
+    SELECT COUNT(*) INTO v_students FROM student;
+    SELECT COUNT(*) INTO v_profs FROM prof;
+    SELECT COUNT(*) INTO v_courses FROM course;
+    -- Same count as before (FAILED results of existing students), now on idx_course_result_status.
+    SELECT COUNT(*) INTO v_blocked FROM course_result WHERE status = 'FAILED';
+
+    v_elapsed := SYSTIMESTAMP - v_started;
+    p_refresh_ms := ROUND(
+        EXTRACT(HOUR FROM v_elapsed) * 3600000
+        + EXTRACT(MINUTE FROM v_elapsed) * 60000
+        + EXTRACT(SECOND FROM v_elapsed) * 1000, 1
+    );
+
+    INSERT INTO dashboard_stats_snapshot (taken_at, total_students, total_profs, total_courses, blocked_students, refresh_ms)
+    VALUES (v_started, v_students, v_profs, v_courses, v_blocked, p_refresh_ms);
+
+    DELETE FROM dashboard_stats_snapshot
+    WHERE taken_at < SYSTIMESTAMP - NUMTODSINTERVAL(p_keep_days, 'DAY');
+
+    COMMIT;
+END sp_refresh_dashboard_stats;
+/
+
+CREATE OR REPLACE VIEW v_dashboard_stats AS
+SELECT
+    total_students,
+    total_profs,
+    total_courses,
+    blocked_students,
+    taken_at AS refreshed_at,
+    refresh_ms
+FROM dashboard_stats_snapshot
+ORDER BY snapshot_id DESC
+FETCH FIRST 1 ROW ONLY;
+
+-- First snapshot, then one every 5 minutes. Run durations are also in
+-- USER_SCHEDULER_JOB_RUN_DETAILS.
+DECLARE
+    v_refresh_ms NUMBER;
+BEGIN
+    sp_refresh_dashboard_stats(p_refresh_ms => v_refresh_ms);
+END;
+/
+BEGIN DBMS_SCHEDULER.DROP_JOB('job_refresh_dashboard_stats'); EXCEPTION WHEN OTHERS THEN IF SQLCODE != -27475 THEN RAISE; END IF; END;
+/
+BEGIN
+    DBMS_SCHEDULER.CREATE_JOB(
+        job_name        => 'job_refresh_dashboard_stats',
+        job_type        => 'PLSQL_BLOCK',
+        job_action      => 'DECLARE v_refresh_ms NUMBER; BEGIN sp_refresh_dashboard_stats(p_refresh_ms => v_refresh_ms); END;',
+        repeat_interval => 'FREQ=MINUTELY;INTERVAL=5',
+        enabled         => TRUE,
+        comments        => 'Snapshot of the admin dashboard statistics (v_dashboard_stats).'
+    );
+END;
+/
@@ -1,11 +1,96 @@
 # db_utils.py
+import atexit
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
 import oracledb
 import pandas as pd
 import streamlit as st
 import random
-from config import ORACLE_DSN, APP_USERS
+from config import (
+    ORACLE_DSN, APP_USERS, DEFAULT_POOL_SETTINGS, QUERY_CACHE_SETTINGS, PARALLEL_QUERY_SETTINGS,
+    PERF_MONITOR_SETTINGS, ORACLE_CLIENT_SETTINGS, DRCP_SETTINGS, DASHBOARD_STATS_SETTINGS
+)
+import query_cache
+from query_cache import QUERY_CACHE
+from passwords import hash_password
+from perf_monitor import PERF_MONITOR
 
-# --- New Per-Role Connection Management ---
+# pyarrow is optional: with it (and python-oracledb 2.4+), columnar reads are
+# fetched straight into Arrow buffers; without it they use the numpy fallback.
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# --- Process-wide Per-Role Connection Management ---
+# One pool per role is shared by every browser session served by this
+# process. Pools live at module level (not in st.session_state) so that
+# 400 students logging in still share the same STUDENT pool.
+_POOLS = {}
+_POOL_GATES = {}
+_POOLS_LOCK = threading.Lock()
+
+_GETMODES = {
+    "wait": oracledb.POOL_GETMODE_WAIT,
+    "nowait": oracledb.POOL_GETMODE_NOWAIT,
+    "timedwait": oracledb.POOL_GETMODE_TIMEDWAIT,
+    "forceget": oracledb.POOL_GETMODE_FORCEGET,
+}
+
+# Errors raised by pool.acquire() when no session became free in time
+# (thin mode, then thick mode timed wait / no wait).
+_POOL_EXHAUSTED_CODES = {"DPY-4005", "ORA-24496", "ORA-24459", "ORA-24418"}
+
+class SystemBusyError(Exception):
+    """Raised when a role's pool is saturated: too many callers waiting, or the wait timed out."""
+    def __init__(self, role):
+        super().__init__("The system is busy right now. Please try again in a few seconds.")
+        self.role = role
+
+class _PoolGate:
+    """Admission control in front of one role's pool, plus its acquire-wait statistics."""
+
+    def __init__(self, max_waiters, samples=1000):
+        self.max_waiters = max_waiters
+        self.waiters = 0
+        self.acquires = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.waits_ms = deque(maxlen=samples)
+        self.lock = threading.Lock()
+
+    def acquire(self, pool, role):
+        """Acquires a connection, or raises SystemBusyError. Returns (connection, wait_seconds)."""
+        with self.lock:
+            # Only a saturated pool makes callers queue; refuse them past the cap.
+            if pool.busy >= pool.max and self.waiters >= self.max_waiters:
+                self.rejected += 1
+                raise SystemBusyError(role)
+            self.waiters += 1
+
+        start = time.perf_counter()
+        try:
+            connection = pool.acquire()
+        except oracledb.DatabaseError as e:
+            error_obj, = e.args
+            if error_obj.full_code in _POOL_EXHAUSTED_CODES:
+                with self.lock:
+                    self.timeouts += 1
+                raise SystemBusyError(role) from e
+            raise
+        finally:
+            with self.lock:
+                self.waiters -= 1
+
+        wait = time.perf_counter() - start
+        with self.lock:
+            self.acquires += 1
+            self.waits_ms.append(wait * 1000)
+        return connection, wait
 
 def get_credentials_for_role(role: str) -> tuple[str, str]:
     """Gets the database username and password for a given application role."""
@@ -14,52 +99,313 @@ def get_credentials_for_role(role: str) -> tuple[str, str]:
         raise ValueError(f"No database credentials found for role: {role}")
     return role_creds["user"], role_creds["pass"]
 
-def get_db_pool():
+def get_pool_settings(role: str) -> dict:
+    """Gets the pool sizing for a role: the defaults overridden by APP_USERS[role]['pool']."""
+    settings = dict(DEFAULT_POOL_SETTINGS)
+    settings.update(APP_USERS.get(role, {}).get("pool", {}))
+    return settings
+
+_PURITIES = {"self": oracledb.PURITY_SELF, "new": oracledb.PURITY_NEW}
+
+def init_client_mode():
+    """Loads the Oracle Client libraries once when thick mode is configured. No-op in thin mode."""
+    if ORACLE_CLIENT_SETTINGS["thick_mode"] and oracledb.is_thin_mode():
+        oracledb.init_oracle_client(
+            lib_dir=ORACLE_CLIENT_SETTINGS["lib_dir"],
+            config_dir=ORACLE_CLIENT_SETTINGS["config_dir"]
+        )
+        print("python-oracledb running in thick mode.")
+
+def _drcp_connect_params(role: str) -> dict:
+    """The connect parameters that route a role's sessions through DRCP."""
+    return {
+        "server_type": "pooled",
+        "cclass": f"{DRCP_SETTINGS['cclass']}_{role}",
+        "purity": _PURITIES[DRCP_SETTINGS["purity"]]
+    }
+
+def get_current_role() -> str:
+    """Gets the role of the logged-in user, defaulting to 'AUTH' before login."""
+    return st.session_state.get('user_info', {}).get('ROLE', 'AUTH')
+
+def get_db_pool(role=None):
     """
-    Dynamically gets or creates a connection pool based on the user's role.
-    The role is determined from the session_state.
+    Gets the process-wide connection pool for a role, creating it on first use.
+    When no role is given, it is determined from the session_state.
     """
-    # Default to the 'AUTH' role if no user is logged in yet.
-    user_role = st.session_state.get('user_info', {}).get('ROLE', 'AUTH')
+    role = role or get_current_role()
+
+    pool = _POOLS.get(role)
+    if pool is not None:
+        return pool
+
+    with _POOLS_LOCK:
+        # Another session may have created the pool while we were waiting.
+        if role not in _POOLS:
+            try:
+                init_client_mode()
+                user, password = get_credentials_for_role(role)
+                settings = get_pool_settings(role)
+                drcp_params = _drcp_connect_params(role) if DRCP_SETTINGS["enabled"] else {}
+                print(f"Creating shared connection pool for role: {role} (DB User: {user}, "
+                      f"min={settings['min']}, max={settings['max']}, getmode={settings['getmode']}, "
+                      f"server={'DRCP ' + drcp_params['cclass'] if drcp_params else 'dedicated'})")
 
-    # Initialize the dictionary of pools if it doesn't exist.
-    if 'db_pools' not in st.session_state:
-        st.session_state.db_pools = {}
+                _POOLS[role] = oracledb.create_pool(
+                    user=user,
+                    password=password,
+                    dsn=ORACLE_DSN,
+                    min=settings["min"],
+                    max=settings["max"],
+                    increment=settings["increment"],
+                    timeout=settings["timeout"],
+                    getmode=_GETMODES[settings["getmode"]],
+                    wait_timeout=settings["wait_timeout"],
+                    **drcp_params
+                )
+                _POOL_GATES[role] = _PoolGate(settings["max_waiters"])
+            except Exception as e:
+                st.error(f"Fatal: Could not create database connection pool for role '{role}'. Error: {e}")
+                st.stop()
 
-    # If a pool for the current role doesn't exist, create it.
-    if user_role not in st.session_state.db_pools:
+    return _POOLS[role]
+
+def close_db_pools():
+    """Closes every open pool. Registered to run when the server process shuts down."""
+    with _POOLS_LOCK:
+        for role, pool in list(_POOLS.items()):
+            try:
+                pool.close(force=True)
+                print(f"Closed connection pool for role: {role}")
+            except Exception as e:
+                print(f"Warning: Could not close connection pool for role '{role}'. Error: {e}")
+        _POOLS.clear()
+        _POOL_GATES.clear()
+
+atexit.register(close_db_pools)
+
+def get_pool_metrics():
+    """
+    Snapshot of every open pool: occupancy, callers waiting, admission rejections,
+    acquire timeouts and acquire-wait percentiles (over the latest acquires).
+    """
+    rows = []
+    for role, pool in list(_POOLS.items()):
+        gate = _POOL_GATES.get(role)
+        if gate is None:
+            continue
+        with gate.lock:
+            waits = np.fromiter(gate.waits_ms, dtype=float)
+            waiters, acquires = gate.waiters, gate.acquires
+            rejected, timeouts, max_waiters = gate.rejected, gate.timeouts, gate.max_waiters
+        p50, p95, p99 = np.percentile(waits, [50, 95, 99]) if len(waits) else (0.0, 0.0, 0.0)
+        rows.append({
+            "ROLE": role,
+            "OPENED": pool.opened,
+            "BUSY": pool.busy,
+            "MIN": pool.min,
+            "MAX": pool.max,
+            "USAGE_PCT": round(100 * pool.busy / pool.max, 1) if pool.max else 0.0,
+            "WAITERS": waiters,
+            "MAX_WAITERS": max_waiters,
+            "ACQUIRES": acquires,
+            "REJECTED": rejected,
+            "TIMEOUTS": timeouts,
+            "WAIT_P50_MS": round(float(p50), 1),
+            "WAIT_P95_MS": round(float(p95), 1),
+            "WAIT_P99_MS": round(float(p99), 1),
+            "WAIT_MAX_MS": round(float(waits.max()), 1) if len(waits) else 0.0
+        })
+    columns = ["ROLE", "OPENED", "BUSY", "MIN", "MAX", "USAGE_PCT", "WAITERS", "MAX_WAITERS", "ACQUIRES",
+               "REJECTED", "TIMEOUTS", "WAIT_P50_MS", "WAIT_P95_MS", "WAIT_P99_MS", "WAIT_MAX_MS"]
+    return pd.DataFrame(rows, columns=columns)
+
+# --- Call Instrumentation ---
+# Every call below goes through _monitored_connection, which times the pool
+# acquire and the call, records them in PERF_MONITOR and tags the session so
+# the same call can be found in V$SESSION / V$ACTIVE_SESSION_HISTORY.
+
+def get_current_client_id():
+    """Gets the login code of the logged-in user, used as the session CLIENT_IDENTIFIER."""
+    return st.session_state.get('user_info', {}).get('LOGIN_CODE')
+
+class _MonitoredCall:
+    """
+    The connection handed to a db_utils call, and the rows it reports back.
+    A call that hands control back to its caller mid-way (a generator) times
+    its database work itself with db_time(), and only that time is recorded.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = None
+        self.db_seconds = None
+
+    @contextmanager
+    def db_time(self):
+        start = time.perf_counter()
         try:
-            user, password = get_credentials_for_role(user_role)
-            print(f"Creating new connection pool for role: {user_role} (DB User: {user})")
-            
-            pool = oracledb.create_pool(
-                user=user,
-                password=password,
-                dsn=ORACLE_DSN,
-                min=2,
-                max=5,
-                increment=1
-            )
-            st.session_state.db_pools[user_role] = pool
-        except Exception as e:
-            st.error(f"Fatal: Could not create database connection pool for role '{user_role}'. Error: {e}")
-            st.stop()
-            
-    return st.session_state.db_pools[user_role]
+            yield
+        finally:
+            self.db_seconds = (self.db_seconds or 0.0) + time.perf_counter() - start
+
+@contextmanager
+def _monitored_connection(action, statement, role=None, client_id=None):
+    """
+    Acquires a connection from the role's pool for one db_utils call (`action`),
+    tags it with MODULE/ACTION/CLIENT_IDENTIFIER and records the elapsed time,
+    acquire wait and rows of `statement` in PERF_MONITOR when the block exits.
+    Uncommitted work is rolled back if the block raises.
+    """
+    role = role or get_current_role()
+    if client_id is None:
+        client_id = get_current_client_id() or ""
+    pool = get_db_pool(role)
+
+    start = time.perf_counter()
+    acquire_wait, call, failed = None, None, False
+    try:
+        connection, acquire_wait = _POOL_GATES[role].acquire(pool, role)
+        with connection:
+            # Sent with the next round-trip, so tagging costs nothing extra.
+            connection.module = PERF_MONITOR_SETTINGS["module"]
+            connection.action = action
+            connection.client_identifier = client_id
+            call = _MonitoredCall(connection)
+            try:
+                yield call
+            except Exception:
+                failed = True
+                connection.rollback()
+                raise
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if call is not None and call.db_seconds is not None:
+            elapsed = acquire_wait + call.db_seconds
+        PERF_MONITOR.record(
+            action, role, statement, elapsed,
+            acquire_wait if acquire_wait is not None else elapsed,
+            call.rows if call else None, failed
+        )
+
+# --- Columnar Fetch Helpers ---
+# Rows per round-trip for columnar reads, which are meant for large results.
+COLUMNAR_ARRAYSIZE = 5000
+
+_NUMERIC_DB_TYPES = {
+    oracledb.DB_TYPE_NUMBER, oracledb.DB_TYPE_BINARY_DOUBLE,
+    oracledb.DB_TYPE_BINARY_FLOAT, oracledb.DB_TYPE_BINARY_INTEGER
+}
+_DATETIME_DB_TYPES = {oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP}
+
+def arrow_fetch_available():
+    """True when python-oracledb can fetch directly into Arrow and pyarrow is installed."""
+    return pyarrow is not None and hasattr(oracledb.Connection, "fetch_df_all")
+
+def _frame_from_arrow(oracle_df):
+    """Converts a python-oracledb DataFrame to pandas through Arrow, without Python tuples."""
+    if hasattr(oracle_df, "__arrow_c_stream__"):
+        table = pyarrow.table(oracle_df)
+    else: # python-oracledb 2.x
+        table = pyarrow.Table.from_arrays(oracle_df.column_arrays(), names=oracle_df.column_names())
+    return table.to_pandas()
+
+def _typed_column(type_code, values):
+    """Converts one object column of fetched values to a numeric/datetime dtype where it can."""
+    if type_code in _NUMERIC_DB_TYPES:
+        return pd.to_numeric(values, errors="coerce")
+    if type_code in _DATETIME_DB_TYPES:
+        return pd.to_datetime(values)
+    return values
+
+def _frame_from_rows_columnar(description, rows):
+    """
+    Vectorized fallback for columnar reads: lays the fetched rows out once in a 2-D
+    object array and converts every column with a single vectorized call, giving
+    proper numeric and datetime dtypes instead of object columns.
+    """
+    columns = [col[0] for col in description]
+    if not rows or len(set(columns)) != len(columns):
+        return pd.DataFrame(rows, columns=columns)
+    matrix = np.array(rows, dtype=object)
+    if matrix.shape != (len(rows), len(columns)): # Nested values (collections, vectors)
+        return pd.DataFrame(rows, columns=columns)
+    data = {
+        col[0]: _typed_column(col[1], matrix[:, i])
+        for i, col in enumerate(description)
+    }
+    return pd.DataFrame(data, columns=columns)
+
+def _frame_from_cursor(cursor, columnar=False):
+    """Fetches every remaining row of an executed cursor into a DataFrame."""
+    if columnar:
+        cursor.arraysize = COLUMNAR_ARRAYSIZE
+    rows = cursor.fetchall()
+    if columnar:
+        return _frame_from_rows_columnar(cursor.description, rows)
+    return pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+
+def _read_frame(connection, query, params=None, columnar=False):
+    """Runs a SELECT on a connection; columnar reads use Arrow when it is available."""
+    if columnar and arrow_fetch_available():
+        return _frame_from_arrow(connection.fetch_df_all(query, params or [], arraysize=COLUMNAR_ARRAYSIZE))
+    with connection.cursor() as cursor:
+        cursor.execute(query, params or [])
+        return _frame_from_cursor(cursor, columnar)
+
+# --- Query Cache Invalidation ---
+
+def invalidate_tables(tables):
+    """Drops the cached results that read any of `tables` (None drops the whole cache)."""
+    if tables is None:
+        QUERY_CACHE.clear()
+    else:
+        QUERY_CACHE.invalidate_tables(query_cache.with_side_effects(tables))
 
 # --- Modified Core Database Functions ---
 
-def execute_query(query, params=None):
-    """Executes a SELECT query using the appropriate role-based connection pool."""
-    pool = get_db_pool() # Dynamically get the pool
+def _cached_read(role, query, params=None, columnar=False, cache=True, ttl=None, client_id=None):
+    """
+    Reads a SELECT through the shared query cache for a role. Database errors are
+    raised to the caller. Safe to call from worker threads when `client_id` is
+    given, as it then never touches st.*. Cache hits are not recorded in PERF_MONITOR.
+    """
+    key = None
+    if cache and QUERY_CACHE_SETTINGS["enabled"]:
+        key = query_cache.make_key(role, query, params, columnar)
+        if key is not None:
+            cached_df = QUERY_CACHE.get(key)
+            if cached_df is not None:
+                return cached_df
+            # Taken before the query: a write committed while it runs makes put() skip the result.
+            tables = query_cache.tables_read_by(query)
+            versions = QUERY_CACHE.versions(tables)
+
+    with _monitored_connection("execute_query", query, role, client_id) as call:
+        df = _read_frame(call.connection, query, params, columnar)
+        call.rows = len(df)
+
+    if key is not None:
+        QUERY_CACHE.put(key, df, tables, ttl, versions)
+    return df
+
+def execute_query(query, params=None, columnar=False, cache=True, ttl=None, role=None):
+    """
+    Executes a SELECT query using the appropriate role-based connection pool.
+    With columnar=True the DataFrame is built column by column with numeric and
+    datetime dtypes, which is much faster for wide or long results.
+    Results are served from the shared query cache unless cache=False; `ttl`
+    overrides the configured lifetime (seconds) of this entry.
+    """
+    role = role or get_current_role()
+    get_db_pool(role) # Create the pool here, where a failure can be shown to the user
     try:
-        with pool.acquire() as connection:
-            with connection.cursor() as cursor:
-                cursor.execute(query, params or [])
-                columns = [col[0] for col in cursor.description]
-                rows = cursor.fetchall()
-                df = pd.DataFrame(rows, columns=columns)
-                return df
+        return _cached_read(role, query, params, columnar, cache, ttl)
+    except SystemBusyError as e:
+        st.warning(str(e))
+        return pd.DataFrame()
     except oracledb.DatabaseError as e:
         st.error(f"Database query failed: {e}")
         return pd.DataFrame()
@@ -67,35 +413,268 @@ def execute_query(query, params=None):
         st.error(f"An unexpected error occurred: {e}")
         return pd.DataFrame()
 
+# --- Parallel Data Loading ---
+# A bounded thread pool shared by the whole process. Dashboards hand it the
+# independent queries of a render; their results land in the query cache and
+# the render itself is then served from memory.
+_PREFETCH_EXECUTOR = None
+_PREFETCH_LOCK = threading.Lock()
+
+def _get_prefetch_executor():
+    global _PREFETCH_EXECUTOR
+    with _PREFETCH_LOCK:
+        if _PREFETCH_EXECUTOR is None:
+            _PREFETCH_EXECUTOR = ThreadPoolExecutor(
+                max_workers=PARALLEL_QUERY_SETTINGS["max_workers"],
+                thread_name_prefix="db-prefetch"
+            )
+            atexit.register(_PREFETCH_EXECUTOR.shutdown, wait=False)
+    return _PREFETCH_EXECUTOR
+
+def prefetch_queries(queries, role=None):
+    """
+    Runs independent SELECTs concurrently and stores their results in the query
+    cache, so the page waits for the slowest query instead of the sum of all of
+    them. `queries` is a list of (sql, params) pairs; they must be written exactly
+    as the execute_query calls that will read them. Failed queries are not cached,
+    so their execute_query call runs again and reports the error where it belongs.
+    """
+    if not QUERY_CACHE_SETTINGS["enabled"] or not queries:
+        return
+    role = role or get_current_role()
+    client_id = get_current_client_id() or ""
+    pool = get_db_pool(role)
+
+    missing = []
+    for query, params in queries:
+        key = query_cache.make_key(role, query, params, False)
+        if key is not None and not QUERY_CACHE.contains(key):
+            missing.append((query, params))
+    if len(missing) < 2:
+        return # Nothing to overlap; the render will run it
+
+    # Never run more queries at once than the role's pool can serve.
+    limit = threading.BoundedSemaphore(max(1, min(len(missing), pool.max)))
+
+    def load(query, params):
+        with limit:
+            return _cached_read(role, query, params, client_id=client_id)
+
+    executor = _get_prefetch_executor()
+    futures = [executor.submit(load, query, params) for query, params in missing]
+    for future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Prefetch failed, the query will run again during render: {e}")
+
+def iter_query(query, params=None, chunk_size=1000, prefetchrows=None):
+    """
+    Executes a SELECT query and yields the result as DataFrame chunks of at most
+    `chunk_size` rows, so a large result is never held in memory all at once.
+    `chunk_size` is also the cursor arraysize (rows per round-trip); `prefetchrows`
+    defaults to the same value so the first round-trip already returns a full chunk.
+    """
+    try:
+        with _monitored_connection("iter_query", query) as call:
+            with call.connection.cursor() as cursor:
+                cursor.arraysize = chunk_size
+                cursor.prefetchrows = prefetchrows if prefetchrows is not None else chunk_size
+                # Only the execute and the fetches are timed, not the consumer's work between chunks.
+                with call.db_time():
+                    cursor.execute(query, params or [])
+                columns = [col[0] for col in cursor.description]
+                call.rows = 0
+                while True:
+                    with call.db_time():
+                        rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    call.rows += len(rows)
+                    yield pd.DataFrame(rows, columns=columns)
+    except SystemBusyError as e:
+        st.warning(str(e))
+    except oracledb.DatabaseError as e:
+        st.error(f"Database query failed: {e}")
+    except Exception as e:
+        st.error(f"An unexpected error occurred: {e}")
+
+def read_query_limited(query, params=None, max_rows=2000, chunk_filter=None, chunk_size=1000):
+    """
+    Streams a SELECT query through `iter_query` and keeps at most `max_rows` rows.
+    `chunk_filter`, if given, is applied to each chunk before it is kept, so filtering
+    a large table never materializes it. Returns (DataFrame, truncated).
+    """
+    kept, kept_rows, columns = [], 0, None
+    chunks = iter_query(query, params, chunk_size=chunk_size)
+    for chunk in chunks:
+        columns = chunk.columns
+        if chunk_filter is not None:
+            chunk = chunk_filter(chunk)
+        if kept_rows + len(chunk) > max_rows:
+            kept.append(chunk.iloc[:max_rows - kept_rows])
+            chunks.close() # Stops fetching and releases the connection
+            return pd.concat(kept, ignore_index=True), True
+        kept.append(chunk)
+        kept_rows += len(chunk)
+
+    if not kept:
+        return pd.DataFrame(columns=columns), False
+    return pd.concat(kept, ignore_index=True), False
+
+# --- Keyset Pagination ---
+# A page is read with "rows after the last one shown" predicates on the sort
+# key plus FETCH FIRST, never with OFFSET, so the cost of any page is that of
+# the first one: an index range scan of page_size rows when the sort key is indexed.
+
+def _column_label(sort_column):
+    """The DataFrame column of a sort key entry: "Date" -> Date, course_name -> COURSE_NAME."""
+    if sort_column.startswith('"'):
+        return sort_column.strip('"')
+    return sort_column.upper()
+
+def _python_value(value):
+    """Turns a pandas/numpy scalar back into a bindable Python value."""
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, 'item') else value
+
+def _keyset_predicate(sort_key):
+    """(a > :a0) OR (a = :a1 AND b > :b0) ... for an ascending, unique sort key."""
+    terms = []
+    for i, column in enumerate(sort_key):
+        equalities = [f"page.{previous} = :k{i}_{j}" for j, previous in enumerate(sort_key[:i])]
+        terms.append("(" + " AND ".join(equalities + [f"page.{column} > :k{i}_{i}"]) + ")")
+    return " OR ".join(terms)
+
+def fetch_page(base_query, sort_key, params=None, after=None, page_size=50, count=False, role=None):
+    """
+    Reads one page of `base_query` (a view name or a SELECT without ORDER BY)
+    ordered by `sort_key`, a tuple of columns of its result that is unique and
+    NOT NULL, e.g. ("COURSE_NAME", "COURSE_ID"). `after` is the cursor returned
+    with the previous page, None for the first one.
+    With count=True the total number of rows is also read; it goes through the
+    query cache, so it is counted once per TTL or write, not on every page.
+    Returns (DataFrame, next_cursor, total); next_cursor is None on the last page
+    and total is None unless count=True.
+    """
+    sort_key = tuple(sort_key)
+    source = base_query if base_query.lstrip().upper().startswith(("SELECT", "WITH")) else f"SELECT * FROM {base_query}"
+    params = list(sanitize_params(params) or [])
+
+    page_query = f"SELECT * FROM ({source}) page"
+    page_params = list(params)
+    if after is not None:
+        page_query += f"\nWHERE {_keyset_predicate(sort_key)}"
+        for i in range(len(sort_key)):
+            page_params.extend(after[:i + 1])
+    page_query += f"\nORDER BY {', '.join(f'page.{column}' for column in sort_key)}"
+    page_query += f"\nFETCH FIRST {int(page_size) + 1} ROWS ONLY" # One extra row tells whether there is a next page
+
+    page = execute_query(page_query, page_params, role=role)
+
+    total = None
+    if count:
+        count_df = execute_query(f"SELECT COUNT(*) AS TOTAL FROM ({source})", params, role=role)
+        total = int(count_df.iloc[0, 0]) if not count_df.empty else None
+
+    next_cursor = None
+    if len(page) > page_size:
+        page = page.iloc[:page_size]
+        last = page.iloc[-1]
+        next_cursor = tuple(_python_value(last[_column_label(column)]) for column in sort_key)
+    return page.reset_index(drop=True), next_cursor, total
+
 def sanitize_params(params):
     if params is None: return None
     return [int(p.item()) if hasattr(p, 'item') else p for p in params]
 
-def execute_dml(dml_statement, params=None):
+def execute_dml(dml_statement, params=None, role=None):
     """Executes a DML statement using the appropriate role-based connection pool."""
     params = sanitize_params(params)
-    pool = get_db_pool() # Dynamically get the pool
     try:
-        with pool.acquire() as connection:
-            with connection.cursor() as cursor:
+        with _monitored_connection("execute_dml", dml_statement, role) as call:
+            with call.connection.cursor() as cursor:
                 cursor.execute(dml_statement, params or [])
-                connection.commit()
+                call.rows = cursor.rowcount
+                call.connection.commit()
+        invalidate_tables(query_cache.tables_written_by(dml_statement))
         return (True, "DML statement executed successfully.")
+    except SystemBusyError as e:
+        return (False, str(e))
     except oracledb.DatabaseError as e:
         error_obj, = e.args
         return (False, f"Database error: {error_obj.message}")
     except Exception as e:
         return (False, f"An unexpected error occurred: {e}")
 
+def friendly_db_message(message):
+    """Keeps the first line of an Oracle error without its ORA-xxxxx prefix."""
+    return message.strip().splitlines()[0].split(':', 1)[-1].strip()
+
+ROLLED_BACK = "Not applied: another row of the batch failed."
+
+def execute_many(dml_statement, rows, role=None, client_id=None, all_or_nothing=False):
+    """
+    Executes one DML statement for many parameter rows with a single executemany
+    round-trip and a single commit. Rows rejected by a constraint or a trigger are
+    collected with batcherrors instead of aborting the batch; the other rows are
+    committed, unless all_or_nothing is set: then one rejected row rolls the whole
+    batch back and the other rows get (False, ROLLED_BACK).
+    `sanitize_params` is applied to every row. Background workers pass
+    `role` and `client_id`, as they have no session to take them from.
+    Returns (success, message, row_results): success is True only if every row was
+    applied, and row_results holds one (ok, message) tuple per input row, in order.
+    """
+    rows = [sanitize_params(row) or [] for row in rows]
+    if not rows:
+        return (True, "No rows to execute.", [])
+
+    try:
+        with _monitored_connection("execute_many", dml_statement, role, client_id) as call:
+            with call.connection.cursor() as cursor:
+                cursor.executemany(dml_statement, rows, batcherrors=True)
+                batch_errors = cursor.getbatcherrors()
+                rolled_back = all_or_nothing and bool(batch_errors)
+                if rolled_back:
+                    call.connection.rollback()
+                    call.rows = 0
+                else:
+                    call.rows = len(rows)
+                    call.connection.commit()
+    except SystemBusyError as e:
+        return (False, str(e), [(False, str(e))] * len(rows))
+    except oracledb.DatabaseError as e:
+        error_obj, = e.args
+        message = friendly_db_message(error_obj.message)
+        return (False, f"Database error: {error_obj.message}", [(False, message)] * len(rows))
+    except Exception as e:
+        return (False, f"An unexpected error occurred: {e}", [(False, str(e))] * len(rows))
+
+    row_results = [(False, ROLLED_BACK) if rolled_back else (True, "OK")] * len(rows)
+    for error in batch_errors:
+        row_results[error.offset] = (False, friendly_db_message(error.message))
+
+    failed = len(batch_errors)
+    if rolled_back:
+        return (False, f"Nothing applied: {failed} of {len(rows)} rows failed.", row_results)
+    if failed < len(rows):
+        invalidate_tables(query_cache.tables_written_by(dml_statement))
+    if failed:
+        return (False, f"{len(rows) - failed} of {len(rows)} rows applied, {failed} failed.", row_results)
+    return (True, f"All {len(rows)} rows applied.", row_results)
+
 def call_procedure(proc_name, params=None):
     """Calls a stored procedure using the appropriate role-based connection pool."""
-    pool = get_db_pool() # Dynamically get the pool
     try:
-        with pool.acquire() as connection:
-            with connection.cursor() as cursor:
+        with _monitored_connection("call_procedure", proc_name) as call:
+            with call.connection.cursor() as cursor:
                 cursor.callproc(proc_name, params or [])
-                connection.commit()
+                call.connection.commit()
+        invalidate_tables(query_cache.tables_written_by_procedure(proc_name))
         return (True, f"Procedure '{proc_name}' executed successfully.")
+    except SystemBusyError as e:
+        return (False, str(e))
     except oracledb.DatabaseError as e:
         error_obj, = e.args
         friendly_message = error_obj.message.split(':', 1)[-1].strip()
@@ -103,17 +682,22 @@ def call_procedure(proc_name, params=None):
     except Exception as e:
         return (False, f"An unexpected error occurred: {e}")
         
-def call_function_ref_cursor(func_name, params=None):
-    """Calls a function returning a ref cursor using the appropriate role-based pool."""
-    pool = get_db_pool() # Dynamically get the pool
+def call_function_ref_cursor(func_name, params=None, columnar=False):
+    """
+    Calls a function returning a ref cursor using the appropriate role-based pool.
+    With columnar=True the typed columns are built with the vectorized fallback,
+    as ref cursors cannot be fetched through Arrow.
+    """
     try:
-        with pool.acquire() as connection:
-            with connection.cursor() as cursor:
+        with _monitored_connection("call_function_ref_cursor", func_name) as call:
+            with call.connection.cursor() as cursor:
                 output_cursor = cursor.callfunc(func_name, oracledb.DB_TYPE_CURSOR, params or [])
-                columns = [col[0] for col in output_cursor.description]
-                rows = output_cursor.fetchall()
-                df = pd.DataFrame(rows, columns=columns)
+                df = _frame_from_cursor(output_cursor, columnar)
+                call.rows = len(df)
                 return df
+    except SystemBusyError as e:
+        st.warning(str(e))
+        return pd.DataFrame()
     except oracledb.DatabaseError as e:
         error_obj, = e.args
         st.error(f"Database function '{func_name}' failed: {error_obj.message.split(':', 1)[-1].strip()}")
@@ -128,104 +712,191 @@ def call_function_ref_cursor(func_name, params=None):
 # otherwise the underlying DB connection will lack permissions.
 
 def create_course_with_details(course_name, filiere_id, semestre_id, capacity, prof_id, prerequisite_ids=None):
-    pool = get_db_pool()
-    connection = None
     try:
-        connection = pool.acquire()
-        connection.begin()
-        with connection.cursor() as cursor:
-            # --- New Validation Logic: Check if professor belongs to the correct department ---
-            cursor.execute("SELECT d.DEPARTEMENT_ID FROM YAHYA_ADMIN.FILIERE f JOIN YAHYA_ADMIN.DEPARTEMENT d ON f.DEPARTEMENT_ID = d.DEPARTEMENT_ID WHERE f.FILIERE_ID = :1", [filiere_id])
-            filiere_dept_id_row = cursor.fetchone()
-            if not filiere_dept_id_row:
-                raise ValueError("Invalid Filiere ID provided.")
-            filiere_dept_id = filiere_dept_id_row[0]
-
-            cursor.execute("SELECT DEPARTEMENT_ID FROM YAHYA_ADMIN.PROF WHERE PROF_ID = :1", [prof_id])
-            prof_dept_id_row = cursor.fetchone()
-            if not prof_dept_id_row:
-                raise ValueError("Invalid Professor ID provided.")
-            prof_dept_id = prof_dept_id_row[0]
-
-            if filiere_dept_id != prof_dept_id:
-                raise ValueError("The assigned professor must belong to the same department as the course's filière.")
-            # --- End New Validation Logic ---
-
-            # 1. Insert the course and get its new ID
-            course_id_var = cursor.var(oracledb.NUMBER)
-            sql_insert_course = "INSERT INTO YAHYA_ADMIN.course (NAME, FILIERE_ID, SEMESTRE_ID, CAPACITY) VALUES (:1, :2, :3, :4) RETURNING COURSE_ID INTO :5"
-            cursor.execute(sql_insert_course, [course_name, filiere_id, semestre_id, capacity, course_id_var])
-            new_course_id = int(course_id_var.getvalue()[0])
-
-            # 2. Insert the professor-course link
-            sql_assign_prof = "INSERT INTO YAHYA_ADMIN.prof_course (PROF_ID, COURSE_ID) VALUES (:1, :2)"
-            cursor.execute(sql_assign_prof, [prof_id, new_course_id])
+        with _monitored_connection("create_course_with_details", "create_course_with_details") as call:
+            connection = call.connection
+            connection.begin()
+            with connection.cursor() as cursor:
+                # --- New Validation Logic: Check if professor belongs to the correct department ---
+                cursor.execute("SELECT d.DEPARTEMENT_ID FROM YAHYA_ADMIN.FILIERE f JOIN YAHYA_ADMIN.DEPARTEMENT d ON f.DEPARTEMENT_ID = d.DEPARTEMENT_ID WHERE f.FILIERE_ID = :1", [filiere_id])
+                filiere_dept_id_row = cursor.fetchone()
+                if not filiere_dept_id_row:
+                    raise ValueError("Invalid Filiere ID provided.")
+                filiere_dept_id = filiere_dept_id_row[0]
+
+                cursor.execute("SELECT DEPARTEMENT_ID FROM YAHYA_ADMIN.PROF WHERE PROF_ID = :1", [prof_id])
+                prof_dept_id_row = cursor.fetchone()
+                if not prof_dept_id_row:
+                    raise ValueError("Invalid Professor ID provided.")
+                prof_dept_id = prof_dept_id_row[0]
+
+                if filiere_dept_id != prof_dept_id:
+                    raise ValueError("The assigned professor must belong to the same department as the course's filière.")
+                # --- End New Validation Logic ---
+
+                # 1. Insert the course and get its new ID
+                course_id_var = cursor.var(oracledb.NUMBER)
+                sql_insert_course = "INSERT INTO YAHYA_ADMIN.course (NAME, FILIERE_ID, SEMESTRE_ID, CAPACITY) VALUES (:1, :2, :3, :4) RETURNING COURSE_ID INTO :5"
+                cursor.execute(sql_insert_course, [course_name, filiere_id, semestre_id, capacity, course_id_var])
+                new_course_id = int(course_id_var.getvalue()[0])
+
+                # 2. Insert the professor-course link
+                sql_assign_prof = "INSERT INTO YAHYA_ADMIN.prof_course (PROF_ID, COURSE_ID) VALUES (:1, :2)"
+                cursor.execute(sql_assign_prof, [prof_id, new_course_id])
             
-            # 3. Insert prerequisites if any are provided
-            if prerequisite_ids:
-                sql_add_prereq = "INSERT INTO YAHYA_ADMIN.course_prerequisite (COURSE_ID, PREREQUISITE_COURSE_ID) VALUES (:1, :2)"
-                prereq_data = [(new_course_id, int(prereq_id)) for prereq_id in prerequisite_ids]
-                cursor.executemany(sql_add_prereq, prereq_data)
+                # 3. Insert prerequisites if any are provided
+                if prerequisite_ids:
+                    sql_add_prereq = "INSERT INTO YAHYA_ADMIN.course_prerequisite (COURSE_ID, PREREQUISITE_COURSE_ID) VALUES (:1, :2)"
+                    prereq_data = [(new_course_id, int(prereq_id)) for prereq_id in prerequisite_ids]
+                    cursor.executemany(sql_add_prereq, prereq_data)
         
-        connection.commit()
+            connection.commit()
+        invalidate_tables({"COURSE", "PROF_COURSE", "COURSE_PREREQUISITE"})
         return (True, f"Course '{course_name}' created successfully.")
     except Exception as e:
-        if connection:
-            connection.rollback()
         return (False, str(e))
-    finally:
-        if connection:
-            pool.release(connection)
 
 def create_new_professor(full_name, department_id, password):
-    pool = get_db_pool()
-    connection = None
+    password_hash = hash_password(password)
     try:
-        connection = pool.acquire()
-        connection.begin()
-        with connection.cursor() as cursor:
-            new_code = f"P{random.randint(1000, 9999)}"
-            cursor.execute(
-                "INSERT INTO YAHYA_ADMIN.USER_ACCOUNT (LOGIN_CODE, PASSWORD_HASH, ROLE) VALUES (:1, :2, 'PROF')",
-                [new_code, password]
-            )
-            cursor.execute(
-                "INSERT INTO YAHYA_ADMIN.PROF (CODE_APOGE, FULL_NAME, DEPARTEMENT_ID) VALUES (:1, :2, :3)",
-                [new_code, full_name, department_id]
-            )
-        connection.commit()
+        with _monitored_connection("create_new_professor", "create_new_professor") as call:
+            connection = call.connection
+            connection.begin()
+            with connection.cursor() as cursor:
+                new_code = f"P{random.randint(1000, 9999)}"
+                cursor.execute(
+                    "INSERT INTO YAHYA_ADMIN.USER_ACCOUNT (LOGIN_CODE, PASSWORD_HASH, ROLE) VALUES (:1, :2, 'PROF')",
+                    [new_code, password_hash]
+                )
+                cursor.execute(
+                    "INSERT INTO YAHYA_ADMIN.PROF (CODE_APOGE, FULL_NAME, DEPARTEMENT_ID) VALUES (:1, :2, :3)",
+                    [new_code, full_name, department_id]
+                )
+            connection.commit()
+        invalidate_tables({"USER_ACCOUNT", "PROF"})
         return (True, f"Professor '{full_name}' created.", new_code)
     except Exception as e:
-        if connection: connection.rollback()
         return (False, str(e), None)
-    finally:
-        if connection: pool.release(connection)
 
 def delete_course_with_details(course_id):
     # This function now requires high privileges and should only be run by an admin.
     # The underlying 'app_admin' user should have DELETE rights.
-    pool = get_db_pool()
-    connection = None
     try:
-        connection = pool.acquire()
-        connection.begin()
-        with connection.cursor() as cursor:
-            cursor.execute("DELETE FROM YAHYA_ADMIN.ATTENDANCE WHERE SEANCE_ID IN (SELECT SEANCE_ID FROM YAHYA_ADMIN.SEANCE WHERE COURSE_ID = :1)", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.SEANCE WHERE COURSE_ID = :1", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE_RESULT WHERE COURSE_ID = :1", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.INSCRIPTION_REQUEST WHERE COURSE_ID = :1", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.UNBLOCK_REQUEST WHERE COURSE_ID = :1", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE_PREREQUISITE WHERE COURSE_ID = :1", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE_PREREQUISITE WHERE PREREQUISITE_COURSE_ID = :1", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.PROF_COURSE WHERE COURSE_ID = :1", [course_id])
-            cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE WHERE COURSE_ID = :1", [course_id])
-        connection.commit()
+        with _monitored_connection("delete_course_with_details", "delete_course_with_details") as call:
+            connection = call.connection
+            connection.begin()
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM YAHYA_ADMIN.ATTENDANCE WHERE SEANCE_ID IN (SELECT SEANCE_ID FROM YAHYA_ADMIN.SEANCE WHERE COURSE_ID = :1)", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.SEANCE WHERE COURSE_ID = :1", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE_RESULT WHERE COURSE_ID = :1", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.INSCRIPTION_REQUEST WHERE COURSE_ID = :1", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.UNBLOCK_REQUEST WHERE COURSE_ID = :1", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE_PREREQUISITE WHERE COURSE_ID = :1", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE_PREREQUISITE WHERE PREREQUISITE_COURSE_ID = :1", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.PROF_COURSE WHERE COURSE_ID = :1", [course_id])
+                cursor.execute("DELETE FROM YAHYA_ADMIN.COURSE WHERE COURSE_ID = :1", [course_id])
+            connection.commit()
+        invalidate_tables({
+            "ATTENDANCE", "SEANCE", "COURSE_RESULT", "INSCRIPTION_REQUEST", "UNBLOCK_REQUEST",
+            "COURSE_PREREQUISITE", "PROF_COURSE", "COURSE"
+        })
         return (True, f"Course ID {course_id} and related data deleted.")
     except Exception as e:
-        if connection: connection.rollback()
         return (False, str(e))
-    finally:
-        if connection: pool.release(connection)
+
+def reconcile_course_seats(role=None, client_id=None):
+    """
+    Rebuilds the COURSE_SEAT counters from the ACCEPTED inscription requests
+    (sp_reconcile_course_seats). Runs from the admin page or, with `role` and
+    `client_id`, from the reconcile_seats.py job. Returns (success, message).
+    """
+    try:
+        with _monitored_connection("reconcile_course_seats", "SP_RECONCILE_COURSE_SEATS", role, client_id) as call:
+            with call.connection.cursor() as cursor:
+                fixed = cursor.var(int)
+                cursor.callproc("SP_RECONCILE_COURSE_SEATS", [fixed])
+                call.rows = fixed.getvalue()
+        invalidate_tables(query_cache.tables_written_by_procedure("SP_RECONCILE_COURSE_SEATS"))
+        return (True, f"Seat counters rebuilt: {fixed.getvalue()} course(s) corrected.")
+    except SystemBusyError as e:
+        return (False, str(e))
+    except oracledb.DatabaseError as e:
+        error_obj, = e.args
+        return (False, friendly_db_message(error_obj.message))
+    except Exception as e:
+        return (False, f"An unexpected error occurred: {e}")
+
+def rebuild_absence_state():
+    """
+    Rebuilds the ABSENCE_STATE rows (consecutive absences, blocked flag) from
+    the attendance history (sp_rebuild_absence_state). Returns (success, message).
+    """
+    try:
+        with _monitored_connection("rebuild_absence_state", "SP_REBUILD_ABSENCE_STATE") as call:
+            with call.connection.cursor() as cursor:
+                rows = cursor.var(int)
+                cursor.callproc("SP_REBUILD_ABSENCE_STATE", [rows])
+                call.rows = rows.getvalue()
+        invalidate_tables(query_cache.tables_written_by_procedure("SP_REBUILD_ABSENCE_STATE"))
+        return (True, f"Absence tracking rebuilt for {rows.getvalue()} student/course pair(s).")
+    except SystemBusyError as e:
+        return (False, str(e))
+    except oracledb.DatabaseError as e:
+        error_obj, = e.args
+        return (False, friendly_db_message(error_obj.message))
+    except Exception as e:
+        return (False, f"An unexpected error occurred: {e}")
+
+def refresh_dashboard_stats(role=None, client_id=None):
+    """
+    Takes a snapshot of the dashboard statistics (sp_refresh_dashboard_stats).
+    Runs from the admin page or, with `role` and `client_id`, from the
+    refresh_stats.py job. Returns (success, message).
+    """
+    try:
+        with _monitored_connection("refresh_dashboard_stats", "SP_REFRESH_DASHBOARD_STATS", role, client_id) as call:
+            with call.connection.cursor() as cursor:
+                refresh_ms = cursor.var(float)
+                cursor.callproc("SP_REFRESH_DASHBOARD_STATS", [DASHBOARD_STATS_SETTINGS["keep_days"], refresh_ms])
+                call.rows = 1
+        invalidate_tables(query_cache.tables_written_by_procedure("SP_REFRESH_DASHBOARD_STATS"))
+        return (True, f"Statistics refreshed: counting took {refresh_ms.getvalue():.1f} ms.")
+    except SystemBusyError as e:
+        return (False, str(e))
+    except oracledb.DatabaseError as e:
+        error_obj, = e.args
+        return (False, friendly_db_message(error_obj.message))
+    except Exception as e:
+        return (False, f"An unexpected error occurred: {e}")
+
+def bulk_decide_inscriptions(course_id, overflow="REJECTED", order=None):
+    """
+    Decides all the PENDING / WAITLISTED requests of a course at once
+    (sp_bulk_decide_inscriptions): accepted in `order` (request ids, then
+    first come first served) up to the free seats, the rest REJECTED or
+    WAITLISTED. Returns (success, message, outcomes) where outcomes has one
+    row per request: REQUEST_ID, FULL_NAME, OUTCOME.
+    """
+    try:
+        with _monitored_connection("bulk_decide_inscriptions", "SP_BULK_DECIDE_INSCRIPTIONS") as call:
+            connection = call.connection
+            id_list = connection.gettype("SYS.ODCINUMBERLIST").newobject([int(request_id) for request_id in order or []])
+            with connection.cursor() as cursor, connection.cursor() as ref_cursor:
+                cursor.callproc("SP_BULK_DECIDE_INSCRIPTIONS", [int(course_id), overflow, id_list, ref_cursor])
+                outcomes = _frame_from_cursor(ref_cursor)
+                call.rows = len(outcomes)
+        invalidate_tables(query_cache.tables_written_by_procedure("SP_BULK_DECIDE_INSCRIPTIONS"))
+    except SystemBusyError as e:
+        return (False, str(e), pd.DataFrame())
+    except oracledb.DatabaseError as e:
+        error_obj, = e.args
+        return (False, friendly_db_message(error_obj.message), pd.DataFrame())
+    except Exception as e:
+        return (False, f"An unexpected error occurred: {e}", pd.DataFrame())
+
+    counts = outcomes['OUTCOME'].value_counts() if not outcomes.empty else pd.Series(dtype=int)
+    summary = ", ".join(f"{count} {outcome.lower()}" for outcome, count in counts.items())
+    return (True, f"{len(outcomes)} request(s) decided: {summary or 'nothing to decide'}.", outcomes)
 
 def create_seances_for_all_sections(course_id, filiere_id, semestre_id, filiere_name, semestre_code, seance_date, start_time, end_time, room, seance_type):
     """
@@ -233,59 +904,54 @@ def create_seances_for_all_sections(course_id, filiere_id, semestre_id, filiere_
     If no sections exist, it creates two default ones.
     This is a transactional operation.
     """
-    pool = get_db_pool()
-    connection = None
     try:
-        connection = pool.acquire()
-        connection.begin()
+        with _monitored_connection("create_seances_for_all_sections", "create_seances_for_all_sections") as call:
+            connection = call.connection
+            connection.begin()
         
-        with connection.cursor() as cursor:
-            # 1. Check for existing sections
-            cursor.execute("SELECT SECTION_ID FROM SECTION WHERE FILIERE_ID = :1 AND SEMESTRE_ID = :2", [filiere_id, semestre_id])
-            sections = cursor.fetchall()
-            section_ids = [row[0] for row in sections]
-
-            # 2. If no sections exist, create two default ones
-            if not section_ids:
-                st.info("No sections found, creating two default sections (G1, G2)...")
-                new_sections_to_create = 2
-                for i in range(1, new_sections_to_create + 1):
-                    section_name = f"{filiere_name[:4].upper()}-{semestre_code}-G{i}"
-                    # Use a variable to hold the returned ID
-                    new_id_var = cursor.var(oracledb.NUMBER)
-                    cursor.execute(
-                        "INSERT INTO SECTION (NAME, FILIERE_ID, SEMESTRE_ID) VALUES (:1, :2, :3) RETURNING SECTION_ID INTO :4",
-                        [section_name, filiere_id, semestre_id, new_id_var]
-                    )
-                    # Get the value from the variable and add to our list
-                    section_ids.append(new_id_var.getvalue()[0])
-
-            # 3. Insert a seance for the FIRST available section to avoid conflicts.
-            #    The original logic of looping through all sections was guaranteed to fail
-            #    the room/time overlap trigger if more than one section existed.
-            seance_dml = "INSERT INTO SEANCE (COURSE_ID, SECTION_ID, SEANCE_DATE, START_TIME, END_TIME, ROOM, TYPE) VALUES (:1, :2, :3, :4, :5, :6, :7)"
-            seances_created = 0
-            if section_ids:
-                # Use only the first section to prevent room/time conflicts
-                first_section_id = section_ids[0]
-                params = [course_id, first_section_id, seance_date, start_time, end_time, room, seance_type]
-                cursor.execute(seance_dml, params)
-                seances_created = 1
-            else:
-                # This case should ideally not be reached due to section creation logic above, but as a safeguard:
-                return (False, "Could not find or create a section to assign the seance to.")
-
-        connection.commit()
+            with connection.cursor() as cursor:
+                # 1. Check for existing sections
+                cursor.execute("SELECT SECTION_ID FROM SECTION WHERE FILIERE_ID = :1 AND SEMESTRE_ID = :2", [filiere_id, semestre_id])
+                sections = cursor.fetchall()
+                section_ids = [row[0] for row in sections]
+
+                # 2. If no sections exist, create two default ones
+                if not section_ids:
+                    st.info("No sections found, creating two default sections (G1, G2)...")
+                    new_sections_to_create = 2
+                    for i in range(1, new_sections_to_create + 1):
+                        section_name = f"{filiere_name[:4].upper()}-{semestre_code}-G{i}"
+                        # Use a variable to hold the returned ID
+                        new_id_var = cursor.var(oracledb.NUMBER)
+                        cursor.execute(
+                            "INSERT INTO SECTION (NAME, FILIERE_ID, SEMESTRE_ID) VALUES (:1, :2, :3) RETURNING SECTION_ID INTO :4",
+                            [section_name, filiere_id, semestre_id, new_id_var]
+                        )
+                        # Get the value from the variable and add to our list
+                        section_ids.append(new_id_var.getvalue()[0])
+
+                # 3. Insert a seance for the FIRST available section to avoid conflicts.
+                #    The original logic of looping through all sections was guaranteed to fail
+                #    the room/time overlap trigger if more than one section existed.
+                seance_dml = "INSERT INTO SEANCE (COURSE_ID, SECTION_ID, SEANCE_DATE, START_TIME, END_TIME, ROOM, TYPE) VALUES (:1, :2, :3, :4, :5, :6, :7)"
+                seances_created = 0
+                if section_ids:
+                    # Use only the first section to prevent room/time conflicts
+                    first_section_id = section_ids[0]
+                    params = [course_id, first_section_id, seance_date, start_time, end_time, room, seance_type]
+                    cursor.execute(seance_dml, params)
+                    seances_created = 1
+                else:
+                    # This case should ideally not be reached due to section creation logic above, but as a safeguard:
+                    return (False, "Could not find or create a section to assign the seance to.")
+
+            connection.commit()
+        invalidate_tables({"SECTION", "SEANCE"})
         return (True, f"Successfully created {seances_created} séance. It has been assigned to the first available section.")
+    except SystemBusyError as e:
+        return (False, str(e))
     except oracledb.DatabaseError as e:
-        if connection:
-            connection.rollback()
         error_obj, = e.args
         return (False, f"Database error: {error_obj.message}")
     except Exception as e:
-        if connection:
-            connection.rollback()
-        return (False, f"An unexpected error occurred: {str(e)}")
-    finally:
-        if connection:
-            pool.release(connection)
\ No newline at end of file
+        return (False, f"An unexpected error occurred: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,54 @@
+# df_utils.py
+from string import Formatter
+import numpy as np
+import pandas as pd
+
+# Column-wise helpers for the dashboards. Each one replaces a per-row Python
+# loop (apply(axis=1), iterrows, a filter per row) by a few vectorized pandas
+# operations, so the cost stays flat as rosters grow. See bench_dataframes.py.
+
+def rows_in(df, other, columns):
+    """
+    Boolean mask of the rows of `df` whose `columns` values appear together in
+    a row of `other`, e.g. the (STUDENT_ID, COURSE_NAME) pairs that are blocked.
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    if df.empty or other.empty:
+        return pd.Series(False, index=df.index)
+    if len(columns) == 1:
+        return df[columns[0]].isin(other[columns[0]])
+    keys = pd.MultiIndex.from_frame(df[columns])
+    return pd.Series(keys.isin(pd.MultiIndex.from_frame(other[columns])), index=df.index)
+
+def flag_rows(df, other, columns, flagged, default):
+    """A Series holding `flagged` for the rows of `df` found in `other` (see rows_in), else `default`."""
+    return pd.Series(np.where(rows_in(df, other, columns), flagged, default), index=df.index)
+
+def contains_text(df, text, columns=None):
+    """
+    Boolean mask of the rows where any of `columns` (all by default) contains
+    `text`, case-insensitively. Works column by column instead of row by row.
+    """
+    mask = pd.Series(False, index=df.index)
+    if not text:
+        return ~mask
+    for column in (columns if columns is not None else df.columns):
+        mask |= df[column].astype(str).str.contains(text, case=False, regex=False, na=False)
+    return mask
+
+def format_rows(df, template):
+    """
+    Builds one label per row from a str.format-style template over column
+    names, e.g. "{FULL_NAME} (ID: {STUDENT_ID})", by concatenating whole columns.
+    """
+    labels = pd.Series("", index=df.index, dtype=str)
+    for literal, column, _, _ in Formatter().parse(template):
+        if literal:
+            labels = labels + literal
+        if column is not None:
+            labels = labels + df[column].astype("string").fillna("")
+    return labels
+
+def bind_rows(df, columns):
+    """The rows of `df` as lists of native Python values, ready for execute_many."""
+    return [list(row) for row in zip(*(df[column].tolist() for column in columns))]
@@ -0,0 +1,48 @@
+# enrollment_decisions.py
+import streamlit as st
+from db_utils import bulk_decide_inscriptions
+from df_utils import format_rows
+
+OVERFLOW_CHOICES = {"Reject them": "REJECTED", "Put them on the waitlist": "WAITLISTED"}
+
+def display_bulk_decision(course_id, requests_df, key):
+    """
+    Form deciding every PENDING / WAITLISTED request of a course in one go,
+    shared by the professor and admin pages. `requests_df` needs REQUEST_ID,
+    FULL_NAME and STATUS.
+    """
+    # The outcome of the last run survives the rerun that refreshes the lists.
+    last_run = st.session_state.pop(f"{key}_outcomes", None)
+    if last_run is not None:
+        msg, outcomes = last_run
+        st.success(msg)
+        if not outcomes.empty:
+            st.dataframe(outcomes, use_container_width=True, hide_index=True,
+                         column_config={"REQUEST_ID": "Request", "FULL_NAME": "Student", "OUTCOME": "Outcome"})
+
+    if requests_df.empty:
+        return
+    candidates = requests_df[requests_df['STATUS'].isin(['PENDING', 'WAITLISTED'])]
+    if candidates.empty:
+        return
+
+    with st.expander(f"⚡ Decide all {len(candidates)} pending request(s) at once"):
+        order = []
+        order_mode = st.radio("Acceptance order", ["First come, first served", "My order"], key=f"{key}_order_mode", horizontal=True)
+        if order_mode == "My order":
+            labels = format_rows(candidates, "{FULL_NAME} ({STATUS}) - ID: {REQUEST_ID}")
+            request_ids = dict(zip(labels, candidates['REQUEST_ID']))
+            chosen = st.multiselect(
+                "Pick students in the order they should get a seat (the others follow, waitlist first, then by request date):",
+                labels.tolist(), key=f"{key}_order"
+            )
+            order = [request_ids[label] for label in chosen]
+        overflow = st.radio("Requests beyond the free seats", list(OVERFLOW_CHOICES), key=f"{key}_overflow", horizontal=True)
+
+        if st.button("Apply decisions", key=f"{key}_apply", type="primary"):
+            success, msg, outcomes = bulk_decide_inscriptions(course_id, OVERFLOW_CHOICES[overflow], order)
+            if success:
+                st.session_state[f"{key}_outcomes"] = (msg, outcomes)
+                st.rerun()
+            else:
+                st.error(f"No request was changed: {msg}")
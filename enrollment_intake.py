@@ -0,0 +1,217 @@
+# enrollment_intake.py
+import atexit
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from config import ENROLLMENT_INTAKE_SETTINGS
+from db_utils import execute_many
+
+# =================================================================
+# Enrollment Intake
+# =================================================================
+# When registration opens, "Request Enrollment" clicks are not inserted
+# by the session that received them. They go into a bounded in-process
+# queue and one background worker inserts them with executemany, up to
+# batch_size rows per round-trip and commit. The prerequisite triggers
+# still run per row; batcherrors reports their refusals row by row.
+#
+# A click is idempotent: while a (student, course) request is queued,
+# clicking again returns its current status, and once it is inserted the
+# uq_inscription_student_course constraint (db.sql) turns a late duplicate
+# into "already sent" instead of a second row.
+#
+# At exit the intake stops taking requests and the worker sends what is
+# still queued before the connection pools are closed.
+# =================================================================
+
+QUEUED = "QUEUED"
+SENT = "SENT"
+FAILED = "FAILED"
+
+INSERT_REQUEST_DML = "INSERT INTO INSCRIPTION_REQUEST (STUDENT_ID, COURSE_ID, STATUS) VALUES (:1, :2, 'PENDING')"
+_DUPLICATE_CONSTRAINT = "UQ_INSCRIPTION_STUDENT_COURSE"
+_STOP = None # Queued by close(): the worker exits once the requests before it are sent
+
+@dataclass(frozen=True, slots=True)
+class IntakeStatus:
+    """Where one (student, course) request stands in the intake."""
+    state: str
+    message: str
+    updated_at: float
+
+class EnrollmentIntake:
+    """
+    Queue of enrollment requests drained by a background worker in batched
+    inserts. Shared by every session of the server process.
+    """
+
+    def __init__(self, batch_size=200, max_wait_ms=50, max_queue=20000, status_ttl=600, role="STUDENT"):
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.status_ttl = status_ttl
+        self.role = role
+        self.batches = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._statuses = {} # (student_id, course_id) -> IntakeStatus
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        self._stopping = False
+        self._last_prune = time.monotonic()
+
+    def submit(self, student_id, course_id):
+        """
+        Queues a request unless it is already queued. Returns its IntakeStatus.
+        """
+        key = (int(student_id), int(course_id))
+        with self._lock:
+            current = self._statuses.get(key)
+            if current is not None and current.state == QUEUED:
+                return current # Double click: nothing more to do
+            if self._closed:
+                return IntakeStatus(FAILED, "Registration is closing. Please try again in a moment.", time.time())
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                status = IntakeStatus(FAILED, "Registration is very busy right now. Please try again in a moment.", time.time())
+            else:
+                status = IntakeStatus(QUEUED, "Request queued.", time.time())
+            self._statuses[key] = status
+            self._ensure_worker()
+        return status
+
+    def status(self, student_id, course_id):
+        """The IntakeStatus of a request, or None if the intake does not know it."""
+        return self._statuses.get((int(student_id), int(course_id)))
+
+    def statuses_for(self, student_id):
+        """The IntakeStatus of every request of a student still known to the intake, by course_id."""
+        student_id = int(student_id)
+        with self._lock:
+            return {course_id: status for (sid, course_id), status in self._statuses.items() if sid == student_id}
+
+    def pending(self):
+        """Requests waiting in the queue."""
+        return self._queue.qsize()
+
+    def join(self):
+        """Blocks until every queued request has been processed."""
+        self._queue.join()
+
+    def close(self, timeout=30):
+        """
+        Stops taking requests and waits (at most `timeout` seconds) for the
+        worker to send the ones already queued. Registered to run at exit.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+        if worker is None or not worker.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"Enrollment intake: closed with {self.pending()} request(s) still queued.")
+            return
+        worker.join(timeout)
+        if worker.is_alive():
+            print(f"Enrollment intake: closed with {self.pending()} request(s) still queued.")
+
+    def _ensure_worker(self):
+        # Called with self._lock held.
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="enrollment-intake", daemon=True)
+            self._worker.start()
+
+    def _next_batch(self):
+        """
+        Waits for a request, then gathers more for at most max_wait seconds.
+        Stops early at the close() marker, which it acknowledges.
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if deadline is None:
+                key = self._queue.get()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    key = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if key is _STOP:
+                self._stopping = True
+                self._queue.task_done()
+                break
+            batch.append(key)
+            deadline = deadline or time.monotonic() + self.max_wait
+        return batch
+
+    def _run(self):
+        while not self._stopping:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._flush(batch)
+            except Exception as e:
+                print(f"Enrollment intake: batch of {len(batch)} failed: {e}")
+                self._set_statuses([(key, IntakeStatus(FAILED, "Request could not be sent. Please try again.", time.time())) for key in batch])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            self._prune()
+
+    def _flush(self, batch):
+        success, msg, row_results = execute_many(
+            INSERT_REQUEST_DML, [list(key) for key in batch], role=self.role, client_id="enrollment-intake"
+        )
+        now = time.time()
+        updates = []
+        for key, (ok, message) in zip(batch, row_results):
+            if ok:
+                updates.append((key, IntakeStatus(SENT, "Request sent.", now)))
+                self.inserted += 1
+            elif _DUPLICATE_CONSTRAINT in message.upper():
+                updates.append((key, IntakeStatus(SENT, "Request already sent.", now)))
+                self.duplicates += 1
+            else:
+                updates.append((key, IntakeStatus(FAILED, message, now)))
+                self.failed += 1
+        self.batches += 1
+        self._set_statuses(updates)
+        if not success and not any(ok for ok, _ in row_results):
+            print(f"Enrollment intake: {msg}")
+
+    def _set_statuses(self, updates):
+        with self._lock:
+            for key, status in updates:
+                self._statuses[key] = status
+
+    def _prune(self):
+        """Forgets the outcomes older than status_ttl; the database has them."""
+        if time.monotonic() - self._last_prune < 10:
+            return
+        self._last_prune = time.monotonic()
+        oldest = time.time() - self.status_ttl
+        with self._lock:
+            for key in [key for key, status in self._statuses.items() if status.state != QUEUED and status.updated_at < oldest]:
+                del self._statuses[key]
+
+# Shared by every session of the server process.
+ENROLLMENT_INTAKE = EnrollmentIntake(
+    batch_size=ENROLLMENT_INTAKE_SETTINGS["batch_size"],
+    max_wait_ms=ENROLLMENT_INTAKE_SETTINGS["max_wait_ms"],
+    max_queue=ENROLLMENT_INTAKE_SETTINGS["max_queue"],
+    status_ttl=ENROLLMENT_INTAKE_SETTINGS["status_ttl"]
+)
+# Registered after db_utils' close_db_pools, so it runs before it (atexit is last in, first out).
+atexit.register(ENROLLMENT_INTAKE.close)
@@ -0,0 +1,134 @@
+# passwords.py
+import atexit
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from config import PASSWORD_SETTINGS
+
+# =================================================================
+# Hashing
+# =================================================================
+# bcrypt costs tens of milliseconds of CPU per password. It runs in a
+# bounded pool of worker threads: bcrypt releases the GIL while it hashes,
+# so a login storm uses several cores, and never more than hash_workers of
+# them, without forking the (multithreaded) server process.
+# =================================================================
+
+_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+# Checked against when the login code is unknown, so that answer takes as long as a wrong password.
+_DUMMY_HASH = None
+_DUMMY_HASH_LOCK = threading.Lock()
+
+def _hash_in_worker(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("ascii")
+
+def _check_in_worker(password, stored_hash):
+    return bcrypt.checkpw(password.encode("utf-8"), stored_hash.encode("ascii"))
+
+def _run(func, *args):
+    """Runs a bcrypt call in the worker pool, or inline when hash_workers is 0."""
+    global _EXECUTOR
+    if PASSWORD_SETTINGS["hash_workers"] <= 0:
+        return func(*args)
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=PASSWORD_SETTINGS["hash_workers"], thread_name_prefix="bcrypt")
+            atexit.register(_EXECUTOR.shutdown, wait=False)
+    return _EXECUTOR.submit(func, *args).result()
+
+def is_bcrypt_hash(value):
+    return isinstance(value, str) and value.startswith(_BCRYPT_PREFIXES) and len(value) == 60
+
+def hash_rounds(stored_hash):
+    """The cost factor of a bcrypt hash ($2b$12$... -> 12)."""
+    return int(stored_hash[4:6])
+
+def hash_password(password, rounds=None):
+    """Hashes a password with bcrypt at the configured cost factor."""
+    return _run(_hash_in_worker, password, rounds or PASSWORD_SETTINGS["bcrypt_rounds"])
+
+def _dummy_hash():
+    global _DUMMY_HASH
+    with _DUMMY_HASH_LOCK:
+        if _DUMMY_HASH is None:
+            _DUMMY_HASH = hash_password(os.urandom(16).hex())
+    return _DUMMY_HASH
+
+def verify_password(password, stored_hash):
+    """
+    Checks a password against the stored value. Returns (ok, needs_rehash):
+    needs_rehash is True for a legacy plaintext value or a bcrypt hash made
+    with another cost factor than the configured one. Without a stored value
+    (unknown login code) the password is still checked against a dummy hash,
+    so the answer does not tell which login codes exist.
+    """
+    if not stored_hash:
+        _run(_check_in_worker, password, _dummy_hash())
+        return (False, False)
+    if not is_bcrypt_hash(stored_hash):
+        # Legacy row stored before hashing: compare in constant time, then upgrade it.
+        ok = hmac.compare_digest(password.encode("utf-8"), stored_hash.encode("utf-8"))
+        return (ok, ok)
+    ok = _run(_check_in_worker, password, stored_hash)
+    return (ok, ok and hash_rounds(stored_hash) != PASSWORD_SETTINGS["bcrypt_rounds"])
+
+# =================================================================
+# Failed Login Cache
+# =================================================================
+
+class FailedLoginCache:
+    """
+    Remembers, for a few seconds, the (login code, password) pairs that just
+    failed, so a client retrying the same wrong password costs neither a
+    query nor a bcrypt check. Passwords are kept as keyed digests only.
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = os.urandom(32)
+        self._entries = OrderedDict() # (login_code, digest) -> expires_at
+        self._lock = threading.Lock()
+
+    def _entry_key(self, login_code, password):
+        return (login_code, hmac.new(self._key, password.encode("utf-8"), hashlib.sha256).digest())
+
+    def add(self, login_code, password):
+        key = self._entry_key(login_code, password)
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def contains(self, login_code, password):
+        key = self._entry_key(login_code, password)
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def forget(self, login_code):
+        """Drops every failure of a login code, e.g. after its password or account changed."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == login_code]:
+                del self._entries[key]
+
+# Shared by every session of the server process.
+FAILED_LOGINS = FailedLoginCache(
+    ttl=PASSWORD_SETTINGS["failed_login_ttl"],
+    max_entries=PASSWORD_SETTINGS["failed_login_max_entries"]
+)
@@ -0,0 +1,162 @@
+# perf_monitor.py
+import logging
+import re
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from config import PERF_MONITOR_SETTINGS
+
+# =================================================================
+# SQL Fingerprints
+# =================================================================
+# Calls are grouped by a normalized form of their SQL: literals become
+# '?', IN lists collapse and whitespace/case are normalized, so the same
+# statement with different values is reported as one line.
+# =================================================================
+
+_COMMENT_PATTERN = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_PATTERN = re.compile(r'(?<![\w:$#])\d+(?:\.\d+)?\b')
+_IN_LIST_PATTERN = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE_PATTERN = re.compile(r'\s+')
+
+def fingerprint(statement):
+    """Normalizes a SQL statement so calls that only differ by their literals share one key."""
+    text = _COMMENT_PATTERN.sub(' ', statement)
+    text = _STRING_PATTERN.sub('?', text)
+    text = _NUMBER_PATTERN.sub('?', text)
+    text = _IN_LIST_PATTERN.sub('IN (...)', text)
+    return _SPACE_PATTERN.sub(' ', text).strip().upper()
+
+# =================================================================
+# Slow Query Log
+# =================================================================
+
+slow_query_logger = logging.getLogger("slow_queries")
+if PERF_MONITOR_SETTINGS.get("log_file") and not slow_query_logger.handlers:
+    _handler = logging.FileHandler(PERF_MONITOR_SETTINGS["log_file"], encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_query_logger.addHandler(_handler)
+    slow_query_logger.setLevel(logging.WARNING)
+    slow_query_logger.propagate = False
+
+# =================================================================
+# Monitor
+# =================================================================
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended.
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+def _bucket_label(index):
+    if index == len(LATENCY_BUCKETS_MS):
+        return f"> {LATENCY_BUCKETS_MS[-1]} ms"
+    return f"<= {LATENCY_BUCKETS_MS[index]} ms"
+
+class PerfMonitor:
+    """
+    Thread-safe, in-process statistics of the database calls made by db_utils.
+    Each statement keeps running totals plus its latest elapsed times, from
+    which the percentiles are computed.
+    """
+
+    def __init__(self, enabled=True, slow_query_ms=500, samples_per_statement=1000):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.samples_per_statement = samples_per_statement
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._statements = {} # (kind, fingerprint) -> stats dict
+            self._histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, kind, role, statement, elapsed, acquire_wait=0.0, rows=None, failed=False):
+        """Records one database call. `elapsed` and `acquire_wait` are in seconds."""
+        if not self.enabled:
+            return
+        elapsed_ms = elapsed * 1000
+        wait_ms = acquire_wait * 1000
+        key = (kind, fingerprint(statement))
+        bucket = int(np.searchsorted(LATENCY_BUCKETS_MS, elapsed_ms))
+
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = {
+                    "calls": 0, "errors": 0, "slow": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "wait_ms": 0.0, "rows": 0, "roles": set(),
+                    "samples": deque(maxlen=self.samples_per_statement)
+                }
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["wait_ms"] += wait_ms
+            stats["rows"] += rows or 0
+            stats["roles"].add(role)
+            stats["samples"].append(elapsed_ms)
+            self._histogram[bucket] += 1
+            is_slow = elapsed_ms >= self.slow_query_ms
+            stats["slow"] += int(is_slow)
+
+        if is_slow:
+            slow_query_logger.warning(
+                f"SLOW {kind} {elapsed_ms:.0f} ms (acquire wait {wait_ms:.0f} ms) role={role} "
+                f"rows={rows if rows is not None else '-'}{' FAILED' if failed else ''} sql={key[1]}"
+            )
+
+    def top_statements(self, order_by="TOTAL_MS", limit=20):
+        """The statements with the highest TOTAL_MS (or P95_MS, MAX_MS, CALLS...) as a DataFrame."""
+        with self._lock:
+            rows = []
+            for (kind, sql), stats in self._statements.items():
+                samples = np.fromiter(stats["samples"], dtype=float)
+                rows.append({
+                    "KIND": kind,
+                    "STATEMENT": sql,
+                    "CALLS": stats["calls"],
+                    "TOTAL_MS": round(stats["total_ms"], 1),
+                    "AVG_MS": round(stats["total_ms"] / stats["calls"], 1),
+                    "P50_MS": round(float(np.percentile(samples, 50)), 1),
+                    "P95_MS": round(float(np.percentile(samples, 95)), 1),
+                    "MAX_MS": round(stats["max_ms"], 1),
+                    "AVG_WAIT_MS": round(stats["wait_ms"] / stats["calls"], 1),
+                    "ROWS": stats["rows"],
+                    "SLOW": stats["slow"],
+                    "ERRORS": stats["errors"],
+                    "ROLES": ", ".join(sorted(stats["roles"]))
+                })
+        columns = ["KIND", "STATEMENT", "CALLS", "TOTAL_MS", "AVG_MS", "P50_MS", "P95_MS", "MAX_MS",
+                   "AVG_WAIT_MS", "ROWS", "SLOW", "ERRORS", "ROLES"]
+        df = pd.DataFrame(rows, columns=columns)
+        return df.sort_values(order_by, ascending=False).head(limit).reset_index(drop=True)
+
+    def histogram(self):
+        """Number of calls per latency bucket, for every statement together."""
+        with self._lock:
+            counts = list(self._histogram)
+        return pd.DataFrame({
+            "LATENCY": [_bucket_label(i) for i in range(len(counts))],
+            "CALLS": counts
+        })
+
+    def summary(self):
+        with self._lock:
+            calls = sum(s["calls"] for s in self._statements.values())
+            return {
+                "STATEMENTS": len(self._statements),
+                "CALLS": calls,
+                "SLOW_CALLS": sum(s["slow"] for s in self._statements.values()),
+                "ERRORS": sum(s["errors"] for s in self._statements.values()),
+                "TOTAL_MS": round(sum(s["total_ms"] for s in self._statements.values()), 1),
+                "SLOW_QUERY_MS": self.slow_query_ms,
+            }
+
+# The process-wide monitor shared by every session (like the connection pools).
+PERF_MONITOR = PerfMonitor(
+    enabled=PERF_MONITOR_SETTINGS["enabled"],
+    slow_query_ms=PERF_MONITOR_SETTINGS["slow_query_ms"],
+    samples_per_statement=PERF_MONITOR_SETTINGS["samples_per_statement"]
+)
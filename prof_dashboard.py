@@ -1,20 +1,59 @@
 # prof_dashboard.py
 import streamlit as st
 import pandas as pd
-from db_utils import execute_query, execute_dml, call_procedure, call_function_ref_cursor
+from db_utils import (
+    execute_query, execute_dml, execute_many, call_procedure, call_function_ref_cursor, prefetch_queries
+)
+from session_profile import get_session_profile
+from df_utils import flag_rows, bind_rows
+from enrollment_decisions import display_bulk_decision
+
+# --- Queries ---
+# Shared by the tabs and by prefetch_prof_dashboard, which loads them all
+# concurrently before the tabs render.
+CURRENT_COURSES_QUERY = """
+    SELECT c.COURSE_ID, c.NAME FROM COURSE c
+    JOIN PROF_COURSE pc ON c.COURSE_ID = pc.COURSE_ID
+    JOIN SEMESTRE s ON c.SEMESTRE_ID = s.SEMESTRE_ID
+    WHERE pc.PROF_ID = :1 AND s.YEAR_ID = (SELECT MAX(YEAR_ID) FROM ACADEMIC_YEAR)
+"""
+BLOCKED_STUDENTS_QUERY = "SELECT STUDENT_ID, COURSE_NAME FROM V_PROF_BLOCKED_STUDENTS WHERE PROF_ID = :1"
+SEANCES_QUERY = "SELECT SEANCE_ID, COURSE_NAME, TO_CHAR(SEANCE_DATE, 'YYYY-MM-DD') || ' (' || TYPE || ')' AS SEANCE_DISPLAY FROM V_PROF_SEANCES WHERE PROF_ID = :1 ORDER BY SEANCE_DATE DESC"
+GRADING_COURSES_QUERY = "SELECT COURSE_ID, COURSE_NAME FROM V_PROF_COURSES WHERE PROF_ID = :1"
+ABSENCE_SUMMARY_QUERY = """
+    SELECT 
+        s.FULL_NAME as "Student Name", 
+        c.NAME as "Course", 
+        COUNT(CASE WHEN a.STATUS = 'ABSENT' THEN 1 END) as "Absence Count"
+    FROM ATTENDANCE a
+    JOIN STUDENT s ON a.student_id = s.student_id
+    JOIN SEANCE se ON a.seance_id = se.seance_id
+    JOIN COURSE c ON se.course_id = c.course_id
+    JOIN PROF_COURSE pc ON c.course_id = pc.course_id
+    WHERE pc.prof_id = :1
+    GROUP BY s.FULL_NAME, c.NAME
+    HAVING COUNT(CASE WHEN a.STATUS = 'ABSENT' THEN 1 END) > 0
+    ORDER BY "Absence Count" DESC, s.FULL_NAME
+"""
+# Attendance rows are created on the first mark; before it the roster shows PLANNED.
+MARK_ATTENDANCE_DML = """
+    MERGE INTO ATTENDANCE a
+    USING (SELECT :1 AS STATUS, :2 AS SEANCE_ID, :3 AS STUDENT_ID FROM DUAL) m
+    ON (a.SEANCE_ID = m.SEANCE_ID AND a.STUDENT_ID = m.STUDENT_ID)
+    WHEN MATCHED THEN UPDATE SET a.STATUS = m.STATUS
+    WHEN NOT MATCHED THEN INSERT (SEANCE_ID, STUDENT_ID, STATUS) VALUES (m.SEANCE_ID, m.STUDENT_ID, m.STATUS)
+"""
 
 # --- Helper Functions ---
-def get_prof_id(login_code):
-    """Fetches professor ID from login code and caches it."""
-    if 'prof_id' not in st.session_state or st.session_state.get('login_code') != login_code:
-        prof_df = execute_query("SELECT PROF_ID FROM PROF WHERE CODE_APOGE = :1", [login_code])
-        if not prof_df.empty:
-            st.session_state.prof_id = int(prof_df.iloc[0]['PROF_ID'])
-            st.session_state.login_code = login_code
-        else:
-            st.error("Could not identify professor profile. Please contact an administrator.")
-            return None
-    return st.session_state.prof_id
+def prefetch_prof_dashboard(prof_id):
+    """Loads the independent queries of every tab concurrently."""
+    prefetch_queries([
+        (CURRENT_COURSES_QUERY, [prof_id]),
+        (BLOCKED_STUDENTS_QUERY, [prof_id]),
+        (SEANCES_QUERY, [prof_id]),
+        (GRADING_COURSES_QUERY, [prof_id]),
+        (ABSENCE_SUMMARY_QUERY, [prof_id]),
+    ])
 
 # --- UI Components for Tabs ---
 
@@ -23,13 +62,7 @@ def display_course_overview(prof_id):
     st.subheader("My Courses & Students")
 
     # Fetch professor's courses for the current academic year
-    courses_query = """
-        SELECT c.COURSE_ID, c.NAME FROM COURSE c
-        JOIN PROF_COURSE pc ON c.COURSE_ID = pc.COURSE_ID
-        JOIN SEMESTRE s ON c.SEMESTRE_ID = s.SEMESTRE_ID
-        WHERE pc.PROF_ID = :1 AND s.YEAR_ID = (SELECT MAX(YEAR_ID) FROM ACADEMIC_YEAR)
-    """
-    courses_df = execute_query(courses_query, [prof_id])
+    courses_df = execute_query(CURRENT_COURSES_QUERY, [prof_id])
 
     if not courses_df.empty:
         selected_course = st.selectbox("Select a course to view student enrollments:", courses_df['NAME'].tolist())
@@ -42,22 +75,18 @@ def display_course_overview(prof_id):
                 SELECT s.STUDENT_ID, s.FULL_NAME, ir.STATUS as INSCRIPTION_STATUS, ir.REQUEST_ID
                 FROM STUDENT s
                 JOIN INSCRIPTION_REQUEST ir ON s.STUDENT_ID = ir.STUDENT_ID
-                WHERE ir.COURSE_ID = :1 AND ir.STATUS IN ('PENDING', 'ACCEPTED')
+                WHERE ir.COURSE_ID = :1 AND ir.STATUS IN ('PENDING', 'ACCEPTED', 'WAITLISTED')
             """
             students_df = execute_query(students_query, [course_id])
             
             # Fetch blocked students for this professor's courses
-            blocked_students_df = execute_query("SELECT STUDENT_ID, COURSE_NAME FROM V_PROF_BLOCKED_STUDENTS WHERE PROF_ID = :1", [prof_id])
+            blocked_students_df = execute_query(BLOCKED_STUDENTS_QUERY, [prof_id])
 
             if not students_df.empty:
-                def get_academic_status(row):
-                    is_blocked = blocked_students_df[
-                        (blocked_students_df['STUDENT_ID'] == row['STUDENT_ID']) & 
-                        (blocked_students_df['COURSE_NAME'] == selected_course)
-                    ]
-                    return "BLOCKED" if not is_blocked.empty else "OK"
-                
-                students_df['ACADEMIC_STATUS'] = students_df.apply(get_academic_status, axis=1)
+                students_df['ACADEMIC_STATUS'] = flag_rows(
+                    students_df.assign(COURSE_NAME=selected_course), blocked_students_df,
+                    ['STUDENT_ID', 'COURSE_NAME'], "BLOCKED", "OK"
+                )
                 st.dataframe(students_df[['FULL_NAME', 'INSCRIPTION_STATUS', 'ACADEMIC_STATUS']], use_container_width=True)
             else:
                 st.info("No students have requested enrollment for this course yet.")
@@ -65,7 +94,11 @@ def display_course_overview(prof_id):
             # --- Manage Pending Requests ---
             st.divider()
             st.markdown("#### Manage Pending Requests")
-            pending_requests_df = students_df[students_df['INSCRIPTION_STATUS'] == 'PENDING']
+            # Always rendered: it also shows the outcome of the last bulk run, even once nothing is left pending.
+            display_bulk_decision(course_id, students_df.rename(columns={'INSCRIPTION_STATUS': 'STATUS'}), key=f"prof_bulk_{course_id}")
+            if students_df.empty:
+                return
+            pending_requests_df = students_df[students_df['INSCRIPTION_STATUS'].isin(['PENDING', 'WAITLISTED'])]
 
             if not pending_requests_df.empty:
                 for _, row in pending_requests_df.iterrows():
@@ -73,7 +106,7 @@ def display_course_overview(prof_id):
                     student_name = row['FULL_NAME']
                     
                     col1, col2, col3 = st.columns([2, 1, 1])
-                    col1.write(student_name)
+                    col1.write(student_name if row['INSCRIPTION_STATUS'] == 'PENDING' else f"{student_name} (waitlisted)")
                     
                     if col2.button("✅ Accept", key=f"accept_{request_id}"):
                         success, msg = execute_dml("UPDATE INSCRIPTION_REQUEST SET status = 'ACCEPTED' WHERE request_id = :1", [request_id])
@@ -101,7 +134,7 @@ def display_attendance_management(prof_id):
     st.info("ℹ️ Note: The system will automatically block a student from a course after 3 recorded absences.", icon="ℹ️")
 
     # Select a course, then a seance
-    seances_df = execute_query("SELECT SEANCE_ID, COURSE_NAME, TO_CHAR(SEANCE_DATE, 'YYYY-MM-DD') || ' (' || TYPE || ')' AS SEANCE_DISPLAY FROM V_PROF_SEANCES WHERE PROF_ID = :1 ORDER BY SEANCE_DATE DESC", [prof_id])
+    seances_df = execute_query(SEANCES_QUERY, [prof_id])
 
     if not seances_df.empty:
         seances_df['display'] = seances_df['COURSE_NAME'] + ' - ' + seances_df['SEANCE_DISPLAY']
@@ -151,28 +184,48 @@ def display_attendance_management(prof_id):
             st.write(f"**{len(students_in_seance_df)} students in this session:**")
             status_options = ['PLANNED', 'PRESENT', 'ABSENT', 'LATE', 'ABSENT AVEC JUSTIFICATION']
 
-            for _, student in students_in_seance_df.iterrows():
-                cols = st.columns([3, 2, 1])
-                cols[0].write(student['FULL_NAME'])
-                
-                current_status_index = status_options.index(student['STATUS']) if student['STATUS'] in status_options else 0
-                
-                new_status = cols[1].selectbox(
-                    "Status", options=status_options, index=current_status_index, 
-                    key=f"status_{seance_id}_{student['STUDENT_ID']}", label_visibility="collapsed"
-                )
-                
-                if cols[2].button("Update", key=f"update_{seance_id}_{student['STUDENT_ID']}"):
-                    if new_status != student['STATUS']:
-                        success, msg = execute_dml(
-                            "UPDATE ATTENDANCE SET STATUS = :1 WHERE SEANCE_ID = :2 AND STUDENT_ID = :3",
-                            [new_status, seance_id, int(student['STUDENT_ID'])]
-                        )
-                        if success:
-                            st.toast(f"Updated {student['FULL_NAME']} to {new_status}", icon="✅")
-                            st.rerun()
-                        else:
-                            st.error(f"Failed to update: {msg}")
+            # Edit the whole roster at once; only the changed rows are written on save.
+            roster_df = students_in_seance_df[['STUDENT_ID', 'FULL_NAME', 'STATUS']].reset_index(drop=True)
+            edited_df = st.data_editor(
+                roster_df,
+                key=f"roster_{seance_id}",
+                disabled=['STUDENT_ID', 'FULL_NAME'],
+                column_config={
+                    "STUDENT_ID": None,
+                    "FULL_NAME": "Student",
+                    "STATUS": st.column_config.SelectboxColumn("Status", options=status_options, required=True)
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+
+            changed_df = edited_df[edited_df['STATUS'] != roster_df['STATUS']]
+
+            # The failures of a partial save survive the rerun that reloads the saved rows.
+            last_failures = st.session_state.pop(f"roster_{seance_id}_failures", None)
+            if last_failures is not None:
+                msg, failures = last_failures
+                st.error(msg)
+                for student_name, row_msg in failures:
+                    st.warning(f"**{student_name}:** {row_msg}")
+            st.caption(f"{len(changed_df)} unsaved change(s).")
+
+            if st.button("💾 Save all", key=f"save_roster_{seance_id}", disabled=changed_df.empty):
+                rows = [[status, seance_id, student_id] for status, student_id in bind_rows(changed_df, ['STATUS', 'STUDENT_ID'])]
+                success, msg, row_results = execute_many(MARK_ATTENDANCE_DML, rows)
+                failures = [(student_name, row_msg) for student_name, (ok, row_msg) in zip(changed_df['FULL_NAME'], row_results) if not ok]
+                if success:
+                    st.toast(f"Saved attendance for {len(rows)} student(s).", icon="✅")
+                    st.rerun()
+                elif len(failures) == len(rows):
+                    st.error(f"No attendance was saved: {msg}")
+                else:
+                    # Reload the roster: the saved rows stop being changes, the failed ones stay pending.
+                    st.session_state[f"roster_{seance_id}_failures"] = (
+                        f"Attendance saved for {len(rows) - len(failures)} of {len(rows)} student(s); "
+                        f"{len(failures)} could not be saved.", failures
+                    )
+                    st.rerun()
         else:
             st.info("No students found for this session.")
     else:
@@ -183,7 +236,7 @@ def display_grade_submission(prof_id):
     st.subheader("Grade Submission")
 
     # Corrected: Select COURSE_NAME instead of NAME
-    courses_df = execute_query("SELECT COURSE_ID, COURSE_NAME FROM V_PROF_COURSES WHERE PROF_ID = :1", [prof_id])
+    courses_df = execute_query(GRADING_COURSES_QUERY, [prof_id])
     if courses_df.empty:
         st.info("You have no courses to submit grades for.")
         return
@@ -222,22 +275,7 @@ def display_student_performance(prof_id):
     st.markdown("#### Absence Summary")
     st.write("This table shows the total number of recorded absences for each student in your courses.")
 
-    absence_query = """
-        SELECT 
-            s.FULL_NAME as "Student Name", 
-            c.NAME as "Course", 
-            COUNT(CASE WHEN a.STATUS = 'ABSENT' THEN 1 END) as "Absence Count"
-        FROM ATTENDANCE a
-        JOIN STUDENT s ON a.student_id = s.student_id
-        JOIN SEANCE se ON a.seance_id = se.seance_id
-        JOIN COURSE c ON se.course_id = c.course_id
-        JOIN PROF_COURSE pc ON c.course_id = pc.course_id
-        WHERE pc.prof_id = :1
-        GROUP BY s.FULL_NAME, c.NAME
-        HAVING COUNT(CASE WHEN a.STATUS = 'ABSENT' THEN 1 END) > 0
-        ORDER BY "Absence Count" DESC, s.FULL_NAME
-    """
-    absence_stats_df = execute_query(absence_query, [prof_id])
+    absence_stats_df = execute_query(ABSENCE_SUMMARY_QUERY, [prof_id])
 
     if not absence_stats_df.empty:
         st.dataframe(absence_stats_df, use_container_width=True, hide_index=True)
@@ -248,12 +286,16 @@ def display_student_performance(prof_id):
 def display_prof_dashboard():
     """Main function to display the professor dashboard."""
     
-    login_code = st.session_state.user_info['LOGIN_CODE']
-    prof_id = get_prof_id(login_code)
+    prof_id = get_session_profile().prof_id
 
-    if prof_id:
+    if prof_id is None:
+        st.error("Could not identify professor profile. Please contact an administrator.")
+    else:
         st.title(f"🧑‍🏫 Professor Dashboard")
 
+        # Every tab body runs on each rerun, so load their queries in one parallel batch.
+        prefetch_prof_dashboard(prof_id)
+
         tab1, tab2, tab3, tab4 = st.tabs([
             "My Courses", 
             "Attendance", 
@@ -0,0 +1,225 @@
+# query_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from config import QUERY_CACHE_SETTINGS
+
+# =================================================================
+# Table Dependencies
+# =================================================================
+# A cached SELECT depends on every table it reads. Views are expanded to
+# their base tables, so a write to COURSE also drops cached reads of
+# V_DETAIL_COURSE. Keep these maps in sync with db.sql.
+# =================================================================
+
+VIEW_DEPENDENCIES = {
+    "V_DETAIL_STUDENT": {"STUDENT", "FILIERE", "SEMESTRE", "USER_ACCOUNT"},
+    "V_DETAIL_DEPARTEMENT": {"DEPARTEMENT", "FILIERE", "PROF"},
+    "V_DETAIL_COURSE": {"COURSE", "FILIERE", "SEMESTRE", "PROF_COURSE", "PROF"},
+    "V_DETAIL_PREREQUISITE_COURSE": {"COURSE_PREREQUISITE", "COURSE"},
+    "V_DETAIL_FILIERE": {"FILIERE", "DEPARTEMENT", "SEMESTRE"},
+    "V_DETAIL_SEANCE_COURSE": {"SEANCE", "COURSE", "SECTION"},
+    "V_DETAIL_STUDENT_BLOCKED": {"COURSE_RESULT", "STUDENT", "COURSE"},
+    "V_DASHBOARD_STATS": {"DASHBOARD_STATS_SNAPSHOT"},
+    "V_STUDENTS_WARNING": {"ATTENDANCE", "SEANCE", "COURSE", "STUDENT"},
+    "V_COURSE_ATTENDANCE_RATE": {"ATTENDANCE", "SEANCE", "INSCRIPTION_REQUEST", "COURSE"},
+    "V_STUDENT_CURRENT_COURSES": {"STUDENT", "SEMESTRE", "COURSE", "COURSE_RESULT"},
+    "V_STUDENT_COURSE_SEANCES": {"STUDENT", "COURSE", "SEANCE"},
+    "V_STUDENT_ATTENDANCE": {"ATTENDANCE", "SEANCE", "INSCRIPTION_REQUEST", "COURSE"},
+    "V_STUDENT_ABSENCE_STATS": {"ATTENDANCE", "SEANCE", "INSCRIPTION_REQUEST", "COURSE"},
+    "V_STUDENT_BLOCKED_COURSES": {"COURSE_RESULT", "COURSE"},
+    "V_STUDENT_PREREQUISITE_MISSING": {"STUDENT", "COURSE", "COURSE_PREREQUISITE", "COURSE_RESULT"},
+    "V_STUDENT_DASHBOARD_SUMMARY": {"STUDENT", "COURSE", "COURSE_RESULT", "ATTENDANCE"},
+    "V_PROF_COURSES": {"PROF", "PROF_COURSE", "COURSE", "FILIERE", "SEMESTRE"},
+    "V_PROF_SEANCES": {"PROF", "PROF_COURSE", "COURSE", "SEANCE", "SECTION"},
+    "V_PROF_STUDENTS_BY_COURSE": {"PROF", "PROF_COURSE", "COURSE", "INSCRIPTION_REQUEST", "STUDENT"},
+    "V_PROF_ATTENDANCE_BY_SEANCE": {"PROF", "PROF_COURSE", "COURSE", "SEANCE", "ATTENDANCE", "INSCRIPTION_REQUEST", "STUDENT"},
+    "V_PROF_ABSENCE_STATS": {"PROF", "PROF_COURSE", "COURSE", "SEANCE", "ATTENDANCE", "INSCRIPTION_REQUEST"},
+    "V_PROF_BLOCKED_STUDENTS": {"PROF", "PROF_COURSE", "COURSE", "COURSE_RESULT", "STUDENT"},
+    "V_PROF_DASHBOARD_SUMMARY": {"PROF", "PROF_COURSE", "COURSE", "SEANCE", "INSCRIPTION_REQUEST", "STUDENT"},
+    "V_LOGIN_PROFILE": {"USER_ACCOUNT", "STUDENT", "FILIERE", "SEMESTRE", "PROF", "ADMIN"},
+    "V_ABSENCE_STREAK": {"ATTENDANCE", "SEANCE"},
+    "V_SEANCE_ROSTER": {"SEANCE", "INSCRIPTION_REQUEST", "ATTENDANCE"},
+}
+
+# Tables that triggers also write when a table is written.
+TRIGGER_SIDE_EFFECTS = {
+    "INSCRIPTION_REQUEST": {"COURSE_SEAT"},  # trg_course_seat_ledger
+    "COURSE": {"COURSE_SEAT"},              # trg_course_seat_init
+    "ATTENDANCE": {"ABSENCE_STATE", "COURSE_RESULT"},     # trg_absence_state
+    "UNBLOCK_REQUEST": {"ATTENDANCE", "ABSENCE_STATE"},   # trg_justify_absences_after_unblock
+    "STUDENT": {"STUDENT_SEARCH_GRAM"},     # trg_student_search_grams
+    "FILIERE": {"STUDENT"},                 # trg_filiere_search_key
+    "SEANCE": {"SEANCE_OCCUPANCY"},         # trg_check_seance_overlap
+    "PROF_COURSE": {"SEANCE_OCCUPANCY"},    # trg_prof_course_occupancy
+}
+
+# Tables written by the stored procedures called through call_procedure.
+PROCEDURE_WRITES = {
+    "ADMIN_UNBLOCK_STUDENT": {"UNBLOCK_REQUEST", "COURSE_RESULT"},
+    "SP_PROF_SUBMIT_GRADE": {"COURSE_RESULT"},
+    "SP_RECONCILE_COURSE_SEATS": {"COURSE_SEAT"},
+    "SP_BULK_DECIDE_INSCRIPTIONS": {"INSCRIPTION_REQUEST"},
+    "SP_REBUILD_ABSENCE_STATE": {"ABSENCE_STATE", "COURSE_RESULT"},
+    "SP_REFRESH_DASHBOARD_STATS": {"DASHBOARD_STATS_SNAPSHOT"},
+}
+
+_READ_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+([A-Z_][\w$#.]*)', re.IGNORECASE)
+_WRITE_TABLE_PATTERN = re.compile(
+    r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|DELETE|MERGE\s+INTO)\s+([A-Z_][\w$#.]*)', re.IGNORECASE
+)
+
+def _table_name(identifier):
+    """Strips the schema prefix (YAHYA_ADMIN.COURSE -> COURSE) and normalizes the case."""
+    return identifier.split('.')[-1].upper()
+
+def tables_read_by(query):
+    """Gets the base tables a SELECT depends on, with views expanded."""
+    tables = set()
+    for identifier in _READ_TABLE_PATTERN.findall(query):
+        name = _table_name(identifier)
+        tables.add(name)
+        tables.update(VIEW_DEPENDENCIES.get(name, ()))
+    return tables
+
+def with_side_effects(tables):
+    """Adds the tables that triggers write as a consequence of writing `tables`."""
+    pending, result = list(tables), set()
+    while pending:
+        table = _table_name(pending.pop())
+        if table not in result:
+            result.add(table)
+            pending.extend(TRIGGER_SIDE_EFFECTS.get(table, ()))
+    return result
+
+def tables_written_by(dml_statement):
+    """Gets the tables a DML statement writes, including trigger side effects."""
+    match = _WRITE_TABLE_PATTERN.match(dml_statement)
+    if not match:
+        return None # Unknown statement: the caller should drop the whole cache
+    return with_side_effects([match.group(1)])
+
+def tables_written_by_procedure(proc_name):
+    """Gets the tables a stored procedure writes, or None when it is not mapped."""
+    tables = PROCEDURE_WRITES.get(_table_name(proc_name))
+    return with_side_effects(tables) if tables is not None else None
+
+# =================================================================
+# Cache
+# =================================================================
+
+def make_key(role, query, params=None, *extra):
+    """Builds the cache key from role + SQL + binds. Returns None if the binds are unhashable."""
+    if params is None:
+        binds = ()
+    elif isinstance(params, dict):
+        binds = tuple(sorted(params.items()))
+    else:
+        binds = tuple(params)
+    key = (role, query, binds) + extra
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results with a per-entry TTL. Every entry
+    records the tables it was read from, so writes only drop what they affect.
+    Every table also has a version, bumped when it is invalidated: a reader
+    takes the versions before its query and hands them to `put`, which then
+    refuses a result that a write may have made stale in the meantime.
+    """
+
+    def __init__(self, max_entries=512, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires_at, tables, value)
+        self._lock = threading.Lock()
+        self._versions = {} # table -> number of invalidations
+        self._generation = 0 # number of clear() calls
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Returns a copy of the cached DataFrame, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[2]
+        # Callers add display columns to the frames they get, so never hand out the cached one.
+        return value.copy()
+
+    def contains(self, key):
+        """True when `key` has a live entry. Does not count as a lookup."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    def versions(self, tables):
+        """The current versions of `tables`, to take before running the query that reads them."""
+        tables = sorted({_table_name(t) for t in tables})
+        with self._lock:
+            return (self._generation, tuple((t, self._versions.get(t, 0)) for t in tables))
+
+    def put(self, key, value, tables, ttl=None, versions=None):
+        """
+        Caches `value`. With `versions` (from versions()), the value is dropped
+        instead when one of its tables was invalidated since. Returns True when cached.
+        """
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            if versions is not None:
+                generation, table_versions = versions
+                if generation != self._generation or any(self._versions.get(t, 0) != v for t, v in table_versions):
+                    return False
+            self._entries[key] = (expires_at, frozenset(tables), value.copy())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def invalidate_tables(self, tables):
+        """Drops every entry that read one of `tables`. Returns the number of dropped entries."""
+        tables = {_table_name(t) for t in tables}
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            stale = [key for key, (_, deps, _) in self._entries.items() if deps & tables]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ENTRIES": len(self._entries),
+                "MAX_ENTRIES": self.max_entries,
+                "HITS": self.hits,
+                "MISSES": self.misses,
+                "HIT_RATE_PCT": round(100 * self.hits / lookups, 1) if lookups else 0.0,
+                "INVALIDATED": self.invalidations,
+            }
+
+# The process-wide cache shared by every session (like the connection pools).
+QUERY_CACHE = QueryCache(
+    max_entries=QUERY_CACHE_SETTINGS["max_entries"],
+    ttl=QUERY_CACHE_SETTINGS["ttl"]
+)
@@ -0,0 +1,37 @@
+# reconcile_seats.py
+"""
+Rebuilds the COURSE_SEAT counters (the seat ledger that enforces course
+capacity) from the ACCEPTED inscription requests. The counters are kept
+exact by trg_course_seat_ledger; this job repairs them after manual data
+fixes or imports, and reports how many courses were off.
+
+Run it once, or keep it running to reconcile periodically (e.g. nightly
+from cron, or with --every).
+
+Usage:
+    python reconcile_seats.py
+    python reconcile_seats.py --every 3600
+"""
+import argparse
+import time
+
+from db_utils import init_client_mode, reconcile_course_seats, close_db_pools
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the course seat counters from the inscription requests.")
+    parser.add_argument("--every", type=int, default=0, help="Seconds between two runs (0: run once).")
+    args = parser.parse_args()
+
+    init_client_mode()
+    try:
+        while True:
+            success, msg = reconcile_course_seats(role="ADMIN", client_id="seat-reconcile")
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {'OK' if success else 'FAILED'}: {msg}")
+            if args.every <= 0:
+                break
+            time.sleep(args.every)
+    finally:
+        close_db_pools()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# refresh_stats.py
+"""
+Takes a snapshot of the admin dashboard statistics (students, profs,
+courses, FAILED results) into DASHBOARD_STATS_SNAPSHOT. db.sql schedules
+the same refresh every 5 minutes with DBMS_SCHEDULER; use this job where
+the schema owner cannot create scheduler jobs, or to refresh right after
+an import. Every run prints how long the counting and the whole call took.
+
+Usage:
+    python refresh_stats.py
+    python refresh_stats.py --every 300
+"""
+import argparse
+import time
+
+from db_utils import init_client_mode, refresh_dashboard_stats, close_db_pools
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot the admin dashboard statistics.")
+    parser.add_argument("--every", type=int, default=0, help="Seconds between two runs (0: run once).")
+    args = parser.parse_args()
+
+    init_client_mode()
+    try:
+        while True:
+            start = time.perf_counter()
+            success, msg = refresh_dashboard_stats(role="ADMIN", client_id="stats-refresh")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {'OK' if success else 'FAILED'} in {elapsed_ms:.1f} ms: {msg}")
+            if args.every <= 0:
+                break
+            time.sleep(args.every)
+    finally:
+        close_db_pools()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+# scheduler.py
+import bisect
+import datetime
+from dataclasses import dataclass
+import pandas as pd
+from db_utils import ROLLED_BACK, execute_many, execute_query
+
+# =================================================================
+# Recurring Seances
+# =================================================================
+# A semester of weekly seances is scheduled in one operation: the weekly
+# pattern is expanded into dated occurrences here, every occurrence is
+# checked against an in-memory view of the room's and professors' bookings
+# over the date range (read once from SEANCE_OCCUPANCY), and the free ones
+# are inserted with one executemany and one commit. Conflicts come back as
+# a report instead of stopping the run at the first trigger error; the
+# trigger still guards against bookings made in the meantime.
+# =================================================================
+
+CREATED = "CREATED"
+CONFLICT = "CONFLICT"
+FAILED = "FAILED"
+PLANNED = "PLANNED" # Dry run: free, but not inserted
+
+REPORT_COLUMNS = ["SEANCE_DATE", "START", "END", "COURSE_ID", "SECTION_ID", "TYPE", "ROOM", "STATUS", "REASON"]
+
+OCCUPANCY_COLUMNS = ["RESOURCE_TYPE", "RESOURCE_KEY", "SEANCE_DATE", "START_TIME", "END_TIME"]
+SEANCE_DML = "INSERT INTO SEANCE (COURSE_ID, SECTION_ID, SEANCE_DATE, START_TIME, END_TIME, ROOM, TYPE) VALUES (:1, :2, :3, :4, :5, :6, :7)"
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+@dataclass(frozen=True, slots=True)
+class WeeklySlot:
+    """
+    One weekly seance of the pattern: weekday 0 = Monday. room=None takes the
+    pattern's room; section_id=None makes it a seance shared by all sections.
+    """
+    weekday: int
+    start: datetime.time
+    end: datetime.time
+    seance_type: str
+    room: str | None = None
+    section_id: int | None = None
+
+@dataclass(frozen=True, slots=True)
+class Occurrence:
+    course_id: int
+    section_id: int
+    seance_date: datetime.date
+    start_time: datetime.datetime
+    end_time: datetime.datetime
+    seance_type: str
+    room: str | None
+
+def expand_occurrences(course_id, slots, first_day, last_day, excluded_dates=(), section_ids=(), room=None):
+    """
+    Dates every weekly slot of a course between first_day and last_day
+    (inclusive), minus the excluded dates. A slot of one section is recorded
+    for it; a shared slot (no section_id) is attended by all `section_ids` and
+    recorded once, for the first of them, like create_seances_for_all_sections
+    does: one seance per section would book the same room and professors
+    several times. Ordered by date, start and section.
+    """
+    excluded = set(excluded_dates)
+    occurrences = []
+    for slot in slots:
+        slot_room = (slot.room or room or "").strip() or None
+        section_id = slot.section_id if slot.section_id is not None else next(iter(section_ids), None)
+        if section_id is None:
+            continue # Shared slot of a course without sections: nowhere to record it
+        day = first_day + datetime.timedelta(days=(slot.weekday - first_day.weekday()) % 7)
+        while day <= last_day:
+            if day not in excluded:
+                start = datetime.datetime.combine(day, slot.start)
+                end = datetime.datetime.combine(day, slot.end)
+                occurrences.append(Occurrence(int(course_id), int(section_id), day, start, end, slot.seance_type, slot_room))
+            day += datetime.timedelta(days=7)
+    occurrences.sort(key=lambda o: (o.seance_date, o.start_time, o.section_id))
+    return occurrences
+
+class BookingIndex:
+    """
+    Bookings per (resource type, resource key, day), kept sorted by start,
+    with the running maximum of their ends. Bookings of one resource may
+    overlap (SEANCE_OCCUPANCY holds slots copied without a check, e.g. by the
+    backfill), so a lookup bisects to the last booking starting before the
+    end, then walks back while an earlier booking can still reach the start.
+    """
+
+    def __init__(self):
+        self._days = {} # (resource_type, resource_key, date) -> ([starts], [ends], [max end of starts[:i + 1]])
+
+    def add(self, resource_type, resource_key, day, start, end):
+        starts, ends, max_ends = self._days.setdefault((resource_type, resource_key, day), ([], [], []))
+        i = bisect.bisect_right(starts, start)
+        starts.insert(i, start)
+        ends.insert(i, end)
+        max_ends.insert(i, max(end, max_ends[i - 1]) if i else end)
+        # The later maxima only grow, and stop growing at the first that already reaches `end`.
+        for j in range(i + 1, len(max_ends)):
+            if max_ends[j] >= end:
+                break
+            max_ends[j] = end
+
+    def overlapping(self, resource_type, resource_key, day, start, end):
+        """A (start, end) booking overlapping [start, end), or None."""
+        booked = self._days.get((resource_type, resource_key, day))
+        if not booked:
+            return None
+        starts, ends, max_ends = booked
+        i = bisect.bisect_left(starts, end) - 1
+        while i >= 0 and max_ends[i] > start:
+            if ends[i] > start:
+                return (starts[i], ends[i])
+            i -= 1
+        return None
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime.datetime) else value
+
+def load_occupancy(resources, first_day, last_day):
+    """
+    The SEANCE_OCCUPANCY slots of `resources`, [(resource_type, resource_key)],
+    between first_day and last_day (OCCUPANCY_COLUMNS). A frame without
+    columns means the read failed (the error is already displayed).
+    """
+    resources = sorted(set(resources))
+    if not resources:
+        return pd.DataFrame(columns=OCCUPANCY_COLUMNS)
+    binds = ", ".join(f"(:{2 * i + 1}, :{2 * i + 2})" for i in range(len(resources)))
+    params = [value for resource in resources for value in resource] + [first_day, last_day]
+    return execute_query(f"""
+        SELECT {", ".join(OCCUPANCY_COLUMNS)}
+        FROM SEANCE_OCCUPANCY
+        WHERE (RESOURCE_TYPE, RESOURCE_KEY) IN ({binds})
+          AND SEANCE_DATE BETWEEN :{len(params) - 1} AND :{len(params)}
+    """, params, cache=False)
+
+def _load_bookings(occurrences):
+    """
+    BookingIndex of the rooms and professors of `occurrences` over their dates,
+    and the professor keys by course; None if a read failed.
+    """
+    course_ids = sorted({o.course_id for o in occurrences})
+    binds = ", ".join(f":{i + 1}" for i in range(len(course_ids)))
+    profs_df = execute_query(f"SELECT COURSE_ID, TO_CHAR(PROF_ID) AS PROF_KEY FROM PROF_COURSE WHERE COURSE_ID IN ({binds})",
+                             course_ids, cache=False)
+    if profs_df.columns.empty:
+        return None
+    prof_keys = {course_id: [] for course_id in course_ids}
+    for course_id, prof_key in profs_df[['COURSE_ID', 'PROF_KEY']].itertuples(index=False):
+        prof_keys[int(course_id)].append(prof_key)
+
+    resources = [('ROOM', o.room) for o in occurrences if o.room]
+    resources += [('PROF', key) for keys in prof_keys.values() for key in keys]
+    bookings_df = load_occupancy(resources, min(o.seance_date for o in occurrences), max(o.seance_date for o in occurrences))
+    if bookings_df.columns.empty:
+        return None
+    index = BookingIndex()
+    for resource_type, resource_key, day, start, end in bookings_df[OCCUPANCY_COLUMNS].itertuples(index=False):
+        index.add(resource_type, resource_key, pd.Timestamp(day).date(),
+                  pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime())
+    return index, prof_keys
+
+def _check(index, occurrence, prof_keys):
+    """Why the occurrence cannot be booked, or None. Books it in `index` when free."""
+    day, room = occurrence.seance_date, occurrence.room
+    for prof_key in prof_keys:
+        clash = index.overlapping('PROF', prof_key, day, occurrence.start_time, occurrence.end_time)
+        if clash:
+            return f"Professor busy {clash[0]:%H:%M}-{clash[1]:%H:%M}"
+    if room:
+        clash = index.overlapping('ROOM', room, day, occurrence.start_time, occurrence.end_time)
+        if clash:
+            return f"Room {room} booked {clash[0]:%H:%M}-{clash[1]:%H:%M}"
+    for prof_key in prof_keys:
+        index.add('PROF', prof_key, day, occurrence.start_time, occurrence.end_time)
+    if room:
+        index.add('ROOM', room, day, occurrence.start_time, occurrence.end_time)
+    return None
+
+def _report_row(occurrence, status, reason=""):
+    return [occurrence.seance_date, f"{occurrence.start_time:%H:%M}", f"{occurrence.end_time:%H:%M}",
+            occurrence.course_id, occurrence.section_id, occurrence.seance_type, occurrence.room, status, reason]
+
+def commit_occurrences(occurrences, dry_run=False, all_or_nothing=False):
+    """
+    Inserts the occurrences that clash with no booking of their room or of a
+    professor of their course (nor with an earlier occurrence of the list),
+    in one executemany and one commit. With dry_run they are only checked.
+    With all_or_nothing a single CONFLICT or FAILED occurrence cancels the
+    whole run (rolled back), and the free ones stay PLANNED.
+    Returns (success, message, report) where report has one row per
+    occurrence (REPORT_COLUMNS) with its STATUS: CREATED / PLANNED, CONFLICT
+    (pre-check) or FAILED (refused by the database).
+    """
+    empty_report = pd.DataFrame(columns=REPORT_COLUMNS)
+    if not occurrences:
+        return (False, "There is no occurrence to schedule.", empty_report)
+    for o in occurrences:
+        if o.end_time <= o.start_time:
+            return (False, f"{WEEKDAYS[o.seance_date.weekday()]} {o.seance_type}: the end time must be after the start time.", empty_report)
+
+    loaded = _load_bookings(occurrences)
+    if loaded is None:
+        return (False, "The existing bookings could not be read; nothing was scheduled.", empty_report)
+    index, prof_keys = loaded
+
+    report, to_insert = [], []
+    for occurrence in occurrences:
+        reason = _check(index, occurrence, prof_keys[occurrence.course_id])
+        if reason:
+            report.append(_report_row(occurrence, CONFLICT, reason))
+        else:
+            to_insert.append(occurrence)
+            report.append(_report_row(occurrence, PLANNED))
+
+    cancelled = all_or_nothing and len(to_insert) < len(occurrences)
+    if not dry_run and to_insert and not cancelled:
+        rows = [[o.course_id, o.section_id, o.seance_date, o.start_time, o.end_time, o.room, o.seance_type] for o in to_insert]
+        _, _, row_results = execute_many(SEANCE_DML, rows, all_or_nothing=all_or_nothing)
+        cancelled = all_or_nothing and not all(ok for ok, _ in row_results)
+        # Report rows of the inserted occurrences, in to_insert order.
+        planned = [row for row in report if row[7] == PLANNED]
+        for row, (ok, message) in zip(planned, row_results):
+            if ok:
+                row[7], row[8] = CREATED, ""
+            elif message != ROLLED_BACK:
+                row[7], row[8] = FAILED, message
+
+    report_df = pd.DataFrame(report, columns=REPORT_COLUMNS)
+    counts = report_df['STATUS'].value_counts()
+    summary = ", ".join(f"{count} {status.lower()}" for status, count in counts.items())
+    verb = "checked" if dry_run else "scheduled"
+    if cancelled and not dry_run:
+        return (False, f"Nothing was scheduled: {summary} out of {len(occurrences)} occurrence(s).", report_df)
+    return (not counts.get(CONFLICT, 0) and not counts.get(FAILED, 0),
+            f"{len(occurrences)} occurrence(s) {verb}: {summary}.", report_df)
+
+def schedule_recurring_seances(course_id, section_ids, slots, first_day, last_day, room, excluded_dates=(), dry_run=False):
+    """
+    Creates the seances of a course's weekly pattern over a date range,
+    skipping the excluded dates and the clashing occurrences (see
+    commit_occurrences, which gives the return value). `section_ids` are the
+    sections sharing the slots that have no section of their own.
+    """
+    occurrences = expand_occurrences(course_id, slots, first_day, last_day, excluded_dates, section_ids, room)
+    if not occurrences:
+        return (False, "The pattern has no occurrence in this date range.", pd.DataFrame(columns=REPORT_COLUMNS))
+    return commit_occurrences(occurrences, dry_run)
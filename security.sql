@@ -62,6 +62,9 @@ PROMPT Granting privileges to roles...
 
 -- AUTH Role:
 GRANT SELECT ON YAHYA_ADMIN.user_account TO ROLE_AUTH;
+-- Lets login_user re-hash legacy plaintext passwords with bcrypt.
+GRANT UPDATE (password_hash) ON YAHYA_ADMIN.user_account TO ROLE_AUTH;
+GRANT SELECT ON YAHYA_ADMIN.v_login_profile TO ROLE_AUTH;
 
 -- STUDENT Role:
 GRANT SELECT ON YAHYA_ADMIN.student TO ROLE_STUDENT;
@@ -105,9 +108,10 @@ GRANT SELECT ON YAHYA_ADMIN.v_prof_students_by_course TO ROLE_PROF;
 GRANT SELECT ON YAHYA_ADMIN.v_prof_blocked_students TO ROLE_PROF;
 GRANT SELECT ON YAHYA_ADMIN.v_prof_absence_stats TO ROLE_PROF;
 GRANT UPDATE ON YAHYA_ADMIN.inscription_request TO ROLE_PROF;
-GRANT UPDATE ON YAHYA_ADMIN.attendance TO ROLE_PROF;
+GRANT INSERT, UPDATE ON YAHYA_ADMIN.attendance TO ROLE_PROF;
 GRANT EXECUTE ON YAHYA_ADMIN.fn_students_in_seance TO ROLE_PROF;
 GRANT EXECUTE ON YAHYA_ADMIN.sp_prof_submit_grade TO ROLE_PROF;
+GRANT EXECUTE ON YAHYA_ADMIN.sp_bulk_decide_inscriptions TO ROLE_PROF;
 
 -- ADMIN Role:
 PROMPT -> Granting ADMIN privileges...
@@ -122,6 +126,13 @@ BEGIN
   END LOOP;
 END;
 /
+-- Seat ledger reconciliation (db_utils.reconcile_course_seats / reconcile_seats.py).
+GRANT EXECUTE ON YAHYA_ADMIN.sp_reconcile_course_seats TO ROLE_ADMIN;
+GRANT EXECUTE ON YAHYA_ADMIN.sp_bulk_decide_inscriptions TO ROLE_ADMIN;
+-- Absence state rebuild (db_utils.rebuild_absence_state).
+GRANT EXECUTE ON YAHYA_ADMIN.sp_rebuild_absence_state TO ROLE_ADMIN;
+-- Dashboard statistics refresh (db_utils.refresh_dashboard_stats / refresh_stats.py).
+GRANT EXECUTE ON YAHYA_ADMIN.sp_refresh_dashboard_stats TO ROLE_ADMIN;
 
 -- =====================================================
 -- 5. Assign Roles to Application Users
@@ -133,8 +144,11 @@ GRANT ROLE_STUDENT TO app_student;
 GRANT ROLE_AUTH TO app_auth;
 
 -- Fix for ORA-00942: Explicitly ensure app_auth can see USER_ACCOUNT for login
-PROMPT Explicitly granting SELECT on YAHYA_ADMIN.user_account to app_auth and creating synonym...
+-- (and upgrade the PASSWORD_HASH of a legacy row after a successful login)
+PROMPT Explicitly granting SELECT, UPDATE (password_hash) on YAHYA_ADMIN.user_account to app_auth and creating synonym...
 GRANT SELECT ON YAHYA_ADMIN.user_account TO app_auth;
+GRANT UPDATE (password_hash) ON YAHYA_ADMIN.user_account TO app_auth;
+GRANT SELECT ON YAHYA_ADMIN.v_login_profile TO app_auth;
 CREATE OR REPLACE PUBLIC SYNONYM user_account FOR YAHYA_ADMIN.user_account;
 
 
@@ -0,0 +1,64 @@
+# session_profile.py
+from dataclasses import dataclass
+import pandas as pd
+import streamlit as st
+
+@dataclass(frozen=True, slots=True)
+class SessionProfile:
+    """
+    The logged-in user's account and role-specific identity, read once at login
+    from V_LOGIN_PROFILE. Fields of the other roles are None.
+    """
+    user_id: int
+    login_code: str
+    role: str
+    status: str
+    full_name: str | None = None
+    # STUDENT
+    student_id: int | None = None
+    filiere_id: int | None = None
+    filiere_name: str | None = None
+    current_semestre_id: int | None = None
+    semestre_code: str | None = None
+    # PROF
+    prof_id: int | None = None
+    departement_id: int | None = None
+    # ADMIN
+    admin_id: int | None = None
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a profile from a V_LOGIN_PROFILE row (a pandas Series)."""
+        def value(column, convert=str):
+            item = row.get(column)
+            return None if item is None or pd.isna(item) else convert(item)
+
+        return cls(
+            user_id=value('USER_ID', int),
+            login_code=value('LOGIN_CODE'),
+            role=value('ROLE'),
+            status=value('STATUS'),
+            full_name=value('FULL_NAME'),
+            student_id=value('STUDENT_ID', int),
+            filiere_id=value('FILIERE_ID', int),
+            filiere_name=value('FILIERE_NAME'),
+            current_semestre_id=value('CURRENT_SEMESTRE_ID', int),
+            semestre_code=value('SEMESTRE_CODE'),
+            prof_id=value('PROF_ID', int),
+            departement_id=value('DEPARTEMENT_ID', int),
+            admin_id=value('ADMIN_ID', int),
+        )
+
+    @property
+    def user_info(self):
+        """The account part, as kept in st.session_state.user_info (used to pick the role's pool)."""
+        return {
+            'USER_ID': self.user_id,
+            'LOGIN_CODE': self.login_code,
+            'ROLE': self.role,
+            'STATUS': self.status,
+        }
+
+def get_session_profile():
+    """Gets the profile of the logged-in user, or None before login."""
+    return st.session_state.get('profile')
@@ -1,31 +1,89 @@
 # student_dashboard.py
 import streamlit as st
 import pandas as pd
-from db_utils import execute_query, execute_dml
+from db_utils import execute_query, execute_dml, prefetch_queries
+from passwords import hash_password, FAILED_LOGINS
+from session_profile import get_session_profile
+from enrollment_intake import ENROLLMENT_INTAKE, QUEUED, FAILED
+from config import ENROLLMENT_INTAKE_SETTINGS
+
+# --- Queries ---
+# Shared by the tabs and by prefetch_student_dashboard, which loads them all
+# concurrently before the tabs render.
+BLOCKED_COUNT_QUERY = "SELECT COUNT(*) as COUNT FROM V_STUDENT_BLOCKED_COURSES WHERE STUDENT_ID = :1"
+TOTAL_ABSENCES_QUERY = "SELECT SUM(ABSENCES) as TOTAL FROM V_STUDENT_ABSENCE_STATS WHERE STUDENT_ID = :1"
+CURRENT_COURSES_QUERY = "SELECT COURSE_ID, COURSE_NAME FROM V_STUDENT_CURRENT_COURSES WHERE STUDENT_ID = :1"
+AVAILABLE_COURSES_QUERY = """
+    SELECT c.COURSE_ID, c.NAME
+    FROM COURSE c
+    WHERE c.SEMESTRE_ID = :1 AND c.COURSE_ID NOT IN (
+        SELECT ir.COURSE_ID FROM INSCRIPTION_REQUEST ir WHERE ir.STUDENT_ID = :2
+    )
+"""
+ENROLLMENT_REQUESTS_QUERY = """
+    SELECT 
+        c.NAME AS "Course Name", 
+        ir.STATUS, 
+        TO_CHAR(ir.REQUEST_DATE, 'YYYY-MM-DD HH24:MI') AS "Request Date"
+    FROM INSCRIPTION_REQUEST ir
+    JOIN COURSE c ON ir.COURSE_ID = c.COURSE_ID
+    WHERE ir.STUDENT_ID = :1
+    ORDER BY ir.REQUEST_DATE DESC
+"""
+STUDENT_SECTION_QUERY = """
+    SELECT ss.section_id 
+    FROM student_section ss
+    JOIN section sec ON ss.section_id = sec.section_id
+    WHERE ss.student_id = :1 AND sec.semestre_id = :2
+"""
+SEMESTER_SESSIONS_QUERY = """
+    SELECT
+        se.seance_id, se.section_id, c.name AS course_name, sec.name AS section_name,
+        se.type, TO_CHAR(se.seance_date, 'YYYY-MM-DD') AS seance_date,
+        TO_CHAR(se.start_time, 'HH24:MI') AS start_time, TO_CHAR(se.end_time, 'HH24:MI') AS end_time,
+        p.full_name as prof_name
+    FROM seance se
+    JOIN course c ON se.course_id = c.course_id
+    JOIN section sec ON se.section_id = sec.section_id
+    LEFT JOIN prof_course pc ON c.course_id = pc.course_id
+    LEFT JOIN prof p ON pc.prof_id = p.prof_id
+    WHERE c.semestre_id = :1
+    ORDER BY sec.name, se.seance_date, se.start_time
+"""
+BLOCKED_COURSES_QUERY = "SELECT COURSE_NAME FROM V_STUDENT_BLOCKED_COURSES WHERE STUDENT_ID = :1"
+ABSENCES_BY_COURSE_QUERY = "SELECT COURSE_NAME, ABSENCES FROM V_STUDENT_ABSENCE_STATS WHERE STUDENT_ID = :1"
+RESULTS_QUERY = """
+    SELECT
+        c.NAME AS "Course Name",
+        cr.GRADE,
+        cr.STATUS,
+        ay.LABEL AS "Academic Year",
+        s.CODE AS "Semester"
+    FROM COURSE_RESULT cr
+    JOIN COURSE c ON cr.COURSE_ID = c.COURSE_ID
+    JOIN SEMESTRE s ON cr.SEMESTRE_ID = s.SEMESTRE_ID
+    JOIN ACADEMIC_YEAR ay ON cr.YEAR_ID = ay.YEAR_ID
+    WHERE cr.STUDENT_ID = :1
+    ORDER BY ay.START_DATE DESC, s.CODE
+"""
 
 # --- Helper Functions ---
-def get_student_details(login_code):
-    """Fetches comprehensive student details and caches them."""
-    if 'student_details' not in st.session_state or st.session_state.student_details.get('CODE_APOGE') != login_code:
-        query = """
-            SELECT 
-                s.STUDENT_ID, 
-                s.FULL_NAME, 
-                s.CODE_APOGE, 
-                f.NAME as FILIERE_NAME, 
-                sem.CODE as SEMESTRE_CODE,
-                s.CURRENT_SEMESTRE_ID
-            FROM STUDENT s
-            JOIN FILIERE f ON s.FILIERE_ID = f.FILIERE_ID
-            JOIN SEMESTRE sem ON s.CURRENT_SEMESTRE_ID = sem.SEMESTRE_ID
-            WHERE s.CODE_APOGE = :1
-        """
-        student_df = execute_query(query, [login_code])
-        if not student_df.empty:
-            st.session_state.student_details = student_df.iloc[0]
-        else:
-            return None
-    return st.session_state.student_details
+def prefetch_student_dashboard(student):
+    """Loads the independent queries of every tab concurrently."""
+    student_id = student.student_id
+    semestre_id = student.current_semestre_id
+    prefetch_queries([
+        (BLOCKED_COUNT_QUERY, [student_id]),
+        (TOTAL_ABSENCES_QUERY, [student_id]),
+        (CURRENT_COURSES_QUERY, [student_id]),
+        (AVAILABLE_COURSES_QUERY, [semestre_id, student_id]),
+        (ENROLLMENT_REQUESTS_QUERY, [student_id]),
+        (STUDENT_SECTION_QUERY, [student_id, semestre_id]),
+        (SEMESTER_SESSIONS_QUERY, [semestre_id]),
+        (BLOCKED_COURSES_QUERY, [student_id]),
+        (ABSENCES_BY_COURSE_QUERY, [student_id]),
+        (RESULTS_QUERY, [student_id]),
+    ])
 
 # --- UI Components for Tabs ---
 
@@ -36,15 +94,15 @@ def display_dashboard_home(student):
     with st.container(border=True):
         col1, col2 = st.columns(2)
         with col1:
-            st.markdown(f"### {student['FULL_NAME']}")
-            st.write(f"**Code Apogée:** {student['CODE_APOGE']}")
-            st.write(f"**Filière:** {student['FILIERE_NAME']}")
-            st.write(f"**Current Semester:** {student['SEMESTRE_CODE']}")
+            st.markdown(f"### {student.full_name}")
+            st.write(f"**Code Apogée:** {student.login_code}")
+            st.write(f"**Filière:** {student.filiere_name}")
+            st.write(f"**Current Semester:** {student.semestre_code}")
         
         with col2:
             # Performance Summary
-            blocked_df = execute_query("SELECT COUNT(*) as COUNT FROM V_STUDENT_BLOCKED_COURSES WHERE STUDENT_ID = :1", [int(student['STUDENT_ID'])])
-            absences_df = execute_query("SELECT SUM(ABSENCES) as TOTAL FROM V_STUDENT_ABSENCE_STATS WHERE STUDENT_ID = :1", [int(student['STUDENT_ID'])])
+            blocked_df = execute_query(BLOCKED_COUNT_QUERY, [student.student_id])
+            absences_df = execute_query(TOTAL_ABSENCES_QUERY, [student.student_id])
             
             blocked_count = blocked_df.iloc[0]['COUNT'] if not blocked_df.empty else 0
             total_absences = absences_df.iloc[0]['TOTAL'] if not absences_df.empty and pd.notna(absences_df.iloc[0]['TOTAL']) else 0
@@ -55,13 +113,21 @@ def display_dashboard_home(student):
     if blocked_count > 0:
         st.error("⚠️ **Alert:** You are blocked in one or more courses. Please check the 'Performance' tab for details.")
 
+@st.fragment(run_every=ENROLLMENT_INTAKE_SETTINGS["poll_seconds"])
+def display_intake_progress(student_id):
+    """Polls the intake while requests are queued, then refreshes the whole page once."""
+    queued = [status for status in ENROLLMENT_INTAKE.statuses_for(student_id).values() if status.state == QUEUED]
+    if not queued:
+        st.rerun() # Shows the new requests (or the refusals) everywhere on the page
+    st.info(f"⏳ Sending {len(queued)} enrollment request(s)...")
+
 def display_courses_and_registration(student):
     """Handles course registration and viewing detailed course info."""
     st.subheader("📚 My Courses & Registration")
 
     # --- 1. My Accepted Courses ---
     st.markdown("#### My Enrolled Courses")
-    my_courses_df = execute_query("SELECT COURSE_ID, COURSE_NAME FROM V_STUDENT_CURRENT_COURSES WHERE STUDENT_ID = :1", [int(student['STUDENT_ID'])])
+    my_courses_df = execute_query(CURRENT_COURSES_QUERY, [student.student_id])
 
     if not my_courses_df.empty:
         selected_course_name = st.selectbox("Select a course to see details:", my_courses_df['COURSE_NAME'].tolist())
@@ -84,30 +150,24 @@ def display_courses_and_registration(student):
     # --- 3. Academic Registration (Course Enrollment) ---
     with st.expander("Register for New Courses"):
         # Find courses in the student's current semester that they have not yet requested
-        available_courses_query = """
-            SELECT c.COURSE_ID, c.NAME
-            FROM COURSE c
-            WHERE c.SEMESTRE_ID = :1 AND c.COURSE_ID NOT IN (
-                SELECT ir.COURSE_ID FROM INSCRIPTION_REQUEST ir WHERE ir.STUDENT_ID = :2
-            )
-        """
-        available_courses_df = execute_query(available_courses_query, [int(student['CURRENT_SEMESTRE_ID']), int(student['STUDENT_ID'])])
+        available_courses_df = execute_query(AVAILABLE_COURSES_QUERY, [student.current_semestre_id, student.student_id])
         
         if not available_courses_df.empty:
             st.write("The following courses are available for your current semester:")
+            intake_statuses = ENROLLMENT_INTAKE.statuses_for(student.student_id)
             for _, course in available_courses_df.iterrows():
+                course_id = int(course['COURSE_ID'])
+                intake_status = intake_statuses.get(course_id)
                 col1, col2 = st.columns([3, 1])
                 col1.write(f"**{course['NAME']}**")
-                if col2.button("Request Enrollment", key=f"register_{course['COURSE_ID']}"):
-                    success, msg = execute_dml(
-                        "INSERT INTO INSCRIPTION_REQUEST (STUDENT_ID, COURSE_ID, STATUS) VALUES (:1, :2, 'PENDING')",
-                        [int(student['STUDENT_ID']), int(course['COURSE_ID'])]
-                    )
-                    if success:
-                        st.success(f"Enrollment request for '{course['NAME']}' sent successfully!")
-                        st.rerun()
-                    else:
-                        st.error(f"Failed to send request: {msg}")
+                if intake_status is not None and intake_status.state == QUEUED:
+                    col2.caption("⏳ Request being sent...")
+                elif col2.button("Request Enrollment", key=f"register_{course_id}"):
+                    # Queued for the intake worker; the status below updates on its own.
+                    ENROLLMENT_INTAKE.submit(student.student_id, course_id)
+                    st.rerun()
+                if intake_status is not None and intake_status.state == FAILED:
+                    st.error(f"Failed to send request: {intake_status.message}")
                 st.divider()
         else:
             st.info("No new courses are available for registration at this time.")
@@ -116,16 +176,9 @@ def display_courses_and_registration(student):
 
     # --- 4. My Enrollment Requests Status ---
     st.markdown("#### My Enrollment Requests Status")
-    requests_df = execute_query("""
-        SELECT 
-            c.NAME AS "Course Name", 
-            ir.STATUS, 
-            TO_CHAR(ir.REQUEST_DATE, 'YYYY-MM-DD HH24:MI') AS "Request Date"
-        FROM INSCRIPTION_REQUEST ir
-        JOIN COURSE c ON ir.COURSE_ID = c.COURSE_ID
-        WHERE ir.STUDENT_ID = :1
-        ORDER BY ir.REQUEST_DATE DESC
-    """, [int(student['STUDENT_ID'])])
+    if any(status.state == QUEUED for status in ENROLLMENT_INTAKE.statuses_for(student.student_id).values()):
+        display_intake_progress(student.student_id)
+    requests_df = execute_query(ENROLLMENT_REQUESTS_QUERY, [student.student_id])
 
     if not requests_df.empty:
         # Function to apply color styling
@@ -136,6 +189,8 @@ def display_courses_and_registration(student):
                 return 'background-color: #dc3545; color: white'
             elif status == 'PENDING':
                 return 'background-color: #ffc107; color: black'
+            elif status == 'WAITLISTED':
+                return 'background-color: #17a2b8; color: white'
             return ''
 
         st.dataframe(
@@ -152,31 +207,11 @@ def display_schedule(student):
     st.info("This page shows all available sessions for your semester. Join a section to build your final schedule.")
 
     # 1. Check if student is already in a section for the current semester
-    student_section_query = """
-        SELECT ss.section_id 
-        FROM student_section ss
-        JOIN section sec ON ss.section_id = sec.section_id
-        WHERE ss.student_id = :1 AND sec.semestre_id = :2
-    """
-    student_section_df = execute_query(student_section_query, [int(student['STUDENT_ID']), int(student['CURRENT_SEMESTRE_ID'])])
+    student_section_df = execute_query(STUDENT_SECTION_QUERY, [student.student_id, student.current_semestre_id])
     student_section_id = student_section_df.iloc[0]['SECTION_ID'] if not student_section_df.empty else None
 
     # 2. Fetch all available sessions for the student's semester
-    all_sessions_query = """
-        SELECT
-            se.seance_id, se.section_id, c.name AS course_name, sec.name AS section_name,
-            se.type, TO_CHAR(se.seance_date, 'YYYY-MM-DD') AS seance_date,
-            TO_CHAR(se.start_time, 'HH24:MI') AS start_time, TO_CHAR(se.end_time, 'HH24:MI') AS end_time,
-            p.full_name as prof_name
-        FROM seance se
-        JOIN course c ON se.course_id = c.course_id
-        JOIN section sec ON se.section_id = sec.section_id
-        LEFT JOIN prof_course pc ON c.course_id = pc.course_id
-        LEFT JOIN prof p ON pc.prof_id = p.prof_id
-        WHERE c.semestre_id = :1
-        ORDER BY sec.name, se.seance_date, se.start_time
-    """
-    all_sessions_df = execute_query(all_sessions_query, [int(student['CURRENT_SEMESTRE_ID'])])
+    all_sessions_df = execute_query(SEMESTER_SESSIONS_QUERY, [student.current_semestre_id])
 
     if not all_sessions_df.empty:
         # Group sessions by section to make the UI clearer
@@ -197,7 +232,7 @@ def display_schedule(student):
                         if st.button("Confirm Attendance/Join Section", key=f"join_{section_id}"):
                             success, msg = execute_dml(
                                 "INSERT INTO STUDENT_SECTION (student_id, section_id) VALUES (:1, :2)",
-                                [int(student['STUDENT_ID']), int(section_id)]
+                                [student.student_id, int(section_id)]
                             )
                             if success:
                                 st.success(f"Successfully joined section '{section_name}'! Your schedule is now finalized.")
@@ -220,12 +255,12 @@ def display_performance_and_profile(student):
     st.markdown("#### Academic Performance")
     
     # Blocked Status
-    blocked_df = execute_query("SELECT COURSE_NAME FROM V_STUDENT_BLOCKED_COURSES WHERE STUDENT_ID = :1", [int(student['STUDENT_ID'])])
+    blocked_df = execute_query(BLOCKED_COURSES_QUERY, [student.student_id])
     if not blocked_df.empty:
         st.error(f"**Alert:** You are currently BLOCKED in the following course(s): **{', '.join(blocked_df['COURSE_NAME'])}**. You cannot continue until this is resolved.")
 
     # Absence Tracker
-    absences_df = execute_query("SELECT COURSE_NAME, ABSENCES FROM V_STUDENT_ABSENCE_STATS WHERE STUDENT_ID = :1", [int(student['STUDENT_ID'])])
+    absences_df = execute_query(ABSENCES_BY_COURSE_QUERY, [student.student_id])
     if not absences_df.empty:
         st.write("**Absence Summary:**")
         for _, row in absences_df.iterrows():
@@ -241,21 +276,7 @@ def display_performance_and_profile(student):
     # --- 2. Grades & Academic Results ---
     st.markdown("#### 📖 Grades & Academic Results")
 
-    results_query = """
-        SELECT
-            c.NAME AS "Course Name",
-            cr.GRADE,
-            cr.STATUS,
-            ay.LABEL AS "Academic Year",
-            s.CODE AS "Semester"
-        FROM COURSE_RESULT cr
-        JOIN COURSE c ON cr.COURSE_ID = c.COURSE_ID
-        JOIN SEMESTRE s ON cr.SEMESTRE_ID = s.SEMESTRE_ID
-        JOIN ACADEMIC_YEAR ay ON cr.YEAR_ID = ay.YEAR_ID
-        WHERE cr.STUDENT_ID = :1
-        ORDER BY ay.START_DATE DESC, s.CODE
-    """
-    results_df = execute_query(results_query, [int(student['STUDENT_ID'])])
+    results_df = execute_query(RESULTS_QUERY, [student.student_id])
 
     if not results_df.empty:
         # Calculate and display GPA from validated courses with non-null grades
@@ -300,9 +321,10 @@ def display_performance_and_profile(student):
                 else:
                     success, msg = execute_dml(
                         "UPDATE USER_ACCOUNT SET PASSWORD_HASH = :1 WHERE LOGIN_CODE = :2",
-                        [new_pass, student['CODE_APOGE']]
+                        [hash_password(new_pass), student.login_code]
                     )
                     if success:
+                        FAILED_LOGINS.forget(student.login_code)
                         st.success("Your password has been updated successfully!")
                     else:
                         st.error(f"Could not update password: {msg}")
@@ -311,14 +333,16 @@ def display_performance_and_profile(student):
 def display_student_dashboard():
     """Main function to render the student dashboard."""
     
-    login_code = st.session_state.user_info['LOGIN_CODE']
-    student = get_student_details(login_code)
+    student = get_session_profile()
 
-    if student is None:
+    if student is None or student.student_id is None or student.current_semestre_id is None:
         st.error("Could not retrieve student details. Please contact an administrator.")
         return
 
-    st.title(f"👋 Welcome, {student['FULL_NAME'].split()[0]}!")
+    st.title(f"👋 Welcome, {student.full_name.split()[0]}!")
+
+    # Every tab body runs on each rerun, so load their queries in one parallel batch.
+    prefetch_student_dashboard(student)
 
     # Define the dashboard tabs
     tab1, tab2, tab3, tab4 = st.tabs([
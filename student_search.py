@@ -0,0 +1,75 @@
+# student_search.py
+import re
+import unicodedata
+from db_utils import fetch_page
+
+# Searches run in SQL against STUDENT.SEARCH_KEY, a normalized copy of
+# "full name, apogee code, filière" kept by trg_student_search_key, and the
+# STUDENT_SEARCH_GRAM trigram index kept by trg_student_search_grams (db.sql).
+# Pages are read by db_utils.fetch_page on (SEARCH_KEY, STUDENT_ID), so the
+# cost of a page depends on the page size, not on the number of students.
+
+DEFAULT_PAGE_SIZE = 50
+GRAM_SIZE = 3
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+STUDENT_SEARCH_QUERY = """
+    SELECT
+        s.student_id,
+        s.code_apoge,
+        s.full_name,
+        f.name AS filiere,
+        sem.code || ' (' || ay.label || ')' AS semestre,
+        ua.status AS account_status,
+        s.search_key
+    FROM student s
+    JOIN filiere f ON f.filiere_id = s.filiere_id
+    JOIN semestre sem ON sem.semestre_id = s.current_semestre_id
+    JOIN academic_year ay ON ay.year_id = sem.year_id
+    JOIN user_account ua ON ua.login_code = s.code_apoge
+    WHERE 1 = 1{filters}
+"""
+
+def normalize_search_text(text):
+    """
+    Python twin of fn_search_key: strips accents, lowercases and collapses
+    everything that is not a letter or a digit into single spaces.
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    plain = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', plain.lower()).strip()
+
+def search_grams(term):
+    """The distinct trigrams of a normalized term, in order of first appearance."""
+    return list(dict.fromkeys(term[i:i + GRAM_SIZE] for i in range(len(term) - GRAM_SIZE + 1)))
+
+def search_students(search="", after=None, page_size=DEFAULT_PAGE_SIZE, count=False):
+    """
+    Gets one page of students matching `search` (name, apogee code or filière,
+    case and accent insensitive). `after` is the cursor returned with the
+    previous page, None for the first one.
+    Returns (DataFrame, next_cursor, total) like db_utils.fetch_page.
+    """
+    filters, params = [], []
+    term = normalize_search_text(search)
+    if term:
+        grams = search_grams(term)
+        if grams:
+            # Trigram index first, then LIKE to drop the rows whose grams are not contiguous.
+            binds = ", ".join(f":g{i}" for i in range(len(grams)))
+            filters.append(f"""s.student_id IN (
+                SELECT g.student_id FROM student_search_gram g
+                WHERE g.gram IN ({binds})
+                GROUP BY g.student_id
+                HAVING COUNT(*) = {len(grams)}
+            )""")
+            params.extend(grams)
+        filters.append("s.search_key LIKE :pattern")
+        params.append(f"%{term}%")
+
+    query = STUDENT_SEARCH_QUERY.format(filters="".join(f"\n      AND {condition}" for condition in filters))
+    page, next_cursor, total = fetch_page(query, ("SEARCH_KEY", "STUDENT_ID"), params, after, page_size, count)
+    return page.drop(columns=['SEARCH_KEY'], errors='ignore'), next_cursor, total
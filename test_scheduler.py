@@ -0,0 +1,77 @@
+# test_scheduler.py
+"""Tests of the pure-Python part of scheduler.py: pattern expansion and the booking index. No database is needed."""
+import datetime
+import random
+
+from scheduler import BookingIndex, WeeklySlot, _check, expand_occurrences
+
+MONDAY = datetime.date(2025, 9, 1)
+
+def at(hour, minute=0, day=MONDAY):
+    return datetime.datetime.combine(day, datetime.time(hour, minute))
+
+def slot(weekday=0, start=(8, 30), end=(10, 30), seance_type="COURS", room=None, section_id=None):
+    return WeeklySlot(weekday, datetime.time(*start), datetime.time(*end), seance_type, room, section_id)
+
+def test_shared_slot_is_recorded_once_for_the_first_section():
+    occurrences = expand_occurrences(1, [slot()], MONDAY, MONDAY + datetime.timedelta(days=13), section_ids=[10, 11, 12], room="A1")
+    assert [(o.seance_date, o.section_id, o.room) for o in occurrences] == [
+        (MONDAY, 10, "A1"), (MONDAY + datetime.timedelta(days=7), 10, "A1")
+    ]
+
+def test_section_slots_keep_their_section_and_room():
+    slots = [slot(section_id=11, room="B2", seance_type="TD"), slot(start=(10, 45), end=(12, 45), section_id=12, seance_type="TD")]
+    occurrences = expand_occurrences(1, slots, MONDAY, MONDAY, section_ids=[10, 11, 12], room="A1")
+    assert [(o.section_id, o.room) for o in occurrences] == [(11, "B2"), (12, "A1")]
+
+def test_excluded_dates_and_weekday_alignment():
+    wednesday = slot(weekday=2)
+    occurrences = expand_occurrences(1, [wednesday], MONDAY, MONDAY + datetime.timedelta(days=20),
+                                     excluded_dates=[MONDAY + datetime.timedelta(days=9)], section_ids=[10])
+    assert [o.seance_date for o in occurrences] == [MONDAY + datetime.timedelta(days=2), MONDAY + datetime.timedelta(days=16)]
+
+def test_shared_slot_of_several_sections_does_not_conflict_with_itself():
+    index = BookingIndex()
+    occurrences = expand_occurrences(1, [slot()], MONDAY, MONDAY + datetime.timedelta(days=27), section_ids=[10, 11], room="A1")
+    assert [_check(index, o, ["7"]) for o in occurrences] == [None] * 4
+
+def test_two_sections_in_one_room_at_once_conflict():
+    index = BookingIndex()
+    occurrences = expand_occurrences(1, [slot(section_id=10), slot(section_id=11, seance_type="TD")], MONDAY, MONDAY, room="A1")
+    assert _check(index, occurrences[0], []) is None
+    assert _check(index, occurrences[1], []) == "Room A1 booked 08:30-10:30"
+
+def test_overlapping_finds_an_earlier_longer_booking():
+    index = BookingIndex()
+    index.add('ROOM', "A1", MONDAY, at(8), at(12))
+    index.add('ROOM', "A1", MONDAY, at(9), at(10))
+    assert index.overlapping('ROOM', "A1", MONDAY, at(11), at(11, 30)) == (at(8), at(12))
+    assert index.overlapping('ROOM', "A1", MONDAY, at(9, 30), at(9, 45)) in {(at(8), at(12)), (at(9), at(10))}
+
+def test_overlapping_is_half_open_and_per_resource_and_day():
+    index = BookingIndex()
+    index.add('PROF', "7", MONDAY, at(8), at(10))
+    index.add('PROF', "7", MONDAY, at(14), at(16))
+    assert index.overlapping('PROF', "7", MONDAY, at(10), at(12)) is None
+    assert index.overlapping('PROF', "7", MONDAY, at(6), at(8)) is None
+    assert index.overlapping('PROF', "7", MONDAY, at(12), at(14, 30)) == (at(14), at(16))
+    assert index.overlapping('PROF', "8", MONDAY, at(8), at(10)) is None
+    tuesday = MONDAY + datetime.timedelta(days=1)
+    assert index.overlapping('PROF', "7", tuesday, at(8, day=tuesday), at(10, day=tuesday)) is None
+
+def test_overlapping_matches_a_linear_scan():
+    rng = random.Random(0)
+    for _ in range(200):
+        index, bookings = BookingIndex(), []
+        for _ in range(rng.randrange(1, 8)):
+            start = rng.randrange(0, 40)
+            booking = (at(8) + datetime.timedelta(minutes=15 * start),
+                       at(8) + datetime.timedelta(minutes=15 * (start + rng.randrange(1, 12))))
+            bookings.append(booking)
+            index.add('ROOM', "A1", MONDAY, *booking)
+        start = rng.randrange(0, 50)
+        query = (at(8) + datetime.timedelta(minutes=15 * start), at(8) + datetime.timedelta(minutes=15 * (start + rng.randrange(1, 6))))
+        found = index.overlapping('ROOM', "A1", MONDAY, *query)
+        expected = [b for b in bookings if b[0] < query[1] and b[1] > query[0]]
+        assert (found is None) == (not expected)
+        assert found is None or found in expected
@@ -0,0 +1,308 @@
+# timetable.py
+import datetime
+import random
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+import pandas as pd
+from config import TIMETABLE_SETTINGS
+from db_utils import execute_query
+from scheduler import OCCUPANCY_COLUMNS, WEEKDAYS, WeeklySlot, commit_occurrences, expand_occurrences, load_occupancy
+
+# =================================================================
+# Timetable Generator
+# =================================================================
+# Builds a conflict-free weekly timetable for the courses of one or more
+# semesters: every lesson (a weekly COURS of a course, attended by all
+# its sections, or a weekly TD of one section) gets a teaching period and
+# a room, so that no professor, section or room has two lessons at once.
+#
+# The solver is a greedy placement (hardest lessons first, each on the
+# free period that keeps its sections' days the most balanced) followed,
+# if lessons are left over, by a min-conflicts local search: an unplaced
+# lesson takes the period where it evicts the fewest lessons, the evicted
+# ones go back in the queue, and a short tabu list keeps them from
+# bouncing straight back. Periods where a professor or a room already has
+# a seance (SEANCE_OCCUPANCY, over the date range) are blocked for it.
+# The result is a preview; commit_timetable turns it into dated seances
+# through scheduler.commit_occurrences, all of them or none.
+# =================================================================
+
+TABU_TENURE = 10
+
+@dataclass(frozen=True, slots=True)
+class Period:
+    weekday: int
+    start: datetime.time
+    end: datetime.time
+
+@dataclass(frozen=True, slots=True)
+class Lesson:
+    course_id: int
+    course_name: str
+    section_id: int             # Section the seance is recorded for
+    section_ids: tuple          # Sections whose students attend
+    section_name: str
+    seance_type: str
+    prof_keys: tuple
+
+@dataclass(frozen=True, slots=True)
+class Placement:
+    lesson: Lesson
+    period: Period
+    room: str
+
+@dataclass(frozen=True, slots=True)
+class TimetableResult:
+    placements: tuple
+    unplaced: tuple
+    seconds: float
+    iterations: int
+
+def default_periods(settings=TIMETABLE_SETTINGS):
+    """The week's teaching periods from the settings, day by day."""
+    return [
+        Period(day, datetime.time.fromisoformat(start), datetime.time.fromisoformat(end))
+        for day in settings["days"] for start, end in settings["periods"]
+    ]
+
+def build_lessons(courses, sections, prof_keys, settings=TIMETABLE_SETTINGS):
+    """
+    Lessons of the week. `courses` is [(course_id, name, semestre_id)],
+    `sections` maps a semestre_id to its [(section_id, name)] and `prof_keys`
+    a course_id to its professors. Courses of a semester without sections
+    are left out.
+    """
+    lessons = []
+    for course_id, name, semestre_id in courses:
+        course_sections = sections.get(semestre_id, [])
+        if not course_sections:
+            continue
+        profs = tuple(prof_keys.get(course_id, ()))
+        all_ids = tuple(section_id for section_id, _ in course_sections)
+        for seance_type, count in settings["lessons_per_course"].items():
+            lessons.extend(
+                Lesson(course_id, name, all_ids[0], all_ids, "All sections", seance_type, profs) for _ in range(count)
+            )
+        for seance_type, count in settings["lessons_per_section"].items():
+            lessons.extend(
+                Lesson(course_id, name, section_id, (section_id,), section_name, seance_type, profs)
+                for section_id, section_name in course_sections for _ in range(count)
+            )
+    return lessons
+
+class TimetableSolver:
+    """
+    Assigns a period and a room to every lesson; see the module comment.
+    `blocked` holds the (Period, ('P', prof_key)) and (Period, ('R', room))
+    pairs that are already taken outside the timetable.
+    """
+
+    def __init__(self, lessons, rooms, periods, seed=0, blocked=()):
+        self.lessons = list(lessons)
+        self.rooms = list(dict.fromkeys(rooms))
+        self.periods = list(periods)
+        self.rng = random.Random(seed)
+        self._resources = [
+            [('P', key) for key in lesson.prof_keys] + [('S', section_id) for section_id in lesson.section_ids]
+            for lesson in self.lessons
+        ]
+        period_index = {period: p for p, period in enumerate(self.periods)}
+        self._blocked = {(period_index[period], resource) for period, resource in blocked if period in period_index}
+        self._period_of = [None] * len(self.lessons)
+        self._room_of = [None] * len(self.lessons)
+        self._holder = {}                   # (period, resource) -> lesson
+        self._room_holder = {}              # (period, room) -> lesson
+        self._usable_rooms = [[room for room in self.rooms if (p, ('R', room)) not in self._blocked] for p in range(len(self.periods))]
+        self._free_rooms = [set(rooms) for rooms in self._usable_rooms]
+        self._day_load = defaultdict(int)   # (weekday, section_id) -> lessons
+        # Periods where nothing outside the timetable keeps a lesson away.
+        self._open_periods = [
+            [p for p in range(len(self.periods))
+             if self._usable_rooms[p] and not any((p, r) in self._blocked for r in resources)]
+            for resources in self._resources
+        ]
+
+    # --- Moves ---
+    def _place(self, i, p, room):
+        self._period_of[i], self._room_of[i] = p, room
+        for resource in self._resources[i]:
+            self._holder[(p, resource)] = i
+        self._room_holder[(p, room)] = i
+        self._free_rooms[p].discard(room)
+        for section_id in self.lessons[i].section_ids:
+            self._day_load[(self.periods[p].weekday, section_id)] += 1
+
+    def _remove(self, i):
+        p, room = self._period_of[i], self._room_of[i]
+        for resource in self._resources[i]:
+            del self._holder[(p, resource)]
+        del self._room_holder[(p, room)]
+        self._free_rooms[p].add(room)
+        for section_id in self.lessons[i].section_ids:
+            self._day_load[(self.periods[p].weekday, section_id)] -= 1
+        self._period_of[i] = self._room_of[i] = None
+
+    def _evictions(self, i, p):
+        """(lessons to evict, room) for placing lesson i on one of its open periods p."""
+        evicted = {self._holder[(p, r)] for r in self._resources[i] if (p, r) in self._holder}
+        if self._free_rooms[p]:
+            return evicted, min(self._free_rooms[p])
+        for j in evicted:
+            return evicted, self._room_of[j] # Freed by the eviction
+        room = self.rng.choice(self._usable_rooms[p])
+        return evicted | {self._room_holder[(p, room)]}, room
+
+    def _spread(self, i, p):
+        """Lessons the sections of lesson i already have that day: fewer is better."""
+        day = self.periods[p].weekday
+        return sum(self._day_load[(day, section_id)] for section_id in self.lessons[i].section_ids)
+
+    # --- Search ---
+    def _greedy(self):
+        degree = defaultdict(int)
+        for resources in self._resources:
+            for resource in resources:
+                degree[resource] += 1
+        order = sorted(range(len(self.lessons)), key=lambda i: -sum(degree[r] for r in self._resources[i]))
+        unplaced = []
+        for i in order:
+            best = None
+            for p in self._open_periods[i]:
+                evicted, room = self._evictions(i, p)
+                if not evicted and (best is None or self._spread(i, p) < best[0]):
+                    best = (self._spread(i, p), p, room)
+            if best is None:
+                unplaced.append(i)
+            else:
+                self._place(i, best[1], best[2])
+        return unplaced
+
+    def solve(self, max_seconds=TIMETABLE_SETTINGS["max_seconds"]):
+        start = time.perf_counter()
+        if not self.lessons or not self.rooms or not self.periods:
+            return TimetableResult((), tuple(self.lessons), 0.0, 0)
+
+        unplaced = self._greedy()
+        # A lesson without an open period stays unplaced: searching cannot help it.
+        queue = deque(i for i in unplaced if self._open_periods[i])
+        best = (len(queue), list(self._period_of), list(self._room_of))
+        tabu = {}  # (lesson, period) -> iteration until which the move is forbidden
+        iterations = 0
+        deadline = start + max_seconds
+        while queue and time.perf_counter() < deadline:
+            iterations += 1
+            i = queue.popleft()
+            choices = []
+            for p in self._open_periods[i]:
+                if tabu.get((i, p), 0) > iterations:
+                    continue
+                evicted, room = self._evictions(i, p)
+                choices.append((len(evicted), self._spread(i, p), self.rng.random(), p, room, evicted))
+            if not choices:
+                queue.append(i)
+                continue
+            _, _, _, p, room, evicted = min(choices)
+            for j in evicted:
+                self._remove(j)
+                tabu[(j, p)] = iterations + TABU_TENURE
+                queue.append(j)
+            self._place(i, p, room)
+            if len(queue) < best[0]:
+                best = (len(queue), list(self._period_of), list(self._room_of))
+
+        _, period_of, room_of = best
+        placements = tuple(
+            Placement(lesson, self.periods[p], room_of[i])
+            for i, (lesson, p) in enumerate(zip(self.lessons, period_of)) if p is not None
+        )
+        unplaced = tuple(lesson for lesson, p in zip(self.lessons, period_of) if p is None)
+        return TimetableResult(placements, unplaced, time.perf_counter() - start, iterations)
+
+def solve_timetable(lessons, rooms, periods=None, max_seconds=TIMETABLE_SETTINGS["max_seconds"], seed=0, blocked=()):
+    """Solves a weekly timetable around the `blocked` periods (see load_blocked_periods). Returns a TimetableResult."""
+    return TimetableSolver(lessons, rooms, periods or default_periods(), seed, blocked).solve(max_seconds)
+
+# --- Database ---
+def load_lessons(semestre_ids, settings=TIMETABLE_SETTINGS):
+    """
+    Lessons of the courses of the given semesters, with their sections and
+    professors (PROF_COURSE). Returns (lessons, warnings).
+    """
+    if not semestre_ids:
+        return [], []
+    binds = ", ".join(f":{i + 1}" for i in range(len(semestre_ids)))
+    params = [int(semestre_id) for semestre_id in semestre_ids]
+    courses_df = execute_query(f"SELECT COURSE_ID, NAME, SEMESTRE_ID FROM COURSE WHERE SEMESTRE_ID IN ({binds}) ORDER BY NAME", params)
+    sections_df = execute_query(f"SELECT SECTION_ID, NAME, SEMESTRE_ID FROM SECTION WHERE SEMESTRE_ID IN ({binds}) ORDER BY NAME", params)
+    profs_df = execute_query(f"""
+        SELECT pc.COURSE_ID, TO_CHAR(pc.PROF_ID) AS PROF_KEY
+        FROM PROF_COURSE pc JOIN COURSE c ON c.COURSE_ID = pc.COURSE_ID
+        WHERE c.SEMESTRE_ID IN ({binds})
+    """, params)
+
+    courses = [(int(c), name, int(s)) for c, name, s in courses_df[['COURSE_ID', 'NAME', 'SEMESTRE_ID']].itertuples(index=False)]
+    sections = defaultdict(list)
+    for section_id, name, semestre_id in sections_df[['SECTION_ID', 'NAME', 'SEMESTRE_ID']].itertuples(index=False):
+        sections[int(semestre_id)].append((int(section_id), name))
+    prof_keys = defaultdict(list)
+    for course_id, prof_key in profs_df[['COURSE_ID', 'PROF_KEY']].itertuples(index=False):
+        prof_keys[int(course_id)].append(prof_key)
+
+    warnings = [f"{name}: no section in its semester, not scheduled." for _, name, s in courses if not sections.get(s)]
+    warnings += [f"{name}: no professor assigned." for c, name, _ in courses if not prof_keys.get(c)]
+    return build_lessons(courses, sections, prof_keys, settings), warnings
+
+def load_blocked_periods(lessons, rooms, first_day, last_day, excluded_dates=(), periods=None):
+    """
+    The (Period, resource) pairs taken by existing seances: a weekly period is
+    blocked for a professor of the lessons or a room when one of its dates in
+    the range (minus the excluded ones) overlaps their SEANCE_OCCUPANCY slots,
+    as the timetable would be committed on every one of those dates.
+    """
+    periods = periods or default_periods()
+    resources = [('PROF', key) for lesson in lessons for key in lesson.prof_keys] + [('ROOM', room) for room in rooms]
+    bookings_df = load_occupancy(resources, first_day, last_day)
+    if bookings_df.empty:
+        return set()
+
+    excluded = set(excluded_dates)
+    by_day = defaultdict(list)
+    for period in periods:
+        by_day[period.weekday].append(period)
+    blocked = set()
+    for resource_type, resource_key, day, start, end in bookings_df[OCCUPANCY_COLUMNS].itertuples(index=False):
+        day = pd.Timestamp(day).date()
+        if day in excluded:
+            continue
+        resource = ('P', resource_key) if resource_type == 'PROF' else ('R', resource_key)
+        start, end = pd.Timestamp(start).time(), pd.Timestamp(end).time()
+        blocked.update((period, resource) for period in by_day[day.weekday()] if period.start < end and period.end > start)
+    return blocked
+
+def timetable_frame(result):
+    """The placements of a TimetableResult as a preview table, by day and time."""
+    rows = [
+        [placement.period.weekday, WEEKDAYS[placement.period.weekday], f"{placement.period.start:%H:%M}",
+         f"{placement.period.end:%H:%M}", placement.lesson.course_name, placement.lesson.seance_type,
+         placement.lesson.section_name, placement.room]
+        for placement in result.placements
+    ]
+    frame = pd.DataFrame(rows, columns=["WEEKDAY", "DAY", "START", "END", "COURSE", "TYPE", "SECTION", "ROOM"])
+    return frame.sort_values(["WEEKDAY", "START", "COURSE"]).drop(columns=["WEEKDAY"]).reset_index(drop=True)
+
+def commit_timetable(result, first_day, last_day, excluded_dates=(), dry_run=False):
+    """
+    Creates the seances of a weekly timetable over a date range, in one batch
+    and all or nothing: a conflict found by the pre-check or a seance refused
+    by the database leaves the schedule untouched (scheduler.commit_occurrences,
+    which gives the return value).
+    """
+    occurrences = []
+    for placement in result.placements:
+        slot = WeeklySlot(placement.period.weekday, placement.period.start, placement.period.end,
+                          placement.lesson.seance_type, placement.room)
+        occurrences.extend(expand_occurrences(placement.lesson.course_id, [slot], first_day, last_day,
+                                              excluded_dates, [placement.lesson.section_id]))
+    occurrences.sort(key=lambda o: (o.seance_date, o.start_time, o.course_id, o.section_id))
+    return commit_occurrences(occurrences, dry_run, all_or_nothing=True)